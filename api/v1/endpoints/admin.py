@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import Optional
+from app.core.security import principal_cache, require_operator
+from app.core.replicas import read_router
+from app.core.pool_metrics import pool_stats
+from app.core import profiling, slow_queries, startup
+from app.services import fleet_stats_service
+
+# Diagnóstico del proceso (SQL y planes de todos los tenants): credencial de
+# operación, no el rol admin de un tenant
+router = APIRouter(dependencies=[Depends(require_operator)])
+
+@router.get("/cache")
+def get_cache_stats():
+    """Estadísticas de las caches en memoria del proceso (requiere token de operación)"""
+    return {
+        "principals": principal_cache.stats(),
+        "fleet_stats": fleet_stats_service.fleet_stats_cache.stats()
+    }
+
+@router.get("/pool")
+def get_pool_stats():
+    """Conexiones en uso, overflow y espera de checkout por pool del proceso (requiere token de operación)"""
+    return {"pools": pool_stats()}
+
+@router.get("/startup")
+def get_startup_timings():
+    """Milisegundos de importación, comprobación del esquema y OpenAPI de este worker (requiere token de operación)"""
+    return {"schema_startup": startup.SCHEMA_STARTUP, "timings": startup.timings}
+
+@router.get("/slow-queries")
+def get_slow_queries(
+    order_by: str = Query("total_ms", pattern="^(total_ms|p99_ms|max_ms|count|slow)$"),
+    fingerprint: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    """Huellas de SQL con count/total/p99 y consultas lentas recientes con su plan (requiere token de operación)"""
+    recorder = slow_queries.recorder
+    return {
+        "threshold_ms": recorder.threshold_ms,
+        "explain": {
+            "enabled": recorder.explain,
+            "captured": recorder.explains_captured,
+            "failed": recorder.explains_failed,
+        },
+        "fingerprints": recorder.fingerprints(order_by, limit),
+        "recent": recorder.recent(fingerprint, limit)
+    }
+
+@router.delete("/slow-queries")
+def reset_slow_queries():
+    """Vaciar las estadísticas y el buffer de consultas lentas de este worker (requiere token de operación)"""
+    slow_queries.recorder.reset()
+    return {"message": "Registro de consultas lentas vaciado"}
+
+@router.get("/profiles/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = Query("json", pattern="^(json|folded)$"),
+    limit: int = Query(25, ge=1, le=200)
+):
+    """Perfil de una petición hecha con X-Profile: 1 o ?profile=1 (requiere token de operación).
+
+    format=folded descarga las pilas para flamegraph.pl o speedscope. Los
+    perfiles se guardan en el worker que atendió la petición.
+    """
+    profile = profiling.profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Perfil no encontrado o caducado en este worker")
+    if format == "folded":
+        return Response(
+            content=profile.folded(),
+            media_type="text/plain",
+            headers={"Content-Disposition": f'attachment; filename="profile-{profile.id}.folded"'}
+        )
+    return profile.summary(limit)
+
+@router.get("/replicas")
+def get_replica_status():
+    """Retraso y disponibilidad de las réplicas de lectura (requiere token de operación)"""
+    return {
+        "max_lag_seconds": read_router.max_lag,
+        "replicas": read_router.status()
+    }
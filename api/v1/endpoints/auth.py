@@ -3,8 +3,7 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 from app.services.auth_service import AuthService
-from app.core.security import get_current_active_user
-from app.models.user import User
+from app.core.security import get_current_active_user, Principal
 
 router = APIRouter()
 
@@ -59,11 +58,14 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         )
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_active_user)):
+def get_current_user_info(
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
     """
     Obtener información del usuario actual
     """
-    return current_user
+    return AuthService.get_user(db, current_user.id)
 
 @router.post("/logout")
 def logout():
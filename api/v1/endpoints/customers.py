@@ -1,63 +1,103 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.database import get_db
+from app.core.replicas import get_read_db
 from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
-from app.services import customer_service
-from app.core.security import get_current_active_user
-from app.models.user import User
+from app.schemas.bulk import BulkResult
+from app.services import customer_service, version_service
+from app.core.security import get_current_active_user, Principal
+from app.core.conditional import conditional_get
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.serialization import json_row_response, json_rows_response, select_fields, FIELDS_DESCRIPTION
+from app.core.bulk import bulk_body, bulk_openapi
+from app.core.export import stream_export, EXPORT_FORMAT_PATTERN
 
 router = APIRouter()
 
+# GET condicional (ETag / If-None-Match) sobre la versión del recurso del tenant
+if_changed = [Depends(conditional_get(version_service.CUSTOMERS))]
+
 @router.post("/", response_model=CustomerResponse, status_code=201)
 def create_customer(
     customer: CustomerCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Crear un nuevo cliente (requiere autenticación)"""
     return customer_service.create_customer(db, customer, current_user.tenant_id)
 
-@router.get("/", response_model=List[CustomerResponse])
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(CustomerCreate))
+def bulk_create_customers(
+    customers: List[CustomerCreate] = Depends(bulk_body(CustomerCreate)),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Crear clientes en lote, JSON o NDJSON (requiere autenticación)"""
+    return customer_service.bulk_create_customers(db, customers, current_user.tenant_id)
+
+@router.get("/", response_model=List[CustomerResponse], dependencies=if_changed)
 def get_customers(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener todos los clientes del tenant (requiere autenticación)"""
-    return customer_service.get_customers(db, current_user.tenant_id, skip, limit)
+    columns = select_fields(fields, customer_service.CUSTOMER_EXPORT_COLUMNS)
+    customers = customer_service.get_customer_rows(
+        db, current_user.tenant_id, skip, limit, decode_cursor(cursor), columns
+    )
+    set_next_cursor(response, customers, limit)
+    return json_rows_response(customers, columns, response)
+
+@router.get("/export")
+def export_customers(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Exportar todos los clientes del tenant en CSV o NDJSON (requiere autenticación)"""
+    stmt = customer_service.export_customers_query(current_user.tenant_id)
+    return stream_export(stmt, customer_service.CUSTOMER_EXPORT_COLUMNS, format, "clientes", current_user.tenant_id, request)
 
-@router.get("/{customer_id}", response_model=CustomerResponse)
+@router.get("/{customer_id}", response_model=CustomerResponse, dependencies=if_changed)
 def get_customer(
     customer_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener un cliente específico (requiere autenticación)"""
-    customer = customer_service.get_customer(db, customer_id, current_user.tenant_id)
+    columns = select_fields(fields, customer_service.CUSTOMER_EXPORT_COLUMNS)
+    customer = customer_service.get_customer_row(db, customer_id, current_user.tenant_id, columns)
     if not customer:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
-    return customer
+    return json_row_response(customer, columns, response)
 
 @router.put("/{customer_id}", response_model=CustomerResponse)
 def update_customer(
     customer_id: str,
+    response: Response,
     customer_update: CustomerUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Actualizar un cliente (requiere autenticación)"""
     customer = customer_service.update_customer(db, customer_id, customer_update, current_user.tenant_id)
     if not customer:
         raise HTTPException(status_code=404, detail="Cliente no encontrado")
-    return customer
+    return json_row_response(customer, customer_service.CUSTOMER_EXPORT_COLUMNS, response)
 
 @router.delete("/{customer_id}")
 def delete_customer(
     customer_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Eliminar un cliente (requiere autenticación)"""
     success = customer_service.delete_customer(db, customer_id, current_user.tenant_id)
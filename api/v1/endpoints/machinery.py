@@ -1,110 +1,194 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
+from app.core.replicas import get_read_db
 from app.schemas.machinery import (
     MachineryCreate, 
     MachineryUpdate, 
     MachineryResponse, 
     MachineryStats,
     MachineryAlert,
-    HorometerUpdate
+    HorometerUpdate,
+    MachineryReadingCreate,
+    ReadingBatchResult,
+    UtilizationReport
 )
-from app.services import machinery_service
-from app.core.security import get_current_active_user
-from app.models.user import User
+from datetime import datetime
+from app.schemas.bulk import BulkResult
+from app.services import machinery_service, telemetry_service, version_service
+from app.core.security import get_current_active_user, Principal
+from app.core.conditional import conditional_get
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.serialization import json_row_response, json_rows_response, select_fields, FIELDS_DESCRIPTION
+from app.core.bulk import bulk_body, bulk_openapi
+from app.core.export import stream_export, EXPORT_FORMAT_PATTERN
 
 router = APIRouter()
 
+# GET condicional (ETag / If-None-Match) sobre la versión del recurso del tenant
+if_changed = [Depends(conditional_get(version_service.MACHINERY))]
+
 @router.post("/", response_model=MachineryResponse, status_code=201)
 def create_machinery(
     machinery: MachineryCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Crear nueva maquinaria (requiere autenticación)"""
     return machinery_service.create_machinery(db, machinery, current_user.tenant_id)
 
-@router.get("/", response_model=List[MachineryResponse])
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(MachineryCreate))
+def bulk_upsert_machinery(
+    machinery_items: List[MachineryCreate] = Depends(bulk_body(MachineryCreate)),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Crear o actualizar maquinaria por código en lote, JSON o NDJSON (requiere autenticación)"""
+    return machinery_service.bulk_upsert_machinery(db, machinery_items, current_user.tenant_id)
+
+@router.post("/readings", response_model=ReadingBatchResult, openapi_extra=bulk_openapi(MachineryReadingCreate))
+def ingest_readings(
+    readings: List[MachineryReadingCreate] = Depends(bulk_body(MachineryReadingCreate)),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Ingesta por lotes de lecturas de horómetro/odómetro, JSON o NDJSON (requiere autenticación)"""
+    return telemetry_service.ingest_readings(db, readings, current_user.tenant_id)
+
+@router.get("/", response_model=List[MachineryResponse], dependencies=if_changed)
 def get_machinery_list(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     machinery_type: Optional[str] = Query(None),
     status: Optional[str] = Query(None),
     needs_maintenance: Optional[bool] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener lista de maquinaria del tenant (requiere autenticación)"""
-    return machinery_service.get_machinery_list(
+    columns = select_fields(fields, machinery_service.MACHINERY_EXPORT_COLUMNS)
+    machinery_list = machinery_service.get_machinery_rows(
         db, 
         current_user.tenant_id,
         skip, 
         limit, 
         machinery_type, 
         status, 
-        needs_maintenance
+        needs_maintenance,
+        decode_cursor(cursor),
+        columns
     )
+    set_next_cursor(response, machinery_list, limit)
+    return json_rows_response(machinery_list, columns, response)
+
+@router.get("/export")
+def export_machinery(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    machinery_type: Optional[str] = Query(None),
+    status: Optional[str] = Query(None),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Exportar toda la flota del tenant en CSV o NDJSON (requiere autenticación)"""
+    stmt = machinery_service.export_machinery_query(current_user.tenant_id, machinery_type, status)
+    return stream_export(stmt, machinery_service.MACHINERY_EXPORT_COLUMNS, format, "maquinaria", current_user.tenant_id, request)
 
-@router.get("/stats", response_model=MachineryStats)
+@router.get("/stats", response_model=MachineryStats, dependencies=if_changed)
 def get_machinery_stats(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener estadísticas de maquinaria del tenant (requiere autenticación)"""
     return machinery_service.get_machinery_stats(db, current_user.tenant_id)
 
-@router.get("/alerts", response_model=List[MachineryAlert])
+@router.get(
+    "/alerts",
+    response_model=List[MachineryAlert],
+    # Las alertas por fecha proyectada cambian con el reloj: el ETag se renueva cada hora
+    dependencies=[Depends(conditional_get(version_service.MACHINERY, bucket_seconds=3600))]
+)
 def get_maintenance_alerts(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    within_hours: Optional[float] = Query(None, ge=0),
+    within_days: Optional[float] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    """Obtener alertas de mantenimiento del tenant (requiere autenticación)"""
-    return machinery_service.get_maintenance_alerts(db, current_user.tenant_id)
+    """Obtener alertas de mantenimiento del tenant, con ventana de anticipación opcional (requiere autenticación)"""
+    return machinery_service.get_maintenance_alerts(
+        db, current_user.tenant_id, within_hours, within_days, limit
+    )
 
-@router.get("/{machinery_id}", response_model=MachineryResponse)
+@router.get("/utilization", response_model=UtilizationReport, dependencies=if_changed)
+def get_utilization(
+    start: datetime,
+    end: datetime,
+    bucket: str = Query("day", pattern="^(hour|day|week|total)$"),
+    group_by: str = Query("machinery", pattern="^(machinery|project)$"),
+    machinery_id: Optional[str] = Query(None),
+    project: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Horas trabajadas, km y tiempos muertos por máquina o proyecto (requiere autenticación)"""
+    if end <= start:
+        raise HTTPException(status_code=400, detail="El rango de fechas es inválido")
+    return telemetry_service.get_utilization(
+        db, current_user.tenant_id, start, end, bucket, group_by, machinery_id, project
+    )
+
+@router.get("/{machinery_id}", response_model=MachineryResponse, dependencies=if_changed)
 def get_machinery(
     machinery_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener una maquinaria específica (requiere autenticación)"""
-    machinery = machinery_service.get_machinery(db, machinery_id, current_user.tenant_id)
+    columns = select_fields(fields, machinery_service.MACHINERY_EXPORT_COLUMNS)
+    machinery = machinery_service.get_machinery_row(db, machinery_id, current_user.tenant_id, columns)
     if not machinery:
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
-    return machinery
+    return json_row_response(machinery, columns, response)
 
 @router.put("/{machinery_id}", response_model=MachineryResponse)
 def update_machinery(
     machinery_id: str,
+    response: Response,
     machinery_update: MachineryUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Actualizar maquinaria (requiere autenticación)"""
     machinery = machinery_service.update_machinery(db, machinery_id, machinery_update, current_user.tenant_id)
     if not machinery:
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
-    return machinery
+    return json_row_response(machinery, machinery_service.MACHINERY_EXPORT_COLUMNS, response)
 
 @router.patch("/{machinery_id}/horometer", response_model=MachineryResponse)
 def update_horometer(
     machinery_id: str,
+    response: Response,
     horometer_update: HorometerUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Actualizar horómetro de maquinaria (requiere autenticación)"""
     machinery = machinery_service.update_horometer(db, machinery_id, horometer_update, current_user.tenant_id)
     if not machinery:
         raise HTTPException(status_code=404, detail="Maquinaria no encontrada")
-    return machinery
+    return json_row_response(machinery, machinery_service.MACHINERY_EXPORT_COLUMNS, response)
 
 @router.delete("/{machinery_id}")
 def delete_machinery(
     machinery_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Eliminar maquinaria (soft delete) (requiere autenticación)"""
     success = machinery_service.delete_machinery(db, machinery_id, current_user.tenant_id)
@@ -1,72 +1,179 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse
-from app.services import product_service
-from app.core.security import get_current_active_user
-from app.models.user import User
+from app.core.replicas import get_read_db
+from app.schemas.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    LowStockProductResponse,
+    LowStockCategorySummary
+)
+from app.schemas.bulk import BulkResult
+from app.schemas.stock import (
+    StockMovementCreate,
+    StockMovementResponse,
+    StockMovementBatch,
+    StockMovementBatchResult
+)
+from app.services import product_service, stock_service, version_service
+from app.core.security import get_current_active_user, Principal
+from app.core.conditional import conditional_get
+from app.core.pagination import decode_cursor, set_next_cursor
+from app.core.serialization import json_row_response, json_rows_response, select_fields, FIELDS_DESCRIPTION
+from app.core.bulk import bulk_body, bulk_openapi
+from app.core.export import stream_export, EXPORT_FORMAT_PATTERN
 
 router = APIRouter()
 
+# GET condicional (ETag / If-None-Match) sobre la versión del recurso del tenant
+if_changed = [Depends(conditional_get(version_service.PRODUCTS))]
+
 @router.post("/", response_model=ProductResponse, status_code=201)
 def create_product(
     product: ProductCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Crear un nuevo producto (requiere autenticación)"""
-    return product_service.create_product(db, product, current_user.tenant_id)
+    return product_service.create_product(db, product, current_user.tenant_id, current_user.id)
+
+@router.post("/bulk", response_model=BulkResult, openapi_extra=bulk_openapi(ProductCreate))
+def bulk_upsert_products(
+    products: List[ProductCreate] = Depends(bulk_body(ProductCreate)),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Crear o actualizar productos por SKU en lote, JSON o NDJSON (requiere autenticación)"""
+    return product_service.bulk_upsert_products(db, products, current_user.tenant_id, current_user.id)
+
+@router.post("/movements", response_model=StockMovementBatchResult, status_code=201)
+def apply_stock_movements(
+    batch: StockMovementBatch,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Aplicar un lote de movimientos de stock en una sola transacción (requiere autenticación)"""
+    movements = stock_service.apply_movements(db, batch.movements, current_user.tenant_id, current_user.id)
+    return StockMovementBatchResult(applied=len(movements), movements=movements)
 
-@router.get("/", response_model=List[ProductResponse])
+@router.get("/", response_model=List[ProductResponse], dependencies=if_changed)
 def get_products(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
     category: Optional[str] = Query(None),
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener todos los productos del tenant (requiere autenticación)"""
-    return product_service.get_products(db, current_user.tenant_id, skip, limit, category)
+    columns = select_fields(fields, product_service.PRODUCT_EXPORT_COLUMNS)
+    products = product_service.get_product_rows(
+        db, current_user.tenant_id, skip, limit, category, decode_cursor(cursor), columns
+    )
+    set_next_cursor(response, products, limit)
+    return json_rows_response(products, columns, response)
+
+@router.get("/export")
+def export_products(
+    request: Request,
+    format: str = Query("csv", pattern=EXPORT_FORMAT_PATTERN),
+    category: Optional[str] = Query(None),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Exportar todo el catálogo del tenant en CSV o NDJSON (requiere autenticación)"""
+    stmt = product_service.export_products_query(current_user.tenant_id, category)
+    return stream_export(stmt, product_service.PRODUCT_EXPORT_COLUMNS, format, "productos", current_user.tenant_id, request)
 
-@router.get("/low-stock", response_model=List[ProductResponse])
+@router.get("/low-stock", response_model=List[LowStockProductResponse], dependencies=if_changed)
 def get_low_stock_products(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    limit: int = 100,
+    category: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Obtener productos con stock bajo y cantidad a reponer (requiere autenticación)"""
+    products = product_service.get_low_stock_products(
+        db, current_user.tenant_id, limit, category, decode_cursor(cursor)
+    )
+    set_next_cursor(response, products, limit)
+    return json_rows_response(products, product_service.LOW_STOCK_COLUMNS, response)
+
+@router.get("/low-stock/summary", response_model=List[LowStockCategorySummary], dependencies=if_changed)
+def get_low_stock_summary(
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
-    """Obtener productos con stock bajo (requiere autenticación)"""
-    return product_service.get_low_stock_products(db, current_user.tenant_id)
+    """Resumen de stock bajo por categoría (requiere autenticación)"""
+    return product_service.get_low_stock_summary(db, current_user.tenant_id)
 
-@router.get("/{product_id}", response_model=ProductResponse)
+@router.get("/{product_id}", response_model=ProductResponse, dependencies=if_changed)
 def get_product(
     product_id: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Obtener un producto específico (requiere autenticación)"""
-    product = product_service.get_product(db, product_id, current_user.tenant_id)
+    columns = select_fields(fields, product_service.PRODUCT_EXPORT_COLUMNS)
+    product = product_service.get_product_row(db, product_id, current_user.tenant_id, columns)
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return product
+    return json_row_response(product, columns, response)
+
+@router.post("/{product_id}/movements", response_model=StockMovementResponse, status_code=201)
+def apply_stock_movement(
+    product_id: str,
+    movement: StockMovementCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Registrar una entrada, salida o ajuste de stock (requiere autenticación)"""
+    return stock_service.apply_movement(db, product_id, movement, current_user.tenant_id, current_user.id)
+
+@router.get("/{product_id}/movements", response_model=List[StockMovementResponse], dependencies=if_changed)
+def get_stock_movements(
+    product_id: str,
+    response: Response,
+    limit: int = 100,
+    cursor: Optional[str] = Query(None),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Historial de movimientos de stock de un producto (requiere autenticación)"""
+    movements = stock_service.get_movements(
+        db, product_id, current_user.tenant_id, limit, decode_cursor(cursor)
+    )
+    set_next_cursor(response, movements, limit)
+    return movements
 
 @router.put("/{product_id}", response_model=ProductResponse)
 def update_product(
     product_id: str,
+    response: Response,
     product_update: ProductUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Actualizar un producto (requiere autenticación)"""
-    product = product_service.update_product(db, product_id, product_update, current_user.tenant_id)
+    product = product_service.update_product(
+        db, product_id, product_update, current_user.tenant_id, current_user.id
+    )
     if not product:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    return product
+    return json_row_response(product, product_service.PRODUCT_EXPORT_COLUMNS, response)
 
 @router.delete("/{product_id}")
 def delete_product(
     product_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: Principal = Depends(get_current_active_user)
 ):
     """Eliminar un producto (requiere autenticación)"""
     success = product_service.delete_product(db, product_id, current_user.tenant_id)
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List
+from app.core.replicas import get_read_db
+from app.schemas.product import ProductSearchHit
+from app.schemas.customer import CustomerSearchHit
+from app.services import search_service, version_service
+from app.core.security import get_current_active_user, Principal
+from app.core.conditional import conditional_get
+
+router = APIRouter()
+
+@router.get(
+    "/products",
+    response_model=List[ProductSearchHit],
+    dependencies=[Depends(conditional_get(version_service.PRODUCTS))]
+)
+def search_products(
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Buscar productos por nombre, SKU o descripción, por relevancia (requiere autenticación)"""
+    return search_service.search_products(db, current_user.tenant_id, q, skip, limit)
+
+@router.get(
+    "/customers",
+    response_model=List[CustomerSearchHit],
+    dependencies=[Depends(conditional_get(version_service.CUSTOMERS))]
+)
+def search_customers(
+    q: str = Query(..., min_length=2, max_length=100),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_active_user)
+):
+    """Buscar clientes por nombre, email o teléfono, por relevancia (requiere autenticación)"""
+    return search_service.search_customers(db, current_user.tenant_id, q, skip, limit)
\ No newline at end of file
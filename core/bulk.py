@@ -0,0 +1,53 @@
+import json
+import os
+from typing import Any, Callable, Dict, List, Type
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "50000"))
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def bulk_body(model: Type[BaseModel]) -> Callable:
+    """Dependency que lee un array JSON o NDJSON y lo valida en una sola pasada"""
+    adapter = TypeAdapter(List[model])
+
+    async def dependency(request: Request) -> List[model]:
+        body = await request.body()
+        content_type = request.headers.get("content-type", "")
+        try:
+            if content_type.startswith(NDJSON_MEDIA_TYPE):
+                raw = [json.loads(line) for line in body.splitlines() if line.strip()]
+                items = adapter.validate_python(raw)
+            else:
+                items = adapter.validate_json(body)
+        except ValidationError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=e.errors(include_url=False)
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cuerpo NDJSON inválido: {str(e)}"
+            )
+        if len(items) > BULK_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Máximo {BULK_MAX_ITEMS} elementos por lote"
+            )
+        return items
+
+    return dependency
+
+def bulk_openapi(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Documentar en OpenAPI el cuerpo que bulk_body lee a mano"""
+    schema = {"type": "array", "items": {"$ref": f"#/components/schemas/{model.__name__}"}}
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": schema},
+                NDJSON_MEDIA_TYPE: {"schema": {"$ref": f"#/components/schemas/{model.__name__}"}},
+            },
+        }
+    }
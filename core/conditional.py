@@ -0,0 +1,80 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Depends, Request, Response
+from sqlalchemy.orm import Session
+from app.core.replicas import get_read_db
+from app.core.security import get_current_active_user, Principal
+from app.services import version_service
+
+# Respuestas autenticadas: el navegador puede guardarlas pero debe revalidar siempre
+CACHE_CONTROL = "private, no-cache"
+
+class NotModified(Exception):
+    """Cortar la petición con un 304 antes de ejecutar el endpoint"""
+
+    def __init__(self, headers: Dict[str, str]):
+        self.headers = headers
+
+async def not_modified_handler(request: Request, exc: NotModified) -> Response:
+    return Response(status_code=304, headers=exc.headers)
+
+def make_etag(tenant_id: str, resource: str, version: int, extra: str = "") -> str:
+    """ETag débil: la misma URL con otro tenant nunca comparte valor"""
+    digest = hashlib.blake2b(f"{tenant_id}:{resource}:{version}:{extra}".encode(), digest_size=8).hexdigest()
+    return f'W/"{digest}"'
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Comparación débil (RFC 9110): se ignora el prefijo W/
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def _not_modified_since(header: Optional[str], updated_at: Optional[datetime]) -> bool:
+    if not header or updated_at is None:
+        return False
+    try:
+        since = parsedate_to_datetime(header).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return False
+    # Last-Modified tiene resolución de segundos
+    return updated_at.replace(microsecond=0) <= since
+
+def conditional_get(resource: str, bucket_seconds: Optional[int] = None):
+    """Dependencia de GET condicional sobre la versión del recurso del tenant.
+
+    Lee solo la fila de resource_versions: si el cliente ya tiene la versión
+    vigente responde 304 sin ejecutar la consulta del endpoint ni serializar
+    nada. bucket_seconds añade una ventana temporal al ETag para respuestas
+    que cambian con el reloj (p. ej. alertas por fecha proyectada).
+    La versión se lee en la misma sesión de lectura que el endpoint (FastAPI
+    comparte la dependencia), así que con réplicas el ETag nunca es más
+    nuevo que el cuerpo servido.
+    """
+    def dependency(
+        request: Request,
+        response: Response,
+        db: Session = Depends(get_read_db),
+        current_user: Principal = Depends(get_current_active_user)
+    ):
+        version, updated_at = version_service.get_version(db, current_user.tenant_id, resource)
+        extra = str(int(time.time() // bucket_seconds)) if bucket_seconds else ""
+        headers = {
+            "ETag": make_etag(current_user.tenant_id, resource, version, extra),
+            "Cache-Control": CACHE_CONTROL,
+        }
+        if updated_at is not None:
+            headers["Last-Modified"] = format_datetime(
+                updated_at.replace(microsecond=0, tzinfo=timezone.utc), usegmt=True
+            )
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            if _etag_matches(if_none_match, headers["ETag"]):
+                raise NotModified(headers)
+        elif not bucket_seconds and _not_modified_since(request.headers.get("if-modified-since"), updated_at):
+            raise NotModified(headers)
+        response.headers.update(headers)
+    return dependency
\ No newline at end of file
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+from typing import List
+
+# Identificadores "prefijo-<ulid>": 48 bits de milisegundos + 80 bits aleatorios
+# en base32 Crockford (26 caracteres). El prefijo mantiene los ids legibles y
+# el timestamp inicial hace que se ordenen por creación, de modo que las
+# inserciones caen al final del índice de la PK en vez de repartirse por él.
+# Minúsculas: el orden de los dígitos y letras es el mismo en collation C y
+# en las locales habituales de Postgres.
+_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+# Los 10 bits bajos (2 caracteres) tabulados: en un bloque es lo único que cambia
+_PAIRS = [a + b for a in _ALPHABET for b in _ALPHABET]
+
+TENANT = "tenant"
+USER = "user"
+CUSTOMER = "cust"
+PRODUCT = "prod"
+MACHINERY = "mach"
+STOCK_MOVEMENT = "mov"
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+def _reserve(count: int):
+    """Reservar `count` valores consecutivos; devuelve (ms, primer aleatorio).
+
+    Dentro del mismo milisegundo se continúa desde el último valor emitido,
+    así los ids del proceso son estrictamente crecientes aunque el reloj no
+    avance (o retroceda).
+    """
+    global _last_ms, _last_random
+    with _lock:
+        now = max(int(time.time() * 1000), _last_ms)
+        if now == _last_ms and _last_random + count <= _RANDOM_MAX:
+            first = _last_random + 1
+        else:
+            if now == _last_ms:
+                now += 1
+            # Dejar margen para que el bloque no desborde los 80 bits
+            first = int.from_bytes(os.urandom(10), "big") >> 1
+        _last_ms, _last_random = now, first + count - 1
+    return now, first
+
+def new_id(prefix: str) -> str:
+    """Id ordenable por tiempo con el prefijo dado (p. ej. "mach-01j9...")"""
+    ms, random_part = _reserve(1)
+    return f"{prefix}-{_encode(ms, 10)}{_encode(random_part, 16)}"
+
+def new_ids(prefix: str, count: int) -> List[str]:
+    """Bloque de `count` ids consecutivos con una sola reserva (cargas masivas)"""
+    if count <= 0:
+        return []
+    ms, first = _reserve(count)
+    head = f"{prefix}-{_encode(ms, 10)}"
+    out, high, middle = [], -1, ""
+    for value in range(first, first + count):
+        if value >> 10 != high:
+            high = value >> 10
+            middle = head + _encode(high, 14)
+        out.append(middle + _PAIRS[value & 1023])
+    return out
+
+def id_timestamp(value: str) -> float:
+    """Momento de creación (epoch en segundos) codificado en un id"""
+    encoded = value.rsplit("-", 1)[-1][:10]
+    ms = 0
+    for char in encoded:
+        ms = (ms << 5) | _ALPHABET.index(char)
+    return ms / 1000
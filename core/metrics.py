@@ -0,0 +1,270 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core import pool_metrics, slow_queries
+
+logger = logging.getLogger("app.metrics")
+
+# Sentencias SQL por petición a partir de las cuales se sospecha de un N+1
+STATEMENT_BUDGET = int(os.getenv("METRICS_STATEMENT_BUDGET", "10"))
+# Si se define, /metrics exige "Authorization: Bearer <token>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+UNMATCHED_ROUTE = "unmatched"
+UNKNOWN_PLAN = "none"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Histograma acumulativo estilo Prometheus, por combinación de etiquetas.
+
+    Como el resto de métricas en memoria es local al proceso: con varios
+    workers, Prometheus agrega las series de cada uno.
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [conteos por bucket (+Inf al final), suma]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(items):
+            base = _labels(self.labelnames, labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le=bound)} {cumulative}")
+            lines.append(f"{self.name}_sum{base} {total}")
+            lines.append(f"{self.name}_count{base} {cumulative}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        lines.extend(f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in items)
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence, **extra) -> str:
+    pairs = [*zip(names, values), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+_REQUEST_LABELS = ("method", "route", "plan")
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Latencia de la petición por plantilla de ruta", _REQUEST_LABELS, LATENCY_BUCKETS
+)
+request_db_time = Histogram(
+    "http_request_db_seconds", "Tiempo en la base de datos por petición", _REQUEST_LABELS, LATENCY_BUCKETS
+)
+request_statements = Histogram(
+    "http_request_db_statements", "Sentencias SQL por petición", _REQUEST_LABELS, STATEMENT_BUCKETS
+)
+response_size = Histogram(
+    "http_response_size_bytes", "Tamaño del cuerpo de la respuesta", _REQUEST_LABELS, SIZE_BUCKETS
+)
+requests_total = CounterMetric(
+    "http_requests_total", "Peticiones por ruta y código de estado", ("method", "route", "status", "plan")
+)
+statement_budget_exceeded = CounterMetric(
+    "http_requests_over_statement_budget_total",
+    f"Peticiones con más de {STATEMENT_BUDGET} sentencias SQL (posible N+1)",
+    ("method", "route")
+)
+
+
+@dataclass
+class RequestStats:
+    """Acumulador de una petición; lo comparten el middleware y los hooks de SQLAlchemy"""
+    plan: str = UNKNOWN_PLAN
+    statements: int = 0
+    db_seconds: float = 0.0
+    by_statement: Tally = field(default_factory=Tally)
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+def label_plan(plan: Optional[str]) -> None:
+    """Etiquetar la petición en curso con el plan del tenant (lo llama core.security)"""
+    stats = current_request.get()
+    if stats is not None and plan:
+        stats.plan = plan
+
+
+# Hooks globales: cubren el primario, las réplicas y el sync_engine del motor async,
+# y alimentan también el registro de consultas lentas (core.slow_queries).
+# Los engines se crean en el primer uso, por eso se escucha en la clase.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    slow_queries.recorder.observe(conn, statement, parameters, executemany, elapsed * 1000)
+    stats = current_request.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+        stats.by_statement[statement] += 1
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # Sin after_cursor_execute en los errores: no dejar la marca de inicio apilada
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_started"):
+        conn.info["metrics_started"].pop()
+
+
+class RequestMetricsMiddleware:
+    """Middleware ASGI: latencia, SQL y tamaño de respuesta por plantilla de ruta.
+
+    La ruta se etiqueta con su plantilla (/api/v1/machinery/{machinery_id}),
+    nunca con la URL concreta, para acotar el número de series.
+    """
+
+    def __init__(self, app, exclude: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = set(exclude)
+        self._templates: Optional[Dict[object, str]] = None
+
+    def _route_template(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        if self._templates is None:
+            self._templates = {
+                route.endpoint: route.path
+                for route in scope["app"].routes if getattr(route, "endpoint", None) is not None
+            }
+        return self._templates.get(endpoint, UNMATCHED_ROUTE)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        status, size = 500, 0
+        started = time.perf_counter()
+
+        async def measure(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, measure)
+        finally:
+            current_request.reset(token)
+            self._record(scope, stats, status, size, time.perf_counter() - started)
+
+    def _record(self, scope, stats: RequestStats, status: int, size: int, elapsed: float) -> None:
+        method, route = scope["method"], self._route_template(scope)
+        labels = (method, route, stats.plan)
+        request_duration.observe(labels, elapsed)
+        request_db_time.observe(labels, stats.db_seconds)
+        request_statements.observe(labels, stats.statements)
+        response_size.observe(labels, size)
+        requests_total.inc((method, route, status, stats.plan))
+        if stats.statements > STATEMENT_BUDGET:
+            statement_budget_exceeded.inc((method, route))
+            statement, repeats = stats.by_statement.most_common(1)[0]
+            logger.warning(
+                "Posible N+1 en %s %s: %d sentencias (presupuesto %d), la más repetida x%d: %s",
+                method, route, stats.statements, STATEMENT_BUDGET, repeats, " ".join(statement.split())[:300]
+            )
+
+
+def _pool_lines() -> List[str]:
+    stats = pool_metrics.pool_stats()
+    gauges = [
+        ("db_pool_size", "Conexiones permanentes del pool", "size"),
+        ("db_pool_connections_in_use", "Conexiones prestadas ahora", "in_use"),
+        ("db_pool_connections_idle", "Conexiones libres en el pool", "idle"),
+        ("db_pool_overflow", "Conexiones de overflow abiertas", "overflow"),
+    ]
+    counters = [
+        ("db_pool_checkouts_total", "Checkouts de conexión", "checkouts"),
+        ("db_pool_timeouts_total", "Checkouts que agotaron pool_timeout", "timeouts"),
+        ("db_pool_invalidations_total", "Conexiones invalidadas", "invalidations"),
+    ]
+    lines = []
+    for name, documentation, key in gauges:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} gauge"]
+        lines += [f'{name}{{pool="{_escape(s["pool"])}"}} {s[key]}' for s in stats]
+    for name, documentation, key in counters:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} counter"]
+        lines += [f'{name}{{pool="{_escape(s["pool"])}"}} {s[key]}' for s in stats]
+    name = "db_pool_checkout_wait_seconds"
+    lines += [f"# HELP {name} Espera para obtener una conexión del pool", f"# TYPE {name} histogram"]
+    for s in stats:
+        wait = s["wait_ms"]
+        for bound, cumulative in wait["buckets"].items():
+            le = bound if bound == "+Inf" else float(bound) / 1000
+            lines.append(f'{name}_bucket{{pool="{_escape(s["pool"])}",le="{le}"}} {cumulative}')
+        lines.append(f'{name}_sum{{pool="{_escape(s["pool"])}"}} {wait["total"] / 1000}')
+        lines.append(f'{name}_count{{pool="{_escape(s["pool"])}"}} {wait["count"]}')
+    return lines
+
+def render() -> str:
+    """Todas las métricas del proceso en formato de texto de Prometheus"""
+    lines: List[str] = []
+    for metric in (request_duration, request_db_time, request_statements, response_size,
+                   requests_total, statement_budget_exceeded):
+        lines.extend(metric.render())
+    lines.extend(_pool_lines())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,31 @@
+import base64
+import json
+from typing import Optional, Sequence
+from fastapi import HTTPException, Response
+
+# Las listas conservan su cuerpo (List[...Response]) por compatibilidad; el
+# cursor de la página siguiente viaja en esta cabecera.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: str) -> str:
+    """Cursor opaco a partir de la clave de orden (id) del último elemento"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str]) -> Optional[str]:
+    """Devolver el id a partir del cual continuar, o None si no hay cursor"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    if not isinstance(last_id, str):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+    return last_id
+
+def set_next_cursor(response: Response, items: Sequence, limit: int) -> None:
+    """Publicar el cursor siguiente si la página vino completa"""
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
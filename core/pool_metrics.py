@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Límites (ms) del histograma de espera para obtener una conexión del pool
+CHECKOUT_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+LIVENESS_PING = "ping"  # SELECT 1 en cada checkout (pool_pre_ping)
+LIVENESS_IDLE = "idle"  # SELECT 1 solo si la conexión estuvo ociosa más de N segundos
+LIVENESS_OFF = "off"    # sin comprobación: pool_recycle y la invalidación por error
+LIVENESS_MODES = (LIVENESS_PING, LIVENESS_IDLE, LIVENESS_OFF)
+
+_CHECKED_IN_AT = "checked_in_at"
+
+
+class PoolMetrics:
+    """Contadores y gauges de un pool, alimentados por sus eventos.
+
+    Los gauges (en uso, overflow, libres) se leen del pool en el momento de
+    pedir el snapshot; el resto se acumula desde el arranque del proceso.
+    """
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+        self.liveness_pings = 0
+        self.timeouts = 0
+        self.max_in_use = 0
+        self.wait_count = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.wait_buckets = [0] * (len(CHECKOUT_WAIT_BUCKETS_MS) + 1)
+
+    def observe_wait(self, elapsed_ms: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total_ms += elapsed_ms
+            self.wait_max_ms = max(self.wait_max_ms, elapsed_ms)
+            self.wait_buckets[bisect.bisect_left(CHECKOUT_WAIT_BUCKETS_MS, elapsed_ms)] += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        in_use = pool.checkedout()
+        cumulative, buckets = 0, {}
+        for bound, count in zip((*CHECKOUT_WAIT_BUCKETS_MS, "+Inf"), self.wait_buckets):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "pool": self.name,
+            "size": pool.size(),
+            "max_overflow": getattr(pool, "_max_overflow", None),
+            "in_use": in_use,
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_in_use": self.max_in_use,
+            "connects": self.connects,
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "invalidations": self.invalidations,
+            "liveness_pings": self.liveness_pings,
+            "timeouts": self.timeouts,
+            "wait_ms": {
+                "count": self.wait_count,
+                "total": round(self.wait_total_ms, 3),
+                "avg": round(self.wait_total_ms / self.wait_count, 3) if self.wait_count else 0.0,
+                "max": round(self.wait_max_ms, 3),
+                "buckets": buckets,
+            },
+        }
+
+
+class _MeasuredCheckout:
+    """Mide cuánto tarda pool.connect(): espera en la cola, conexión nueva y ping.
+
+    No hay evento de pool para el inicio del checkout, por eso el tiempo de
+    espera se toma aquí y el resto de contadores en los eventos.
+    """
+
+    metrics: Optional[PoolMetrics] = None
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_wait((time.perf_counter() - start) * 1000, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+        return conn
+
+    def recreate(self):
+        # engine.dispose() crea un pool nuevo de la misma clase: conservar las métricas
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class MeasuredQueuePool(_MeasuredCheckout, QueuePool):
+    pass
+
+
+class MeasuredAsyncQueuePool(_MeasuredCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+registry: List[PoolMetrics] = []
+
+def instrument(engine: Engine, name: str, liveness: str = LIVENESS_PING, ping_idle_seconds: float = 30.0) -> PoolMetrics:
+    """Registrar los eventos de métricas (y la comprobación por inactividad) en el pool del engine.
+
+    Para un AsyncEngine se pasa su sync_engine.
+    """
+    metrics = PoolMetrics(name, engine)
+    if isinstance(engine.pool, _MeasuredCheckout):
+        engine.pool.metrics = metrics
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, record):
+        metrics.connects += 1
+        record.info[_CHECKED_IN_AT] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, record, proxy):
+        if liveness == LIVENESS_IDLE:
+            idle_since = record.info.get(_CHECKED_IN_AT)
+            if idle_since is not None and time.monotonic() - idle_since > ping_idle_seconds:
+                metrics.liveness_pings += 1
+                try:
+                    engine.dialect.do_ping(dbapi_connection)
+                except Exception:
+                    # El pool descarta la conexión y reintenta con otra
+                    raise exc.DisconnectionError()
+        metrics.checkouts += 1
+        metrics.max_in_use = max(metrics.max_in_use, engine.pool.checkedout())
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, record):
+        metrics.checkins += 1
+        record.info[_CHECKED_IN_AT] = time.monotonic()
+
+    @event.listens_for(engine, "invalidate")
+    def _on_invalidate(dbapi_connection, record, exception):
+        metrics.invalidations += 1
+
+    registry.append(metrics)
+    return metrics
+
+def pool_stats() -> List[Dict[str, Any]]:
+    return [metrics.snapshot() for metrics in registry]
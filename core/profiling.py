@@ -0,0 +1,262 @@
+import contextvars
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter as Tally
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.security import OPERATOR_TOKEN, OPERATOR_TOKEN_HEADER, operator_token_valid
+
+# Intervalo entre muestras de pila del perfilador
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+# Perfiles que se conservan en el worker para descargarlos después
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+PROFILE_TTL_SECONDS = float(os.getenv("PROFILE_TTL_SECONDS", "3600"))
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_QUERY_PARAM = "profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+SERVER_TIMING_HEADER = "Server-Timing"
+
+_HEADER_KEY = PROFILE_HEADER.lower().encode("latin-1")
+_QUERY_KEY = f"{PROFILE_QUERY_PARAM}=".encode("latin-1")
+_OPERATOR_KEY = OPERATOR_TOKEN_HEADER.lower().encode("latin-1")
+_FALSE_VALUES = ("", "0", "false", "no")
+
+# Funciones de SQLAlchemy que envuelven la llamada al driver
+_DB_FUNCTIONS = {"do_execute", "do_execute_no_params", "do_executemany"}
+# Codificación de la respuesta: response_model, jsonable_encoder, orjson de core.serialization, render
+_SERIALIZATION_MODULES = ("fastapi.encoders", "app.core.serialization", "starlette.responses", "json")
+_SERIALIZATION_FUNCTIONS = {"serialize_response"}
+
+profiles = TTLCache(maxsize=PROFILE_KEEP, ttl=PROFILE_TTL_SECONDS)
+
+
+class RequestProfile:
+    """Perfil por muestreo de una sola petición.
+
+    Un hilo toma la pila de todos los hilos cada PROFILE_SAMPLE_INTERVAL_MS y
+    se queda con las que ejecutan esta petición: el event loop mientras corre
+    una de sus tareas y los hilos del threadpool donde FastAPI ejecuta los
+    endpoints síncronos. La pertenencia se decide por el contextvars.Context
+    con el que corre cada pila (el de la tarea o la copia que anyio pasa al
+    hilo), que contiene current_profile.
+
+    El tiempo de base de datos se toma medido de core.metrics; Python y
+    serialización se estiman con las muestras.
+    """
+
+    def __init__(self, method: str, path: str, interval: float):
+        self.id = secrets.token_hex(8)
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.started_at = datetime.now(timezone.utc)
+        self.status: Optional[int] = None
+        self.stacks: Tally = Tally()
+        self.samples = 0
+        self.python_seconds = 0.0
+        self.serialization_seconds = 0.0
+        self.driver_seconds = 0.0
+        self.db_seconds = 0.0
+        self.statements = 0
+        self.wall_seconds = 0.0
+        self._started = time.perf_counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name=f"profiler-{self.id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            # Con el GIL ocupado las muestras se retrasan: cada una pesa lo transcurrido
+            weight, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                stack = _owned_stack(frame, self)
+                if stack:
+                    self._record(stack, weight)
+
+    def _record(self, stack: Tuple[str, ...], weight: float) -> None:
+        self.samples += 1
+        self.stacks[stack] += weight
+        kind = _classify(stack)
+        if kind == "db":
+            self.driver_seconds += weight
+        elif kind == "serialization":
+            self.serialization_seconds += weight
+        else:
+            self.python_seconds += weight
+
+    def measure(self, request_stats: Optional[metrics.RequestStats], db_before: float, statements_before: int) -> None:
+        self.wall_seconds = time.perf_counter() - self._started
+        if request_stats is not None:
+            self.db_seconds = request_stats.db_seconds - db_before
+            self.statements = request_stats.statements - statements_before
+
+    def server_timing(self) -> str:
+        parts = [
+            ("total", self.wall_seconds),
+            ("python", self.python_seconds),
+            ("db", self.db_seconds),
+            ("serialization", self.serialization_seconds),
+        ]
+        return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in parts)
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, Any]]:
+        own, total = Tally(), Tally()
+        for stack, seconds in self.stacks.items():
+            own[stack[-1]] += seconds
+            for function in set(stack):
+                total[function] += seconds
+        return [
+            {"function": function, "self_ms": round(float(own[function]) * 1000, 2), "total_ms": round(seconds * 1000, 2)}
+            for function, seconds in total.most_common(limit)
+        ]
+
+    def summary(self, limit: int = 25) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "started_at": self.started_at.isoformat(),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "wall_ms": round(self.wall_seconds * 1000, 2),
+            "python_ms": round(self.python_seconds * 1000, 2),
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "db_statements": self.statements,
+            "db_sampled_ms": round(self.driver_seconds * 1000, 2),
+            "serialization_ms": round(self.serialization_seconds * 1000, 2),
+            "top": self.top_functions(limit),
+        }
+
+    def folded(self) -> str:
+        """Pilas en formato "collapsed" (flamegraph.pl, speedscope), peso en microsegundos"""
+        return "\n".join(
+            f"{';'.join(stack)} {max(int(seconds * 1_000_000), 1)}"
+            for stack, seconds in self.stacks.most_common()
+        ) + "\n"
+
+
+current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("current_profile", default=None)
+
+def _frame_context(frame) -> Optional[contextvars.Context]:
+    # WorkerThread.run de anyio ejecuta context.run(func); Handle._run de asyncio, self._context.run(...)
+    local_vars = frame.f_locals
+    context = local_vars.get("context")
+    if not isinstance(context, contextvars.Context):
+        context = getattr(local_vars.get("self"), "_context", None)
+    return context if isinstance(context, contextvars.Context) else None
+
+def _owned_stack(frame, profile: RequestProfile) -> Optional[Tuple[str, ...]]:
+    """Pila (de fuera hacia dentro) si el hilo está ejecutando la petición del perfil"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        if "context" in code.co_varnames or code.co_name == "_run":
+            context = _frame_context(frame)
+            if context is not None:
+                return tuple(reversed(labels)) if context.get(current_profile) is profile else None
+        labels.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+        frame = frame.f_back
+    return None
+
+def _classify(stack: Tuple[str, ...]) -> str:
+    for label in reversed(stack):
+        module, _, function = label.rpartition(":")
+        if function in _DB_FUNCTIONS or module.startswith("asyncpg"):
+            return "db"
+        if function in _SERIALIZATION_FUNCTIONS or module.startswith(_SERIALIZATION_MODULES):
+            return "serialization"
+    return "python"
+
+def _profile_requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == _HEADER_KEY:
+            return value.decode("latin-1").strip().lower() not in _FALSE_VALUES
+    if _QUERY_KEY in scope["query_string"]:
+        values = parse_qs(scope["query_string"].decode("latin-1")).get(PROFILE_QUERY_PARAM, [])
+        return any(value.strip().lower() not in _FALSE_VALUES for value in values)
+    return False
+
+def _operator_check(scope) -> Optional[Tuple[int, str]]:
+    """None si la petición trae la credencial de operación; si no, (código, detalle).
+
+    Va en X-Operator-Token: Authorization lleva el token del usuario con el
+    que se hace la petición perfilada.
+    """
+    if not OPERATOR_TOKEN:
+        return 403, "Perfilado deshabilitado (OPERATOR_TOKEN no configurado)"
+    token = dict(scope["headers"]).get(_OPERATOR_KEY, b"").decode("latin-1")
+    if not operator_token_valid(token):
+        return 401, f"El perfilado requiere {OPERATOR_TOKEN_HEADER}"
+    return None
+
+
+class ProfilingMiddleware:
+    """Perfilado bajo demanda: cabecera X-Profile: 1 o ?profile=1, con X-Operator-Token.
+
+    La respuesta lleva Server-Timing con el reparto total/python/db/
+    serialización y X-Profile-Id; el perfil completo (funciones y pilas) se
+    descarga de /admin/profiles/{id} en el mismo worker. Las peticiones sin la
+    marca solo pagan la comprobación de la cabecera y la query string.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profile_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        denied = _operator_check(scope)
+        if denied is not None:
+            status_code, detail = denied
+            await JSONResponse({"detail": detail}, status_code=status_code)(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope["method"], scope["path"], PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        request_stats = metrics.current_request.get()
+        db_before = request_stats.db_seconds if request_stats else 0.0
+        statements_before = request_stats.statements if request_stats else 0
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                # Las cabeceras salen antes que el cuerpo: en respuestas en streaming
+                # el Server-Timing cubre hasta aquí y el perfil guardado hasta el final
+                profile.status = message["status"]
+                profile.measure(request_stats, db_before, statements_before)
+                headers = MutableHeaders(scope=message)
+                headers.append(SERVER_TIMING_HEADER, profile.server_timing())
+                headers.append(PROFILE_ID_HEADER, profile.id)
+            await send(message)
+
+        token = current_profile.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            profile.stop()
+            profile.measure(request_stats, db_before, statements_before)
+            profiles.set(profile.id, profile)
@@ -0,0 +1,34 @@
+"""Retención del historial de lecturas: elimina particiones mensuales antiguas.
+
+    python -m app.core.reading_retention --before 2025-01-01
+
+Tarea de operación (cron o a mano) contra la base de DATABASE_URL, no un
+endpoint: afecta a las lecturas de todos los tenants. Los agregados
+horarios/diarios se conservan; solo se pierde el detalle de lecturas.
+"""
+import argparse
+from datetime import date
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--before", type=date.fromisoformat, required=True,
+        help="eliminar los meses completos anteriores a esta fecha (AAAA-MM-DD)"
+    )
+    args = parser.parse_args(argv)
+
+    from app.database import SessionLocal
+    from app.services import telemetry_service
+
+    db = SessionLocal()
+    try:
+        dropped = telemetry_service.drop_reading_partitions_before(db, args.before)
+    finally:
+        db.close()
+    for name in dropped:
+        print(name)
+    print(f"{len(dropped)} partición(es) eliminada(s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import itertools
+import math
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi import Depends, Request
+from starlette.datastructures import MutableHeaders
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.database import get_engine, get_replica_engines, ReadSessionLocal
+from app.core.cache import TTLCache
+from app.core.security import get_current_active_user, Principal
+
+# Tras una escritura, las lecturas del cliente y del tenant van al primario durante esta ventana
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DATABASE_READ_YOUR_WRITES_SECONDS", "5"))
+# Cada cuánto se vuelve a medir el retraso de una réplica
+LAG_CHECK_INTERVAL_SECONDS = 2.0
+# Retraso máximo admitido en una réplica; 0 desactiva la comprobación. Por
+# defecto el que deja, sumado a la antigüedad de la medición, dentro de la
+# ventana read-your-writes: pasada la ventana, la réplica ya tiene la escritura.
+REPLICA_MAX_LAG_SECONDS = float(os.getenv(
+    "DATABASE_REPLICA_MAX_LAG_SECONDS", str(max(READ_YOUR_WRITES_SECONDS - LAG_CHECK_INTERVAL_SECONDS, 1.0))
+))
+
+# Marca read-your-writes que lleva el cliente: instante (epoch) hasta el que
+# sus lecturas van al primario. Cookie para el navegador, cabecera para el resto.
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
+
+# Segundos de retraso de reproducción; 0 si está al día o no es un standby
+# (p. ej. una segunda base usada como réplica de prueba)
+_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+class ReplicaRouter:
+    """Elige el engine de cada sesión de lectura.
+
+    Reparte en round-robin entre las réplicas cuyo retraso medido no supera
+    max_lag y cae al primario si no queda ninguna. Tras una escritura las
+    lecturas van al primario durante la ventana read-your-writes: las del
+    cliente que escribió, con la marca que trae en cada petición (vale en
+    cualquier worker), y las del tenant en este proceso.
+    Los engines se piden a sus fábricas en el primer uso (arranque perezoso).
+    """
+
+    def __init__(
+        self,
+        primary: Callable[[], Engine],
+        replicas: Callable[[], List[Engine]],
+        max_lag: float = 0.0,
+        sticky_seconds: float = 5.0
+    ):
+        self._primary = primary
+        self._replicas = replicas
+        self.max_lag = max_lag
+        self.recent_writes = TTLCache(maxsize=10000, ttl=sticky_seconds)
+        self._lags: Dict[Engine, Tuple[float, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    @property
+    def primary(self) -> Engine:
+        return self._primary()
+
+    @property
+    def replicas(self) -> List[Engine]:
+        return self._replicas()
+
+    def note_write(self, tenant_id: str) -> None:
+        self.recent_writes.set(tenant_id, True)
+
+    def replica_lag(self, replica: Engine) -> Optional[float]:
+        """Retraso en segundos (cacheado unos instantes); None si la réplica no responde"""
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lags.get(replica, (None, None))
+            if checked_at is not None and now - checked_at < LAG_CHECK_INTERVAL_SECONDS:
+                return lag
+            # Reservar la medición: el resto de hilos sigue con el valor anterior
+            self._lags[replica] = (now, lag)
+        try:
+            with replica.connect() as conn:
+                lag = float(conn.execute(_LAG_SQL).scalar())
+        except Exception:
+            lag = None
+        with self._lock:
+            self._lags[replica] = (time.monotonic(), lag)
+        return lag
+
+    def _usable(self, replica: Engine) -> bool:
+        if not self.max_lag:
+            return True
+        lag = self.replica_lag(replica)
+        return lag is not None and lag <= self.max_lag
+
+    def engine_for_read(self, tenant_id: Optional[str] = None, wrote_until: Optional[float] = None) -> Engine:
+        replicas = self.replicas
+        if not replicas:
+            return self.primary
+        if wrote_until is not None and wrote_until > time.time():
+            return self.primary
+        if tenant_id is not None and self.recent_writes.get(tenant_id):
+            return self.primary
+        start = next(self._turn)
+        for offset in range(len(replicas)):
+            replica = replicas[(start + offset) % len(replicas)]
+            if self._usable(replica):
+                return replica
+        return self.primary
+
+    def status(self) -> List[dict]:
+        return [
+            {"replica": r.url.render_as_string(hide_password=True), "lag_seconds": self.replica_lag(r), "usable": self._usable(r)}
+            for r in self.replicas
+        ]
+
+
+read_router = ReplicaRouter(get_engine, get_replica_engines, REPLICA_MAX_LAG_SECONDS, READ_YOUR_WRITES_SECONDS)
+
+
+class _WriteMarker:
+    __slots__ = ("until",)
+
+    def __init__(self):
+        self.until: Optional[float] = None
+
+_current_write: ContextVar[Optional[_WriteMarker]] = ContextVar("current_write", default=None)
+
+def note_write(tenant_id: str) -> None:
+    """Registrar que el tenant escribió (lo llama version_service en cada commit)"""
+    read_router.note_write(tenant_id)
+    marker = _current_write.get()
+    # Sin réplicas todas las lecturas van al primario: no hace falta marca
+    if marker is not None and read_router.replicas:
+        marker.until = time.time() + READ_YOUR_WRITES_SECONDS
+
+def _client_write_marker(request: Request) -> Optional[float]:
+    value = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not value:
+        return None
+    try:
+        until = float(value)
+    except ValueError:
+        return None
+    # Una marca más allá de la ventana no la emitió este servidor
+    return until if until <= time.time() + READ_YOUR_WRITES_SECONDS else None
+
+def read_session(tenant_id: Optional[str] = None, wrote_until: Optional[float] = None) -> Session:
+    """Sesión para consultas de solo lectura, en una réplica si hay alguna utilizable"""
+    return ReadSessionLocal(bind=read_router.engine_for_read(tenant_id, wrote_until))
+
+# Dependency para endpoints de solo lectura (listados, estadísticas, búsquedas)
+def get_read_db(request: Request, current_user: Principal = Depends(get_current_active_user)):
+    db = read_session(current_user.tenant_id, _client_write_marker(request))
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class ReadYourWritesMiddleware:
+    """Devuelve la marca read-your-writes en las respuestas de peticiones que escribieron.
+
+    Va en cookie y en la cabecera X-Read-Your-Writes; get_read_db la lee en
+    cualquier worker, así que la siguiente lectura del cliente no depende de
+    caer en el mismo proceso que la escritura.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        marker = _WriteMarker()
+        token = _current_write.set(marker)
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and marker.until is not None:
+                value = f"{marker.until:.3f}"
+                headers = MutableHeaders(scope=message)
+                headers.append(READ_YOUR_WRITES_HEADER, value)
+                headers.append("set-cookie", (
+                    f"{READ_YOUR_WRITES_COOKIE}={value}; Max-Age={math.ceil(READ_YOUR_WRITES_SECONDS)}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                ))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            _current_write.reset(token)
@@ -1,18 +1,33 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 import hashlib
+import os
 import secrets
-from fastapi import Depends, HTTPException, status
+import threading
+import time
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.database import get_async_db
+from app.models.tenant import Tenant
 from app.models.user import User
 
 # Configuración
 SECRET_KEY = "tu_clave_super_secreta_cambiala_en_produccion_manus88"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 días
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAXSIZE = int(os.getenv("PRINCIPAL_CACHE_MAXSIZE", "10000"))
+# Credencial de operación (diagnóstico del proceso, perfilado): no es un rol
+# de tenant. Sin OPERATOR_TOKEN esos endpoints quedan deshabilitados.
+OPERATOR_TOKEN = os.getenv("OPERATOR_TOKEN")
+OPERATOR_TOKEN_HEADER = "X-Operator-Token"
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/login")
 
@@ -43,33 +58,154 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-# Dependency para obtener el usuario actual
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    credentials_exception = HTTPException(
+# Cache de usuarios autenticados
+@dataclass(frozen=True)
+class Principal:
+    """Snapshot mínimo del usuario autenticado que se guarda en cache"""
+    id: str
+    email: str
+    tenant_id: str
+    role: str
+    is_active: bool
+    tenant_plan: Optional[str] = None  # etiqueta de las métricas por petición
+
+    @classmethod
+    def from_user(cls, user: User, tenant_plan: Optional[str] = None) -> "Principal":
+        return cls(
+            id=user.id,
+            email=user.email,
+            tenant_id=user.tenant_id,
+            role=user.role,
+            is_active=user.is_active,
+            tenant_plan=tenant_plan
+        )
+
+@dataclass(frozen=True)
+class CachedPrincipal:
+    claims: dict
+    principal: Principal
+
+# Clave: el token completo. Cada entrada vive como máximo hasta el "exp" del token.
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAXSIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+# Cada invalidación avanza la época; una lectura de la base que empezó antes
+# no llega a guardar en la cache un usuario que ya cambió (ver cache_principal)
+_epoch = 0
+_epoch_lock = threading.Lock()
+
+_PENDING_KEY = "invalidated_principals"
+
+def principal_epoch() -> int:
+    return _epoch
+
+def invalidate_principal(user_id: str) -> int:
+    """Eliminar de la cache todas las sesiones de un usuario"""
+    global _epoch
+    with _epoch_lock:
+        _epoch += 1
+        return principal_cache.discard_where(lambda _, entry: entry.principal.id == user_id)
+
+# Cualquier cambio o borrado de un usuario vía ORM invalida sus entradas al
+# confirmarse la transacción: en el flush otra petición aún leería la fila
+# anterior y la volvería a guardar. Los UPDATE masivos (query.update /
+# update()) no disparan estos eventos y dependen del TTL.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_user_write(mapper, connection, target):
+    session = object_session(target)
+    if session is None:
+        invalidate_principal(target.id)
+    else:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session: Session) -> None:
+    for user_id in session.info.pop(_PENDING_KEY, ()):
+        invalidate_principal(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_writes(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-    
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise credentials_exception
-    return user
+        raise _credentials_exception()
+    if payload.get("sub") is None:
+        raise _credentials_exception()
+    return payload
+
+def cache_principal(token: str, claims: dict, principal: Principal, epoch: Optional[int] = None) -> None:
+    """Guardar el usuario leído; se descarta si hubo invalidaciones desde `epoch`"""
+    ttl = PRINCIPAL_CACHE_TTL_SECONDS
+    exp = claims.get("exp")
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    # Bajo el mismo lock que invalidate_principal: o se descarta aquí o allí
+    with _epoch_lock:
+        if epoch is not None and epoch != _epoch:
+            return
+        principal_cache.set(token, CachedPrincipal(claims=claims, principal=principal), ttl=ttl)
+
+# Dependency para obtener el usuario actual (sesión asyncpg: no bloquea el event loop)
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        metrics.label_plan(cached.principal.tenant_plan)
+        return cached.principal
+
+    claims = decode_token(token)
+    epoch = principal_epoch()
+    result = await db.execute(
+        select(User, Tenant.plan)
+        .outerjoin(Tenant, Tenant.id == User.tenant_id)
+        .where(User.email == claims["sub"])
+    )
+    row = result.first()
+    if row is None:
+        raise _credentials_exception()
+    principal = Principal.from_user(row.User, row.plan)
+    cache_principal(token, claims, principal, epoch)
+    metrics.label_plan(principal.tenant_plan)
+    return principal
 
 # Dependency para verificar si el usuario está activo
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: Principal = Depends(get_current_user)
+) -> Principal:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Usuario inactivo")
-    return current_user
\ No newline at end of file
+    return current_user
+
+# Dependency para endpoints de administración
+async def get_current_admin_user(
+    current_user: Principal = Depends(get_current_active_user)
+) -> Principal:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Se requiere rol de administrador")
+    return current_user
+
+def operator_token_valid(token: Optional[str]) -> bool:
+    return bool(OPERATOR_TOKEN) and bool(token) and secrets.compare_digest(token, OPERATOR_TOKEN)
+
+# Dependency para endpoints de operación: Authorization: Bearer <OPERATOR_TOKEN>
+def require_operator(authorization: Optional[str] = Header(None)) -> None:
+    if not OPERATOR_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Endpoints de operación deshabilitados (OPERATOR_TOKEN no configurado)"
+        )
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not operator_token_valid(token):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token de operación inválido")
@@ -0,0 +1,53 @@
+from typing import Iterable, List, Optional, Sequence
+import orjson
+from fastapi import HTTPException, Response
+
+JSON_MEDIA_TYPE = "application/json"
+# Descripción común del parámetro fields= en OpenAPI
+FIELDS_DESCRIPTION = "Columnas a devolver separadas por comas (p. ej. id,code,name); el id se incluye siempre"
+
+def select_fields(fields: Optional[str], allowed: Sequence[str]) -> List[str]:
+    """Columnas pedidas en fields=, validadas contra las del modelo de respuesta.
+
+    Se devuelven en el orden de `allowed` y siempre con el id (lo necesita el
+    cursor de paginación). Sin fields= se devuelven todas.
+    """
+    if not fields:
+        return list(allowed)
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(requested.difference(allowed))
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail={"message": "Campos desconocidos", "fields": unknown, "allowed": list(allowed)}
+        )
+    requested.add("id")
+    return [name for name in allowed if name in requested]
+
+def rows_to_json(rows: Iterable[Sequence], columns: Sequence[str]) -> bytes:
+    """Serializar filas proyectadas (tuplas en el orden de `columns`) a JSON.
+
+    orjson escribe directamente str/int/float/None, fechas en ISO 8601 y enums
+    por su valor, igual que la serialización de Pydantic de los modelos de
+    respuesta, pero sin instanciar ni validar un modelo por fila.
+    """
+    return orjson.dumps([dict(zip(columns, row)) for row in rows])
+
+def _json_response(content: bytes, response: Response) -> Response:
+    # FastAPI no copia las cabeceras que las dependencias dejaron en la
+    # Response inyectada (ETag, cursor...) cuando el endpoint devuelve otra
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return Response(content=content, media_type=JSON_MEDIA_TYPE, headers=headers)
+
+def json_rows_response(rows: Iterable[Sequence], columns: Sequence[str], response: Response) -> Response:
+    """Respuesta JSON ya serializada para un listado.
+
+    FastAPI no valida ni vuelve a serializar una Response devuelta por el
+    endpoint, así que el response_model de la ruta solo documenta el contrato
+    en OpenAPI.
+    """
+    return _json_response(rows_to_json(rows, columns), response)
+
+def json_row_response(row: Sequence, columns: Sequence[str], response: Response) -> Response:
+    """Igual que json_rows_response para un único elemento (detalle)"""
+    return _json_response(orjson.dumps(dict(zip(columns, row))), response)
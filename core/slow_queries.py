@@ -0,0 +1,267 @@
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import orjson
+
+# Sentencias más lentas que esto (ms) entran en el registro de consultas lentas
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+# Capturar EXPLAIN (ANALYZE, BUFFERS) de las consultas lentas: vuelve a ejecutar la sentencia
+SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+# Como mucho un EXPLAIN por huella en este intervalo...
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", "300"))
+# ...y no más de estos por minuto en todo el proceso
+SLOW_QUERY_EXPLAIN_PER_MINUTE = int(os.getenv("SLOW_QUERY_EXPLAIN_PER_MINUTE", "6"))
+# No repetir sentencias que ya tardaron más que esto: el EXPLAIN duplicaría la espera
+SLOW_QUERY_EXPLAIN_MAX_MS = float(os.getenv("SLOW_QUERY_EXPLAIN_MAX_MS", "5000"))
+# Consultas lentas recientes que se conservan (buffer circular)
+SLOW_QUERY_BUFFER = int(os.getenv("SLOW_QUERY_BUFFER", "200"))
+
+MAX_FINGERPRINTS = 1000  # huellas con estadísticas; se descarta la menos reciente
+DURATION_SAMPLES = 512   # últimas duraciones por huella para el p99
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+\b")
+_NUMBERS = re.compile(r"(?<![\w.$])-?\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_ROWS = re.compile(r"\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_DATA_MODIFYING = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE)\b", re.IGNORECASE)
+# Claves del plan que nombran nodos, tablas o índices: nunca llevan valores de la consulta
+_PLAN_STRUCTURAL_KEYS = frozenset({
+    "Node Type", "Relation Name", "Index Name", "Alias", "Schema", "CTE Name", "Subplan Name",
+    "Parent Relationship", "Strategy", "Join Type", "Scan Direction", "Partial Mode", "Operation",
+    "Sort Method", "Sort Space Type",
+})
+
+
+def normalize(statement: str) -> str:
+    """Sentencia sin literales ni parámetros: misma forma, misma huella.
+
+    Cada combinación de filtros de un listado (p. ej. get_machinery_list con
+    y sin machinery_type) produce un SQL distinto y por tanto su propia huella;
+    los valores, el tamaño de los IN y las filas de un VALUES no cuentan.
+    """
+    sql = _COMMENTS.sub(" ", statement)
+    sql = _STRINGS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _IN_LISTS.sub("IN (...)", sql)
+    sql = _VALUES_ROWS.sub(r"VALUES \1, ...", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+def strip_plan_literals(node):
+    """Plan de EXPLAIN (FORMAT JSON) sin literales en sus expresiones.
+
+    psycopg2 interpola los parámetros en el cliente, así que Filter, Index
+    Cond, Recheck Cond, Sort Key... llevan los valores de la petición (ids,
+    búsquedas) de cualquier tenant. Se sustituyen por ? como en normalize.
+    """
+    if isinstance(node, dict):
+        return {
+            key: value if key in _PLAN_STRUCTURAL_KEYS else strip_plan_literals(value)
+            for key, value in node.items()
+        }
+    if isinstance(node, list):
+        return [strip_plan_literals(value) for value in node]
+    if isinstance(node, str):
+        return _NUMBERS.sub("?", _STRINGS.sub("?", node))
+    return node
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> Tuple[str, str]:
+    """(huella, sentencia normalizada); cacheado porque el SQL compilado se repite"""
+    normalized = normalize(statement)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16], normalized
+
+def _service_caller() -> Optional[str]:
+    """Primera función de app.services en la pila (solo se busca en las consultas lentas)"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.services."):
+            return f"{module.rsplit('.', 1)[-1]}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class _FingerprintStats:
+    __slots__ = ("statement", "count", "total_ms", "max_ms", "slow", "durations", "source", "last_explain_at")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.slow = 0
+        self.durations: Deque[float] = deque(maxlen=DURATION_SAMPLES)
+        self.source: Optional[str] = None
+        self.last_explain_at: Optional[float] = None
+
+    def as_dict(self, fingerprint_id: str) -> Dict[str, Any]:
+        durations = list(self.durations)
+        return {
+            "fingerprint": fingerprint_id,
+            "statement": self.statement,
+            "source": self.source,
+            "count": self.count,
+            "slow": self.slow,
+            "total_ms": round(self.total_ms, 3),
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p99_ms": round(_percentile(durations, 0.99), 3) if durations else 0.0,
+            "max_ms": round(self.max_ms, 3),
+        }
+
+
+class SlowQueryRecorder:
+    """Estadísticas por huella de SQL y buffer circular de consultas lentas.
+
+    Lo alimenta el hook after_cursor_execute de core.metrics con la duración
+    ya medida. Todo es local al proceso y acotado: MAX_FINGERPRINTS huellas,
+    DURATION_SAMPLES duraciones por huella para el p99 y SLOW_QUERY_BUFFER
+    entradas recientes. Los parámetros de las sentencias no se guardan, ni
+    los literales de los planes capturados.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = SLOW_QUERY_MS,
+        explain: bool = SLOW_QUERY_EXPLAIN,
+        explain_interval: float = SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS,
+        explain_per_minute: int = SLOW_QUERY_EXPLAIN_PER_MINUTE,
+        buffer_size: int = SLOW_QUERY_BUFFER
+    ):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.explain_per_minute = explain_per_minute
+        self._stats: "OrderedDict[str, _FingerprintStats]" = OrderedDict()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self._explains: Deque[float] = deque()
+        self._lock = threading.Lock()
+        self.explains_captured = 0
+        self.explains_failed = 0
+
+    def observe(self, conn, statement: str, parameters, executemany: bool, elapsed_ms: float) -> None:
+        fingerprint_id, normalized = fingerprint(statement)
+        slow = elapsed_ms >= self.threshold_ms
+        with self._lock:
+            stats = self._stats.get(fingerprint_id)
+            if stats is None:
+                stats = self._stats[fingerprint_id] = _FingerprintStats(normalized)
+                while len(self._stats) > MAX_FINGERPRINTS:
+                    self._stats.popitem(last=False)
+            else:
+                self._stats.move_to_end(fingerprint_id)
+            stats.count += 1
+            stats.total_ms += elapsed_ms
+            stats.max_ms = max(stats.max_ms, elapsed_ms)
+            stats.durations.append(elapsed_ms)
+            if not slow:
+                return
+            stats.slow += 1
+            explain_reason = self._explain_skip_reason(stats, statement, executemany, elapsed_ms)
+
+        source = _service_caller()
+        plan = None
+        if explain_reason is None:
+            plan, explain_reason = self._capture_plan(conn, statement, parameters)
+        entry = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "fingerprint": fingerprint_id,
+            "duration_ms": round(elapsed_ms, 3),
+            "source": source,
+            "statement": normalized,
+            "plan": plan,
+            "plan_skipped": explain_reason,
+        }
+        with self._lock:
+            if source:
+                stats.source = source
+            self._recent.append(entry)
+
+    def _explain_skip_reason(self, stats: _FingerprintStats, statement: str, executemany: bool, elapsed_ms: float) -> Optional[str]:
+        """None si se puede capturar el plan; si no, el motivo (se llama con el lock tomado)"""
+        if not self.explain:
+            return "desactivado"
+        if executemany or not _EXPLAINABLE.match(statement) or _DATA_MODIFYING.search(statement):
+            # ANALYZE ejecuta la sentencia: solo lecturas
+            return "no es una lectura"
+        if elapsed_ms > SLOW_QUERY_EXPLAIN_MAX_MS:
+            return "demasiado lenta para repetirla"
+        now = time.monotonic()
+        if stats.last_explain_at is not None and now - stats.last_explain_at < self.explain_interval:
+            return "huella con plan reciente"
+        while self._explains and now - self._explains[0] > 60:
+            self._explains.popleft()
+        if len(self._explains) >= self.explain_per_minute:
+            return "límite de planes por minuto"
+        stats.last_explain_at = now
+        self._explains.append(now)
+        return None
+
+    def _capture_plan(self, conn, statement: str, parameters):
+        """EXPLAIN (ANALYZE, BUFFERS) en la misma conexión y transacción.
+
+        Va por un cursor DBAPI, así que no dispara los hooks de SQLAlchemy, y
+        dentro de un SAVEPOINT: si falla, la transacción de la petición sigue
+        utilizable.
+        """
+        sql = "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                if parameters:
+                    cursor.execute(sql, parameters)
+                else:
+                    cursor.execute(sql)
+                plan = cursor.fetchone()[0]
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+            except Exception:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+        except Exception as exc:
+            self.explains_failed += 1
+            return None, f"error: {exc.__class__.__name__}"
+        finally:
+            cursor.close()
+        self.explains_captured += 1
+        if isinstance(plan, (str, bytes)):
+            plan = orjson.loads(plan)
+        return strip_plan_literals(plan), None
+
+    def fingerprints(self, order_by: str = "total_ms", limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [stats.as_dict(fingerprint_id) for fingerprint_id, stats in self._stats.items()]
+        items.sort(key=lambda item: item[order_by], reverse=True)
+        return items[:limit]
+
+    def recent(self, fingerprint_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._recent)
+        entries.reverse()
+        if fingerprint_id:
+            entries = [entry for entry in entries if entry["fingerprint"] == fingerprint_id]
+        return entries[:limit]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+            self._explains.clear()
+
+
+recorder = SlowQueryRecorder()
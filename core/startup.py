@@ -0,0 +1,87 @@
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, FrozenSet
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.exc import ProgrammingError
+
+logger = logging.getLogger("app.startup")
+
+# check: comparar la revisión de Alembic de la base con la de las migraciones
+# create: create_all como antes (solo desarrollo; no aplica migraciones)
+# skip: no tocar la base al arrancar
+SCHEMA_STARTUP = os.getenv("SCHEMA_STARTUP", "check")
+SCHEMA_STARTUP_MODES = ("check", "create", "skip")
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations" / "versions"
+
+_REVISION = re.compile(r"^revision\b[^=]*=\s*['\"]([^'\"]+)['\"]", re.MULTILINE)
+_DOWN_REVISION = re.compile(r"^down_revision\b[^=]*=\s*(.+)$", re.MULTILINE)
+
+# Milisegundos de cada fase del arranque del worker (importación, esquema, OpenAPI)
+timings: Dict[str, float] = {}
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def migration_heads() -> FrozenSet[str]:
+    """Revisiones head de migrations/versions, leídas del texto de los scripts.
+
+    Evita cargar Alembic y ejecutar cada módulo de migración solo para saber
+    cuál es la última; el resultado se calcula una vez por proceso.
+    """
+    revisions, parents = set(), set()
+    for script in MIGRATIONS_DIR.glob("*.py"):
+        source = script.read_text(encoding="utf-8")
+        revision = _REVISION.search(source)
+        if revision is None:
+            continue
+        revisions.add(revision.group(1))
+        down = _DOWN_REVISION.search(source)
+        if down:
+            parents.update(re.findall(r"['\"]([^'\"]+)['\"]", down.group(1)))
+    return frozenset(revisions - parents)
+
+def check_schema(engine) -> None:
+    """Una sola consulta a alembic_version, sin reflejar tablas"""
+    expected = migration_heads()
+    try:
+        with engine.connect() as conn:
+            current = frozenset(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+    except ProgrammingError:
+        current = frozenset()
+    if current != expected:
+        raise SchemaOutOfDate(
+            f"Esquema en revisión {', '.join(sorted(current)) or 'ninguna'}, se esperaba "
+            f"{', '.join(sorted(expected))}: ejecutar `alembic upgrade head`"
+        )
+
+def _timed(phase: str, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    timings[phase] = round((time.perf_counter() - start) * 1000, 2)
+
+def prepare(app: FastAPI) -> None:
+    """Arranque del worker: comprobar el esquema y precalcular el OpenAPI"""
+    from app.database import Base, get_engine
+
+    if SCHEMA_STARTUP not in SCHEMA_STARTUP_MODES:
+        raise ValueError(f"SCHEMA_STARTUP debe ser uno de {', '.join(SCHEMA_STARTUP_MODES)}")
+    if SCHEMA_STARTUP == "check":
+        _timed("schema_check_ms", lambda: check_schema(get_engine()))
+    elif SCHEMA_STARTUP == "create":
+        from app import models  # noqa: F401  (registra todas las tablas en Base.metadata)
+        _timed("schema_create_ms", lambda: Base.metadata.create_all(bind=get_engine()))
+    # app.openapi() memoriza el esquema: /docs y /openapi.json no lo generan en la primera petición
+    _timed("openapi_ms", app.openapi)
+    logger.info(
+        "Arranque listo: %s",
+        ", ".join(f"{phase}={value}" for phase, value in timings.items())
+    )
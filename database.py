@@ -1,37 +1,158 @@
 import os
+import threading
 from pathlib import Path
 from urllib.parse import quote_plus
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from app.core import pool_metrics
 
 # Buscar el .env en la carpeta backend (dos niveles arriba de este archivo)
 env_path = Path(__file__).parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
-# Leemos la URL del .env
-raw_url = os.getenv("DATABASE_URL")
+# Los engines se crean en el primer uso (get_engine, get_async_engine,
+# get_replica_engines): importar la aplicación no lee DATABASE_URL ni
+# prepara dialectos, y un worker que arranca no paga nada hasta la primera
+# consulta. `engine`, `async_engine`, `replica_engines` y `DATABASE_URL`
+# siguen disponibles como atributos del módulo (ver __getattr__).
 
-if not raw_url:
-    raise ValueError("DATABASE_URL no está configurada en el archivo .env")
+def _safe_url(url: str, driver: str) -> str:
+    """Re-armar la URL con el driver dado y la contraseña codificada"""
+    head, tail      = url.strip().rsplit("@", 1)
+    proto_user_pass = head.split("://")[1]
+    user, password  = proto_user_pass.split(":", 1)
+    return f"postgresql+{driver}://{user}:{quote_plus(password)}@{tail}"
 
-# Separamos partes para codificar la contraseña
-head, tail      = raw_url.rsplit("@", 1)
-proto_user_pass = head.split("://")[1]
-user, password  = proto_user_pass.split(":", 1)
-password_coded  = quote_plus(password)
+def _raw_url() -> str:
+    # Leemos la URL del .env
+    raw_url = os.getenv("DATABASE_URL")
+    if not raw_url:
+        raise ValueError("DATABASE_URL no está configurada en el archivo .env")
+    return raw_url
 
-# Re-armamos la URL segura
-DATABASE_URL = f"postgresql+psycopg2://{user}:{password_coded}@{tail}"
+# Pool por proceso: con N workers de uvicorn el máximo de conexiones al
+# servidor es N * (POOL_SIZE + MAX_OVERFLOW) por engine.
+POOL_SIZE             = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+MAX_OVERFLOW          = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_SECONDS  = float(os.getenv("DATABASE_POOL_TIMEOUT", "30"))
+POOL_RECYCLE_SECONDS  = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))
+# ping (SELECT 1 en cada checkout), idle (solo tras POOL_PING_IDLE_SECONDS
+# sin uso) u off (confiar en recycle y en la invalidación por error)
+POOL_LIVENESS           = os.getenv("DATABASE_POOL_LIVENESS", pool_metrics.LIVENESS_PING)
+POOL_PING_IDLE_SECONDS  = float(os.getenv("DATABASE_POOL_PING_IDLE_SECONDS", "30"))
 
-engine       = create_engine(DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _pool_options(poolclass) -> dict:
+    if POOL_LIVENESS not in pool_metrics.LIVENESS_MODES:
+        raise ValueError(f"DATABASE_POOL_LIVENESS debe ser uno de {', '.join(pool_metrics.LIVENESS_MODES)}")
+    return {
+        "poolclass": poolclass,
+        "pool_size": POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT_SECONDS,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": POOL_LIVENESS == pool_metrics.LIVENESS_PING,
+    }
+
+def _instrumented_engine(url: str, name: str, **kwargs):
+    created = create_engine(url, **_pool_options(pool_metrics.MeasuredQueuePool), **kwargs)
+    pool_metrics.instrument(created, name, POOL_LIVENESS, POOL_PING_IDLE_SECONDS)
+    return created
+
+_engines: dict = {}
+_engines_lock = threading.Lock()
+
+def _lazy(name: str, factory):
+    created = _engines.get(name)
+    if created is None:
+        with _engines_lock:
+            created = _engines.get(name)
+            if created is None:
+                created = _engines[name] = factory()
+    return created
+
+def get_engine():
+    return _lazy("primary", lambda: _instrumented_engine(_safe_url(_raw_url(), "psycopg2"), "primary"))
+
+def get_replica_engines():
+    """Réplicas de lectura opcionales (mismo formato que DATABASE_URL, separadas
+    por comas). Sin réplicas, las lecturas van al primario como siempre; el
+    reparto y el control de retraso están en app.core.replicas.
+    """
+    def build():
+        urls = [url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+        # connect_timeout: una réplica caída no debe bloquear las lecturas que caen al primario
+        return [
+            _instrumented_engine(_safe_url(url, "psycopg2"), f"replica-{index}", connect_args={"connect_timeout": 5})
+            for index, url in enumerate(urls)
+        ]
+    return _lazy("replicas", build)
+
+def get_async_engine():
+    """Motor asíncrono (asyncpg) para dependencias y servicios async"""
+    def build():
+        created = create_async_engine(
+            _safe_url(_raw_url(), "asyncpg"), **_pool_options(pool_metrics.MeasuredAsyncQueuePool)
+        )
+        pool_metrics.instrument(created.sync_engine, "async", POOL_LIVENESS, POOL_PING_IDLE_SECONDS)
+        return created
+    return _lazy("async", build)
+
+_LAZY_ATTRIBUTES = {
+    "engine": get_engine,
+    "replica_engines": get_replica_engines,
+    "async_engine": get_async_engine,
+    "DATABASE_URL": lambda: _safe_url(_raw_url(), "psycopg2"),
+    "ASYNC_DATABASE_URL": lambda: _safe_url(_raw_url(), "asyncpg"),
+}
+
+def __getattr__(name: str):
+    # Compatibilidad con `from app.database import engine` (crea el engine en ese momento)
+    if name in _LAZY_ATTRIBUTES:
+        return _LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazyBindMixin:
+    """Fábrica de sesiones que resuelve su engine al crear la primera sesión"""
+
+    def __init__(self, engine_factory, **kw):
+        super().__init__(**kw)
+        self._engine_factory = engine_factory
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=self._engine_factory())
+        return super().__call__(**local_kw)
+
+
+class _LazySessionmaker(_LazyBindMixin, sessionmaker):
+    pass
+
+
+class _LazyAsyncSessionmaker(_LazyBindMixin, async_sessionmaker):
+    pass
+
+
+SessionLocal = _LazySessionmaker(get_engine, autocommit=False, autoflush=False)
 Base         = declarative_base()
 
+# Sin bind fijo: cada sesión de lectura recibe el engine elegido al crearla
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+# expire_on_commit=False: tras el commit los objetos siguen legibles sin
+# lazy-loads implícitos, que no están permitidos fuera de un await.
+AsyncSessionLocal = _LazyAsyncSessionmaker(get_async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
@@ -1,17 +1,38 @@
-from fastapi import FastAPI
+import time
+
+# Inicio de la importación de la aplicación (se informa en core.startup.timings)
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine, Base
-from app.api.v1.endpoints import customers, products, machinery, auth
+from fastapi.responses import Response
+from typing import Optional
+from app.core import metrics, profiling, replicas, startup
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.conditional import NotModified, not_modified_handler
+from app.api.v1.endpoints import customers, products, machinery, auth, admin, search
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Comprobación del esquema contra Alembic (sin create_all ni reflexión) y OpenAPI precalculado
+    startup.prepare(app)
+    yield
 
 app = FastAPI(
     title="MANUS88 API",
     description="ERP especializado en construcción y minería con IA",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Perfilado bajo demanda con token de operación (core.profiling); va por dentro de las
+# métricas para tomar de ellas el tiempo de base de datos de la petición
+app.add_middleware(profiling.ProfilingMiddleware)
+
+# Marca read-your-writes para el cliente tras una escritura (core.replicas)
+app.add_middleware(replicas.ReadYourWritesMiddleware)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -19,13 +40,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER, "ETag", "Last-Modified",
+        profiling.SERVER_TIMING_HEADER, profiling.PROFILE_ID_HEADER,
+        replicas.READ_YOUR_WRITES_HEADER
+    ],
 )
 
+# Latencia, SQL y tamaño de respuesta por ruta (core.metrics); al añadirse
+# después de CORS envuelve toda la pila
+app.add_middleware(metrics.RequestMetricsMiddleware)
+
+# 304 Not Modified de los GET condicionales (core.conditional)
+app.add_exception_handler(NotModified, not_modified_handler)
+
 # Incluir routers
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Autenticación"])
 app.include_router(customers.router, prefix="/api/v1/customers", tags=["Clientes"])
 app.include_router(products.router, prefix="/api/v1/products", tags=["Productos"])
 app.include_router(machinery.router, prefix="/api/v1/machinery", tags=["Maquinaria"])
+app.include_router(search.router, prefix="/api/v1/search", tags=["Búsqueda"])
+app.include_router(admin.router, prefix="/api/v1/admin", tags=["Administración"])
 
 @app.get("/")
 def root():
@@ -37,4 +72,13 @@ def root():
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(authorization: Optional[str] = Header(None)):
+    """Métricas del worker en formato de texto de Prometheus"""
+    if metrics.METRICS_TOKEN and authorization != f"Bearer {metrics.METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return Response(content=metrics.render(), media_type=metrics.PROMETHEUS_MEDIA_TYPE)
+
+startup.timings["import_ms"] = round((time.perf_counter() - _import_started) * 1000, 2)
\ No newline at end of file
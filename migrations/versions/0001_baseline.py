@@ -0,0 +1,136 @@
+"""Esquema inicial (el que creaba Base.metadata.create_all)
+
+Las bases de datos creadas antes de usar Alembic ya tienen estas tablas:
+marcarlas con `alembic stamp 0001` y después `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MACHINERY_TYPES = (
+    'EXCAVADORA', 'CARGADOR', 'BULLDOZER', 'RETROEXCAVADORA', 'GRUA',
+    'COMPACTADORA', 'MOTONIVELADORA', 'CAMION_VOLQUETE', 'PERFORADORA', 'OTRO',
+)
+MACHINERY_STATUSES = ('OPERATIVO', 'EN_MANTENIMIENTO', 'FUERA_DE_SERVICIO', 'EN_REPARACION')
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tenants',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('domain', sa.String(), nullable=True),
+        sa.Column('plan', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('domain'),
+    )
+    op.create_index('ix_tenants_id', 'tenants', ['id'])
+
+    op.create_table(
+        'users',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=False),
+        sa.Column('password_hash', sa.String(), nullable=False),
+        sa.Column('full_name', sa.String(), nullable=False),
+        sa.Column('role', sa.String(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_index('ix_users_id', 'users', ['id'])
+
+    op.create_table(
+        'customers',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('phone', sa.String(), nullable=True),
+        sa.Column('address', sa.String(), nullable=True),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_customers_id', 'customers', ['id'])
+
+    op.create_table(
+        'products',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('sku', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('price', sa.Float(), nullable=True),
+        sa.Column('cost', sa.Float(), nullable=True),
+        sa.Column('stock_min', sa.Integer(), nullable=True),
+        sa.Column('stock_max', sa.Integer(), nullable=True),
+        sa.Column('stock_current', sa.Integer(), nullable=True),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('sku'),
+    )
+    op.create_index('ix_products_id', 'products', ['id'])
+
+    op.create_table(
+        'machinery',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('brand', sa.String(), nullable=True),
+        sa.Column('model', sa.String(), nullable=True),
+        sa.Column('serial_number', sa.String(), nullable=True),
+        sa.Column('year', sa.Integer(), nullable=True),
+        sa.Column('machinery_type', sa.Enum(*MACHINERY_TYPES, name='machinerytype'), nullable=False),
+        sa.Column('status', sa.Enum(*MACHINERY_STATUSES, name='machinerystatus'), nullable=True),
+        sa.Column('current_location', sa.String(), nullable=True),
+        sa.Column('current_project', sa.String(), nullable=True),
+        sa.Column('horometer', sa.Float(), nullable=True),
+        sa.Column('odometer', sa.Float(), nullable=True),
+        sa.Column('operator_name', sa.String(), nullable=True),
+        sa.Column('operator_id', sa.String(), nullable=True),
+        sa.Column('next_maintenance_hours', sa.Float(), nullable=True),
+        sa.Column('maintenance_interval_hours', sa.Float(), nullable=True),
+        sa.Column('last_maintenance_date', sa.Date(), nullable=True),
+        sa.Column('acquisition_cost', sa.Float(), nullable=True),
+        sa.Column('hourly_rate', sa.Float(), nullable=True),
+        sa.Column('fuel_consumption_rate', sa.Float(), nullable=True),
+        sa.Column('capacity', sa.String(), nullable=True),
+        sa.Column('engine_power', sa.String(), nullable=True),
+        sa.Column('weight', sa.Float(), nullable=True),
+        sa.Column('plate_number', sa.String(), nullable=True),
+        sa.Column('is_available', sa.Boolean(), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('code'),
+    )
+    op.create_index('ix_machinery_id', 'machinery', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('machinery')
+    op.drop_table('products')
+    op.drop_table('customers')
+    op.drop_table('users')
+    op.drop_table('tenants')
+    sa.Enum(name='machinerystatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='machinerytype').drop(op.get_bind(), checkfirst=True)
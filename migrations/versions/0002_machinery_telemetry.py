@@ -0,0 +1,89 @@
+"""Historial de lecturas particionado, agregados de uso y cola de mantenimiento
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+from datetime import date
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _usage_table(name: str) -> None:
+    op.create_table(
+        name,
+        sa.Column('machinery_id', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('project', sa.String(), nullable=True),
+        sa.Column('hours_worked', sa.Float(), nullable=False),
+        sa.Column('km_travelled', sa.Float(), nullable=False),
+        sa.Column('idle_hours', sa.Float(), nullable=False),
+        sa.Column('readings_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['machinery_id'], ['machinery.id'], onupdate='CASCADE'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('machinery_id', 'bucket_start'),
+    )
+
+
+def upgrade() -> None:
+    op.add_column('machinery', sa.Column('last_reading_at', sa.DateTime(), nullable=True))
+    op.add_column('machinery', sa.Column('usage_hours_per_day', sa.Float(), nullable=True))
+    op.add_column('machinery', sa.Column('projected_maintenance_at', sa.DateTime(), nullable=True))
+    op.create_index(
+        'ix_machinery_maintenance_due', 'machinery',
+        ['tenant_id', sa.text('(next_maintenance_hours - horometer)')],
+        postgresql_where=sa.text('is_active = true AND next_maintenance_hours IS NOT NULL'),
+    )
+    op.create_index(
+        'ix_machinery_projected_maintenance', 'machinery',
+        ['tenant_id', 'projected_maintenance_at'],
+        postgresql_where=sa.text('is_active = true AND projected_maintenance_at IS NOT NULL'),
+    )
+
+    op.create_table(
+        'machinery_readings',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('machinery_id', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('recorded_at', sa.DateTime(), nullable=False),
+        sa.Column('horometer', sa.Float(), nullable=False),
+        sa.Column('odometer', sa.Float(), nullable=True),
+        sa.Column('operator_name', sa.String(), nullable=True),
+        sa.Column('received_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['machinery_id'], ['machinery.id'], onupdate='CASCADE'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id', 'recorded_at'),
+        postgresql_partition_by='RANGE (recorded_at)',
+    )
+    # Partición del mes en curso; las siguientes las crea la ingesta
+    month = date.today().replace(day=1)
+    next_month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+    op.execute(
+        f"CREATE TABLE machinery_readings_p{month:%Y%m} PARTITION OF machinery_readings "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{next_month.isoformat()}')"
+    )
+
+    _usage_table('machinery_usage_hourly')
+    _usage_table('machinery_usage_daily')
+
+
+def downgrade() -> None:
+    op.drop_table('machinery_usage_daily')
+    op.drop_table('machinery_usage_hourly')
+    op.drop_table('machinery_readings')
+    op.drop_index('ix_machinery_projected_maintenance', table_name='machinery')
+    op.drop_index('ix_machinery_maintenance_due', table_name='machinery')
+    op.drop_column('machinery', 'projected_maintenance_at')
+    op.drop_column('machinery', 'usage_hours_per_day')
+    op.drop_column('machinery', 'last_reading_at')
@@ -0,0 +1,56 @@
+"""Índices compuestos y parciales por tenant para las consultas de services/
+
+Todas las consultas filtran por tenant_id y ordenan por id (paginación
+keyset), así que tenant_id va primero e id al final. Los de maquinaria son
+parciales sobre is_active porque las bajas son lógicas. Se crean con
+CONCURRENTLY para no bloquear escrituras en tablas ya pobladas.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    # (nombre, tabla, columnas, predicado parcial)
+    ('ix_customers_tenant_id', 'customers', ['tenant_id', 'id'], None),
+    ('ix_products_tenant_id', 'products', ['tenant_id', 'id'], None),
+    ('ix_products_tenant_category', 'products', ['tenant_id', 'category', 'id'], None),
+    ('ix_products_tenant_low_stock', 'products', ['tenant_id', 'category', 'id'], 'stock_current <= stock_min'),
+    ('ix_machinery_tenant_active', 'machinery', ['tenant_id', 'id'], 'is_active = true'),
+    ('ix_machinery_tenant_status', 'machinery', ['tenant_id', 'status', 'id'], 'is_active = true'),
+    ('ix_machinery_tenant_type', 'machinery', ['tenant_id', 'machinery_type', 'id'], 'is_active = true'),
+    ('ix_machinery_usage_hourly_tenant', 'machinery_usage_hourly', ['tenant_id', 'bucket_start'], None),
+    ('ix_machinery_usage_daily_tenant', 'machinery_usage_daily', ['tenant_id', 'bucket_start'], None),
+]
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+    # Tabla particionada: CONCURRENTLY no está soportado en el padre
+    op.create_index('ix_machinery_readings_machinery', 'machinery_readings', ['machinery_id', 'recorded_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_machinery_readings_machinery', table_name='machinery_readings')
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,92 @@
+"""Reasignar ids de clientes, productos y maquinaria al formato ordenable por tiempo
+
+Los ids antiguos (prefijo + 8 hex aleatorios) se sustituyen por los de
+app.core.ids y la equivalencia queda en legacy_ids. Las lecturas y agregados
+de maquinaria se actualizan por el ON UPDATE CASCADE de sus claves foráneas.
+Tenants y usuarios conservan su id: el id de tenant se comparte para dar de
+alta usuarios y su volumen no justifica reescribirlo.
+
+Se procesa en bloques para acotar el tamaño de cada sentencia; en tablas
+grandes conviene ejecutarla en una ventana de mantenimiento (reescribe la
+PK y sus índices).
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core import ids
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ENTITIES = [
+    ('customers', ids.CUSTOMER),
+    ('products', ids.PRODUCT),
+    ('machinery', ids.MACHINERY),
+]
+CHUNK_SIZE = 5000
+
+
+def _apply(conn, table: str, pairs) -> None:
+    """UPDATE ... FROM (VALUES ...) con pares (id actual, id nuevo)"""
+    values = ', '.join(f'(:o{i}, :n{i})' for i in range(len(pairs)))
+    params = {}
+    for i, (current, new) in enumerate(pairs):
+        params[f'o{i}'], params[f'n{i}'] = current, new
+    conn.execute(
+        sa.text(f'UPDATE {table} SET id = v.new_id FROM (VALUES {values}) AS v(old_id, new_id) WHERE {table}.id = v.old_id'),
+        params,
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        'legacy_ids',
+        sa.Column('old_id', sa.String(), nullable=False),
+        sa.Column('new_id', sa.String(), nullable=False),
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('migrated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('old_id'),
+        sa.UniqueConstraint('new_id'),
+    )
+    conn = op.get_bind()
+    legacy_ids = sa.table(
+        'legacy_ids', sa.column('old_id'), sa.column('new_id'), sa.column('entity'), sa.column('migrated_at')
+    )
+    migrated_at = datetime.utcnow()
+    for table, prefix in ENTITIES:
+        # Solo los que no tienen ya el formato nuevo: la migración es re-ejecutable
+        old_ids = conn.execute(
+            sa.text(f"SELECT id FROM {table} WHERE id !~ :pattern ORDER BY id"),
+            {'pattern': f'^{prefix}-[0-9a-z]{{26}}$'},
+        ).scalars().all()
+        for start in range(0, len(old_ids), CHUNK_SIZE):
+            chunk = old_ids[start:start + CHUNK_SIZE]
+            pairs = list(zip(chunk, ids.new_ids(prefix, len(chunk))))
+            conn.execute(
+                legacy_ids.insert(),
+                [{'old_id': o, 'new_id': n, 'entity': table, 'migrated_at': migrated_at} for o, n in pairs],
+            )
+            _apply(conn, table, pairs)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    for table, _ in ENTITIES:
+        rows = conn.execute(
+            sa.text('SELECT new_id, old_id FROM legacy_ids WHERE entity = :entity'), {'entity': table}
+        ).all()
+        for start in range(0, len(rows), CHUNK_SIZE):
+            _apply(conn, table, [tuple(r) for r in rows[start:start + CHUNK_SIZE]])
+    op.drop_table('legacy_ids')
@@ -0,0 +1,43 @@
+"""Libro de movimientos de stock
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'stock_movements',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('tenant_id', sa.String(), nullable=False),
+        sa.Column('product_id', sa.String(), nullable=False),
+        sa.Column('movement_type', sa.Enum('ENTRADA', 'SALIDA', 'AJUSTE', name='stockmovementtype'), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('stock_after', sa.Integer(), nullable=False),
+        sa.Column('reference', sa.String(), nullable=True),
+        sa.Column('notes', sa.String(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], onupdate='CASCADE', ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tenant_id'], ['tenants.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_stock_movements_product', 'stock_movements', ['tenant_id', 'product_id', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_table('stock_movements')
+    sa.Enum(name='stockmovementtype').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,41 @@
+"""Índice parcial de stock bajo ordenado por id, con columnas para el resumen
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LOW_STOCK = sa.text('stock_current <= stock_min')
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_tenant_low_stock', table_name='products', postgresql_concurrently=True, if_exists=True)
+        op.create_index(
+            'ix_products_tenant_low_stock', 'products', ['tenant_id', 'id'],
+            postgresql_where=LOW_STOCK,
+            postgresql_include=['category', 'stock_current', 'stock_max'],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_tenant_low_stock', table_name='products', postgresql_concurrently=True)
+        op.create_index(
+            'ix_products_tenant_low_stock', 'products', ['tenant_id', 'category', 'id'],
+            postgresql_where=LOW_STOCK,
+            postgresql_concurrently=True,
+        )
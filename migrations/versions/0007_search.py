@@ -0,0 +1,65 @@
+"""Búsqueda de productos y clientes: tsvector generado e índices GIN por tenant
+
+Añadir una columna generada STORED reescribe la tabla (bloqueo exclusivo
+mientras dura): en catálogos grandes, ejecutar en una ventana de
+mantenimiento. Los índices se crean después con CONCURRENTLY.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRODUCT_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(sku, ''), '-_./', '    ')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+CUSTOMER_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(email, ''), '@._-+', '     ')), 'B') || "
+    "setweight(to_tsvector('simple', translate(coalesce(phone, ''), '+-().', '     ')), 'B') || "
+    "setweight(to_tsvector('simple', regexp_replace(coalesce(phone, ''), '\\D', '', 'g')), 'B')"
+)
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+    op.add_column('products', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(PRODUCT_DOCUMENT, persisted=True), nullable=True
+    ))
+    op.add_column('customers', sa.Column(
+        'search_vector', postgresql.TSVECTOR(), sa.Computed(CUSTOMER_DOCUMENT, persisted=True), nullable=True
+    ))
+    with op.get_context().autocommit_block():
+        for table in ('products', 'customers'):
+            op.create_index(
+                f'ix_{table}_search', table, ['tenant_id', 'search_vector'],
+                postgresql_using='gin', postgresql_concurrently=True,
+            )
+            op.create_index(
+                f'ix_{table}_name_trgm', table, ['tenant_id', 'name'],
+                postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}, postgresql_concurrently=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for table in ('products', 'customers'):
+            op.drop_index(f'ix_{table}_name_trgm', table_name=table, postgresql_concurrently=True)
+            op.drop_index(f'ix_{table}_search', table_name=table, postgresql_concurrently=True)
+    op.drop_column('customers', 'search_vector')
+    op.drop_column('products', 'search_vector')
@@ -4,6 +4,11 @@ from app.models.user import User
 from app.models.customer import Customer
 from app.models.product import Product
 from app.models.machinery import Machinery, MachineryType, MachineryStatus
+from app.models.machinery_reading import MachineryReading
+from app.models.machinery_usage import MachineryUsageHourly, MachineryUsageDaily
+from app.models.legacy_id import LegacyId
+from app.models.stock_movement import StockMovement, StockMovementType
+from app.models.resource_version import ResourceVersion
 
 __all__ = [
     "Base",
@@ -13,5 +18,12 @@ __all__ = [
     "Product",
     "Machinery",
     "MachineryType",
-    "MachineryStatus"
+    "MachineryStatus",
+    "MachineryReading",
+    "MachineryUsageHourly",
+    "MachineryUsageDaily",
+    "LegacyId",
+    "StockMovement",
+    "StockMovementType",
+    "ResourceVersion"
 ]
@@ -1 +1,10 @@
-from app.database import Base  # re-exportamos
\ No newline at end of file
+from sqlalchemy import DDL, event
+from app.database import Base  # re-exportamos
+
+# Extensiones que usan los índices de búsqueda (trigramas y GIN multicolumna con
+# tenant_id). Ambas son "trusted": basta con ser dueño de la base de datos.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm; CREATE EXTENSION IF NOT EXISTS btree_gin")
+)
\ No newline at end of file
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.models.base import Base
 
 class Customer(Base):
@@ -11,6 +12,26 @@ class Customer(Base):
     phone = Column(String, nullable=True)
     address = Column(String, nullable=True)
     tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+    # Documento de búsqueda (ver search_service): el teléfono va también solo con
+    # dígitos para encontrarlo se escriba como se escriba
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', translate(coalesce(email, ''), '@._-+', '     ')), 'B') || "
+        "setweight(to_tsvector('simple', translate(coalesce(phone, ''), '+-().', '     ')), 'B') || "
+        "setweight(to_tsvector('simple', regexp_replace(coalesce(phone, ''), '\\D', '', 'g')), 'B')",
+        persisted=True
+    )))
+
+    __table_args__ = (
+        # Listados por tenant ordenados por id (paginación keyset)
+        Index("ix_customers_tenant_id", tenant_id, id),
+        # Búsqueda: texto completo y similitud por trigramas, ambos acotados por tenant (btree_gin)
+        Index("ix_customers_search", tenant_id, search_vector, postgresql_using="gin"),
+        Index(
+            "ix_customers_name_trgm", tenant_id, name,
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
     
     # Relación
     tenant = relationship("Tenant", back_populates="customers")
\ No newline at end of file
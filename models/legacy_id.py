@@ -0,0 +1,16 @@
+from sqlalchemy import Column, String, DateTime
+from datetime import datetime
+from app.models.base import Base
+
+class LegacyId(Base):
+    """Equivalencia entre ids antiguos (prefijo + 8 hex) y los ordenables por tiempo.
+
+    La rellena la migración 0004; sirve a integraciones que guardaron ids
+    antiguos y para revertir la migración.
+    """
+    __tablename__ = "legacy_ids"
+
+    old_id = Column(String, primary_key=True)
+    new_id = Column(String, nullable=False, unique=True)
+    entity = Column(String, nullable=False)
+    migrated_at = Column(DateTime, default=datetime.utcnow)
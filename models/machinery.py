@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Float, Integer, Date, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, Boolean, ForeignKey, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 import enum
@@ -38,11 +38,14 @@ class Machinery(Base):
     current_project = Column(String, nullable=True)
     horometer = Column(Float, default=0.0)
     odometer = Column(Float, default=0.0)
+    last_reading_at = Column(DateTime, nullable=True)
     operator_name = Column(String, nullable=True)
     operator_id = Column(String, nullable=True)
     next_maintenance_hours = Column(Float, nullable=True)
     maintenance_interval_hours = Column(Float, default=250.0)
     last_maintenance_date = Column(Date, nullable=True)
+    usage_hours_per_day = Column(Float, nullable=True)  # ritmo reciente, de los agregados diarios
+    projected_maintenance_at = Column(DateTime, nullable=True)
     acquisition_cost = Column(Float, default=0.0)
     hourly_rate = Column(Float, default=0.0)
     fuel_consumption_rate = Column(Float, default=0.0)
@@ -53,6 +56,26 @@ class Machinery(Base):
     is_available = Column(Boolean, default=True)
     is_active = Column(Boolean, default=True)
     tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+
+    __table_args__ = (
+        # Listados de maquinaria activa por tenant (paginación keyset) y por filtro
+        Index("ix_machinery_tenant_active", tenant_id, id, postgresql_where=is_active == True),
+        Index("ix_machinery_tenant_status", tenant_id, status, id, postgresql_where=is_active == True),
+        Index("ix_machinery_tenant_type", tenant_id, machinery_type, id, postgresql_where=is_active == True),
+        # Cola de mantenimiento: máquinas ordenadas por horas restantes
+        Index(
+            "ix_machinery_maintenance_due",
+            tenant_id,
+            next_maintenance_hours - horometer,
+            postgresql_where=(is_active == True) & (next_maintenance_hours != None)
+        ),
+        Index(
+            "ix_machinery_projected_maintenance",
+            tenant_id,
+            projected_maintenance_at,
+            postgresql_where=(is_active == True) & (projected_maintenance_at != None)
+        ),
+    )
     
     # Relación
     tenant = relationship("Tenant", back_populates="machinery")
\ No newline at end of file
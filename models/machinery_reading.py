@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Float, BigInteger, DateTime, ForeignKey, Index, PrimaryKeyConstraint
+from datetime import datetime
+from app.models.base import Base
+
+class MachineryReading(Base):
+    """Historial append-only de lecturas de horómetro/odómetro.
+
+    Particionada por mes sobre recorded_at (ver telemetry_service): borrar
+    historia antigua es un DROP de partición, no un DELETE.
+    """
+    __tablename__ = "machinery_readings"
+    __table_args__ = (
+        # La clave de partición debe formar parte de la PK
+        PrimaryKeyConstraint("id", "recorded_at"),
+        Index("ix_machinery_readings_machinery", "machinery_id", "recorded_at"),
+        {"postgresql_partition_by": "RANGE (recorded_at)"},
+    )
+
+    id = Column(BigInteger, autoincrement=True, nullable=False)
+    machinery_id = Column(String, ForeignKey("machinery.id", onupdate="CASCADE"), nullable=False)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+    recorded_at = Column(DateTime, nullable=False)
+    horometer = Column(Float, nullable=False)
+    odometer = Column(Float, nullable=True)
+    operator_name = Column(String, nullable=True)
+    received_at = Column(DateTime, default=datetime.utcnow)
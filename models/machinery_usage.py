@@ -0,0 +1,34 @@
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.orm import declared_attr
+from app.models.base import Base
+
+class MachineryUsageMixin:
+    """Agregados de uso por máquina y bucket, mantenidos en cada ingesta"""
+
+    @declared_attr
+    def machinery_id(cls):
+        return Column(String, ForeignKey("machinery.id", onupdate="CASCADE"), primary_key=True)
+
+    @declared_attr
+    def tenant_id(cls):
+        return Column(String, ForeignKey("tenants.id"), nullable=False)
+
+    bucket_start = Column(DateTime, primary_key=True)
+    project = Column(String, nullable=True)
+    hours_worked = Column(Float, nullable=False, default=0.0)
+    km_travelled = Column(Float, nullable=False, default=0.0)
+    idle_hours = Column(Float, nullable=False, default=0.0)
+    readings_count = Column(Integer, nullable=False, default=0)
+
+class MachineryUsageHourly(MachineryUsageMixin, Base):
+    __tablename__ = "machinery_usage_hourly"
+    __table_args__ = (
+        # Consultas de rango por tenant (get_utilization)
+        Index("ix_machinery_usage_hourly_tenant", "tenant_id", "bucket_start"),
+    )
+
+class MachineryUsageDaily(MachineryUsageMixin, Base):
+    __tablename__ = "machinery_usage_daily"
+    __table_args__ = (
+        Index("ix_machinery_usage_daily_tenant", "tenant_id", "bucket_start"),
+    )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Float, Integer, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, Float, Integer, ForeignKey, Index, Computed
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from app.models.base import Base
 
 class Product(Base):
@@ -16,6 +17,34 @@ class Product(Base):
     stock_max = Column(Integer, default=0)
     stock_current = Column(Integer, default=0)
     tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+    # Documento de búsqueda (ver search_service). Diferido: no viaja en los SELECT normales
+    search_vector = deferred(Column(TSVECTOR, Computed(
+        "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+        "setweight(to_tsvector('simple', translate(coalesce(sku, ''), '-_./', '    ')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'C')",
+        persisted=True
+    )))
+
+    __table_args__ = (
+        # Listados por tenant ordenados por id (paginación keyset), con y sin categoría
+        Index("ix_products_tenant_id", tenant_id, id),
+        Index("ix_products_tenant_category", tenant_id, category, id),
+        # Solo las filas con stock bajo: el índice crece con las alertas, no con el
+        # catálogo, y Postgres lo mantiene en cada cambio de saldo. Ordenado por id
+        # para paginar; INCLUDE permite resumir por categoría con un index-only scan.
+        Index(
+            "ix_products_tenant_low_stock",
+            tenant_id, id,
+            postgresql_where=stock_current <= stock_min,
+            postgresql_include=["category", "stock_current", "stock_max"]
+        ),
+        # Búsqueda: texto completo y similitud por trigramas, ambos acotados por tenant (btree_gin)
+        Index("ix_products_search", tenant_id, search_vector, postgresql_using="gin"),
+        Index(
+            "ix_products_name_trgm", tenant_id, name,
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
     
     # Relación
     tenant = relationship("Tenant", back_populates="products")
\ No newline at end of file
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, BigInteger, DateTime, ForeignKey
+from app.models.base import Base
+
+class ResourceVersion(Base):
+    """Versión por tenant y recurso (machinery, products, customers).
+
+    Se incrementa justo después del commit de cada escritura (ver
+    version_service); de ella salen los ETag de las lecturas.
+    """
+    __tablename__ = "resource_versions"
+
+    tenant_id = Column(String, ForeignKey("tenants.id"), primary_key=True)
+    resource = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False)
\ No newline at end of file
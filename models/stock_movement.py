@@ -0,0 +1,32 @@
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index, Enum as SQLEnum
+from datetime import datetime
+from app.models.base import Base
+import enum
+
+class StockMovementType(str, enum.Enum):
+    ENTRADA = "entrada"   # recepción de mercadería
+    SALIDA = "salida"     # despacho / consumo
+    AJUSTE = "ajuste"     # corrección o conteo físico (delta con signo)
+
+class StockMovement(Base):
+    """Libro append-only de movimientos de stock.
+
+    products.stock_current es el saldo; cada movimiento se aplica con un
+    UPDATE atómico (ver stock_service) y guarda el saldo resultante.
+    """
+    __tablename__ = "stock_movements"
+    __table_args__ = (
+        # Historial de un producto, del más antiguo al más reciente (paginación keyset)
+        Index("ix_stock_movements_product", "tenant_id", "product_id", "id"),
+    )
+
+    id = Column(String, primary_key=True)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False)
+    product_id = Column(String, ForeignKey("products.id", onupdate="CASCADE", ondelete="CASCADE"), nullable=False)
+    movement_type = Column(SQLEnum(StockMovementType), nullable=False)
+    quantity = Column(Integer, nullable=False)      # delta aplicado (con signo)
+    stock_after = Column(Integer, nullable=False)   # saldo tras aplicarlo
+    reference = Column(String, nullable=True)       # guía, orden de trabajo, etc.
+    notes = Column(String, nullable=True)
+    created_by = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
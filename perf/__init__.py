@@ -0,0 +1,16 @@
+"""Herramientas de rendimiento: datos sintéticos y benchmarks.
+
+Trabajan contra una base desechable indicada en PERF_DATABASE_URL (mismo
+formato que DATABASE_URL). Hay que llamar a use_perf_database() antes de
+importar app.database para que el engine apunte a ella. La regresión de
+planes (tests/test_query_plans.py) carga sus datos con app.perf.seed.
+"""
+import os
+
+
+def use_perf_database() -> str:
+    url = os.getenv("PERF_DATABASE_URL")
+    if not url:
+        raise SystemExit("PERF_DATABASE_URL no está configurada (usar una base desechable)")
+    os.environ["DATABASE_URL"] = url
+    return url
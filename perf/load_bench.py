@@ -0,0 +1,345 @@
+"""Benchmark de carga por HTTP: escenarios de uso real contra una API en marcha.
+
+    python -m app.perf.load_bench --seed                  # carga datos (PERF_DATABASE_URL) y mide
+    DATABASE_URL=$PERF_DATABASE_URL uvicorn app.main:app --workers 4
+    python -m app.perf.load_bench --url http://127.0.0.1:8000 --concurrency 32 --duration 30
+    python -m app.perf.load_bench --compare perf-results/antes.json perf-results/despues.json
+
+Escenarios (--scenarios, por defecto todos):
+  dashboard    sondeo del panel: estadísticas, alertas, listados y bajo stock,
+               revalidando con If-None-Match como un navegador
+  login        tormenta de inicios de sesión
+  horometer    actualizaciones de horómetro sobre máquinas al azar
+  pagination   recorrido completo por cursor de maquinaria, productos y clientes
+
+Los usuarios y tenants son los de app.perf.seed (mismos --tenants y --users).
+Para cada escenario se informa throughput y p50/p95/p99 por endpoint; el JSON
+que se guarda en --output incluye el commit para comparar ejecuciones.
+"""
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import threading
+import time
+from collections import Counter as Tally, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.perf.seed import SEED_PASSWORD, SeedConfig, user_email
+
+API = "/api/v1"
+DASHBOARD_CALLS = [
+    ("GET /machinery/stats", f"{API}/machinery/stats"),
+    ("GET /machinery/alerts", f"{API}/machinery/alerts?within_days=7"),
+    ("GET /machinery/", f"{API}/machinery/?limit=50"),
+    ("GET /products/low-stock", f"{API}/products/low-stock"),
+    ("GET /customers/", f"{API}/customers/?limit=50"),
+]
+PAGINATED_LISTS = [
+    ("GET /machinery/ (cursor)", f"{API}/machinery/?fields=id,code,status&limit=100"),
+    ("GET /products/ (cursor)", f"{API}/products/?limit=100"),
+    ("GET /customers/ (cursor)", f"{API}/customers/?limit=100"),
+]
+PERCENTILES = (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+
+
+class Client:
+    """Conexión keep-alive de un usuario virtual; anota latencia y estado por endpoint"""
+
+    def __init__(self, base_url: str, revalidate: bool = True):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port
+        self.https = parts.scheme == "https"
+        self.revalidate = revalidate
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Tally] = defaultdict(Tally)
+        self._etags: Dict[Tuple[str, str], str] = {}
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            factory = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = factory(self.host, self.port, timeout=30)
+        return self._conn
+
+    def request(
+        self, label: str, method: str, path: str,
+        token: Optional[str] = None, body: Optional[dict] = None, revalidate: Optional[bool] = None
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        etag_key = (token or "", path)
+        revalidate = self.revalidate if revalidate is None else revalidate
+        if method == "GET" and revalidate and etag_key in self._etags:
+            headers["If-None-Match"] = self._etags[etag_key]
+
+        started = time.perf_counter()
+        for attempt in (1, 2):
+            reused = self._conn is not None
+            try:
+                conn = self._connection()
+                conn.request(method, path, body=payload, headers=headers)
+                response = conn.getresponse()
+                content = response.read()
+                status, response_headers = response.status, {k.lower(): v for k, v in response.getheaders()}
+                break
+            except (OSError, http.client.HTTPException):
+                self.close()
+                if reused and attempt == 1:
+                    # El servidor cerró la conexión keep-alive: un reintento con una nueva
+                    continue
+                status, response_headers, content = 0, {}, b""
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        self.statuses[label][status] += 1
+        if status == 200 and "etag" in response_headers:
+            self._etags[etag_key] = response_headers["etag"]
+        return status, response_headers, content
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Fleet:
+    """Usuarios sembrados, sus tokens y las máquinas de cada tenant (preparado antes de medir)"""
+
+    def __init__(self, base_url: str, tenants: int, users: int, machinery_sample: int = 200):
+        self.credentials = [
+            (tenant_id, user_email(tenant_id, n))
+            for tenant_id in SeedConfig(tenants=tenants).tenant_ids for n in range(users)
+        ]
+        self.tokens: Dict[str, str] = {}
+        self.machinery: Dict[str, List[str]] = {}
+        self.horometers: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        client = Client(base_url, revalidate=False)
+        for tenant_id, email in self.credentials:
+            status, _, content = client.request("setup", "POST", f"{API}/auth/login",
+                                                body={"email": email, "password": SEED_PASSWORD})
+            if status != 200:
+                raise SystemExit(f"No se pudo iniciar sesión como {email} ({status}): ¿se ejecutó app.perf.seed?")
+            self.tokens.setdefault(tenant_id, json.loads(content)["access_token"])
+        for tenant_id, token in self.tokens.items():
+            _, _, content = client.request(
+                "setup", "GET", f"{API}/machinery/?fields=id,horometer&limit={machinery_sample}", token=token
+            )
+            rows = json.loads(content)
+            self.machinery[tenant_id] = [row["id"] for row in rows]
+            self.horometers.update((row["id"], row["horometer"] or 0.0) for row in rows)
+        client.close()
+
+    def random_tenant(self, rnd: random.Random) -> Tuple[str, str]:
+        tenant_id = rnd.choice(list(self.tokens))
+        return tenant_id, self.tokens[tenant_id]
+
+    def next_horometer(self, machinery_id: str, rnd: random.Random) -> float:
+        # Las lecturas deben avanzar: cada usuario virtual suma sobre el último valor enviado
+        with self._lock:
+            value = round(self.horometers[machinery_id] + rnd.uniform(0.1, 2.0), 1)
+            self.horometers[machinery_id] = value
+            return value
+
+
+def _dashboard(client: Client, fleet: Fleet, rnd: random.Random) -> None:
+    _, token = fleet.random_tenant(rnd)
+    for label, path in DASHBOARD_CALLS:
+        client.request(label, "GET", path, token=token)
+
+def _login(client: Client, fleet: Fleet, rnd: random.Random) -> None:
+    _, email = rnd.choice(fleet.credentials)
+    client.request("POST /auth/login", "POST", f"{API}/auth/login", body={"email": email, "password": SEED_PASSWORD})
+
+def _horometer(client: Client, fleet: Fleet, rnd: random.Random) -> None:
+    tenant_id, token = fleet.random_tenant(rnd)
+    if not fleet.machinery[tenant_id]:
+        return
+    machinery_id = rnd.choice(fleet.machinery[tenant_id])
+    client.request(
+        "PATCH /machinery/{id}/horometer", "PATCH", f"{API}/machinery/{machinery_id}/horometer", token=token,
+        body={"horometer": fleet.next_horometer(machinery_id, rnd)}
+    )
+
+def _pagination(client: Client, fleet: Fleet, rnd: random.Random) -> None:
+    _, token = fleet.random_tenant(rnd)
+    label, path = rnd.choice(PAGINATED_LISTS)
+    cursor = None
+    while True:
+        # Sin If-None-Match: un 304 no trae el cursor de la página siguiente
+        status, headers, _ = client.request(
+            label, "GET", path + (f"&cursor={cursor}" if cursor else ""), token=token, revalidate=False
+        )
+        cursor = headers.get(NEXT_CURSOR_HEADER.lower())
+        if status != 200 or not cursor:
+            return
+
+SCENARIOS: Dict[str, Callable[[Client, Fleet, random.Random], None]] = {
+    "dashboard": _dashboard,
+    "login": _login,
+    "horometer": _horometer,
+    "pagination": _pagination,
+}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_scenario(name: str, base_url: str, fleet: Fleet, concurrency: int, duration: float,
+                 revalidate: bool = True, seed: int = 42) -> dict:
+    """Usuarios virtuales repitiendo el escenario durante `duration` segundos"""
+    step = SCENARIOS[name]
+    clients = [Client(base_url, revalidate) for _ in range(concurrency)]
+    deadline = time.perf_counter() + duration
+
+    def virtual_user(client: Client, rnd: random.Random) -> None:
+        while time.perf_counter() < deadline:
+            step(client, fleet, rnd)
+        client.close()
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=virtual_user, args=(client, random.Random(seed + n)), daemon=True)
+        for n, client in enumerate(clients)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Tally] = defaultdict(Tally)
+    for client in clients:
+        for label, values in client.latencies.items():
+            latencies[label].extend(values)
+            statuses[label].update(client.statuses[label])
+
+    endpoints = {}
+    for label, values in sorted(latencies.items()):
+        ordered = sorted(values)
+        errors = sum(count for status, count in statuses[label].items() if status == 0 or status >= 400)
+        endpoints[label] = {
+            "requests": len(ordered),
+            "errors": errors,
+            "rps": round(len(ordered) / elapsed, 2),
+            **{key: round(_percentile(ordered, fraction), 2) for key, fraction in PERCENTILES},
+            "max": round(ordered[-1], 2),
+            "statuses": {str(status): count for status, count in sorted(statuses[label].items())},
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        "rps": round(total / elapsed, 2),
+        "endpoints": endpoints,
+    }
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _print_results(results: dict) -> None:
+    for scenario in results["scenarios"]:
+        print(f"\n{scenario['scenario']}: {scenario['rps']} req/s, {scenario['requests']} peticiones, "
+              f"{scenario['errors']} errores ({scenario['concurrency']} usuarios, {scenario['seconds']}s)")
+        print(f"  {'endpoint':<34} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'máx':>8}  estados")
+        for label, e in scenario["endpoints"].items():
+            print(f"  {label:<34} {e['rps']:>8} {e['p50']:>8} {e['p95']:>8} {e['p99']:>8} {e['max']:>8}  {e['statuses']}")
+    print("\nLatencias en ms")
+
+def compare(before_path: str, after_path: str) -> None:
+    """Diferencias de throughput y percentiles por endpoint entre dos ejecuciones guardadas"""
+    before, after = (json.loads(Path(path).read_text(encoding="utf-8")) for path in (before_path, after_path))
+    print(f"antes: {before.get('commit')} ({before['started_at']})  después: {after.get('commit')} ({after['started_at']})")
+    previous = {s["scenario"]: s for s in before["scenarios"]}
+    for scenario in after["scenarios"]:
+        old = previous.get(scenario["scenario"])
+        if old is None:
+            continue
+        print(f"\n{scenario['scenario']}: {old['rps']} -> {scenario['rps']} req/s")
+        for label, e in scenario["endpoints"].items():
+            o = old["endpoints"].get(label)
+            if o is None:
+                continue
+            deltas = "  ".join(
+                f"{key} {o[key]:>7} -> {e[key]:<7} ({(e[key] - o[key]) / o[key] * 100 if o[key] else 0:+.0f}%)"
+                for key, _ in PERCENTILES
+            )
+            print(f"  {label:<34} {deltas}")
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base de la API")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="escenarios separados por comas")
+    parser.add_argument("--concurrency", type=int, default=16, help="usuarios virtuales simultáneos")
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos por escenario")
+    parser.add_argument("--tenants", type=int, default=SeedConfig.tenants, help="tenants sembrados a usar")
+    parser.add_argument("--users", type=int, default=SeedConfig.users, help="usuarios sembrados por tenant")
+    parser.add_argument("--no-revalidate", action="store_true", help="no enviar If-None-Match en los GET")
+    parser.add_argument("--seed", action="store_true", help="ejecutar antes app.perf.seed con sus valores por defecto")
+    parser.add_argument("--output", help="fichero JSON de resultados (por defecto perf-results/<commit>-<fecha>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"), help="comparar dos resultados guardados")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = sorted(set(names).difference(SCENARIOS))
+    if unknown:
+        parser.error(f"escenarios desconocidos: {', '.join(unknown)}")
+    if args.seed:
+        from app.perf import use_perf_database
+        from app.perf.seed import apply_migrations, seed
+
+        use_perf_database()
+        apply_migrations()
+        started = time.perf_counter()
+        counts = seed(SeedConfig(tenants=args.tenants, users=args.users))
+        print(f"seed: {sum(counts.values())} filas en {time.perf_counter() - started:.1f}s")
+
+    fleet = Fleet(args.url, args.tenants, args.users)
+    started_at = datetime.now(timezone.utc)
+    results = {
+        "commit": _git_commit(),
+        "started_at": started_at.isoformat(),
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "tenants": args.tenants,
+        "revalidate": not args.no_revalidate,
+        "scenarios": [
+            run_scenario(name, args.url, fleet, args.concurrency, args.duration, not args.no_revalidate)
+            for name in names
+        ],
+    }
+    _print_results(results)
+
+    output = Path(args.output) if args.output else (
+        Path("perf-results") / f"{results['commit'] or 'sin-commit'}-{started_at:%Y%m%dT%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {output}")
+
+if __name__ == "__main__":
+    main()
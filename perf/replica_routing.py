@@ -0,0 +1,74 @@
+"""Comprobación del enrutado de lecturas a réplicas.
+
+    DATABASE_REPLICA_URLS=postgresql://... python -m app.perf.replica_routing
+
+Muestra el retraso medido de cada réplica, a qué servidor va una lectura
+normal y verifica que tras una escritura las lecturas del tenant (y las que
+traen la marca del cliente) vuelven al primario durante la ventana
+read-your-writes. Sirve igual con un standby real que con una segunda base
+usada como réplica de prueba.
+"""
+import argparse
+import sys
+import time
+
+from app.perf import use_perf_database
+
+_SERVER_SQL = (
+    "SELECT coalesce(inet_server_addr()::text, 'socket'), inet_server_port(), "
+    "current_database(), current_setting('application_name'), pg_is_in_recovery()"
+)
+
+def _describe(session) -> str:
+    from sqlalchemy import text
+
+    addr, port, dbname, app_name, recovery = session.execute(text(_SERVER_SQL)).one()
+    role = "standby" if recovery else "lectura-escritura"
+    return f"{addr}:{port}/{dbname} app={app_name or '-'} ({role})"
+
+def check(tenant_id: str, reads: int) -> bool:
+    from app.core.replicas import READ_YOUR_WRITES_SECONDS, read_router, read_session
+    from app.database import get_engine
+
+    if not read_router.replicas:
+        print("Sin réplicas configuradas (DATABASE_REPLICA_URLS): todas las lecturas van al primario")
+        return True
+
+    print(f"max_lag={read_router.max_lag or 'sin límite'}  ventana read-your-writes={read_router.recent_writes.ttl}s")
+    for status in read_router.status():
+        print(f"  {status['replica']}: retraso={status['lag_seconds']} utilizable={status['usable']}")
+
+    targets = {}
+    for _ in range(reads):
+        with read_session(tenant_id) as db:
+            where = _describe(db)
+            targets[where] = targets.get(where, 0) + 1
+    print("\nLecturas sin escrituras recientes:")
+    for where, count in targets.items():
+        print(f"  {count:>3} x {where}")
+
+    engine = get_engine()
+    read_router.note_write(tenant_id)
+    sticky = read_router.engine_for_read(tenant_id)
+    other = read_router.engine_for_read(tenant_id + "-otro")
+    # Otro worker no ve la marca del proceso, pero sí la que trae el cliente
+    marked = read_router.engine_for_read(tenant_id + "-otro", time.time() + READ_YOUR_WRITES_SECONDS)
+    print("\nTras una escritura del tenant:")
+    print(f"  mismo tenant -> {'primario' if sticky is engine else 'réplica'}")
+    print(f"  otro tenant  -> {'primario' if other is engine else 'réplica'}")
+    print(f"  marca del cliente en otro worker -> {'primario' if marked is engine else 'réplica'}")
+    return sticky is engine and marked is engine
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tenant", default="tenant-replica-check", help="tenant sintético para las marcas")
+    parser.add_argument("--reads", type=int, default=6, help="lecturas de muestra")
+    args = parser.parse_args(argv)
+
+    use_perf_database()
+    if not check(args.tenant, args.reads):
+        print("\nERROR: una lectura tras escribir fue a una réplica")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""Carga de datos sintéticos con volumen realista vía COPY.
+
+    python -m app.perf.seed --tenants 20 --machinery 300
+
+Aplica las migraciones (alembic upgrade head), vacía las tablas de negocio,
+las rellena y ejecuta VACUUM ANALYZE para que el planner vea estadísticas reales.
+Cada tenant recibe --users usuarios (user0@<tenant>.example.com es admin) con
+la contraseña SEED_PASSWORD, que usa app.perf.load_bench para autenticarse.
+"""
+import argparse
+import csv
+import io
+import random
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Sequence
+
+from app.core import ids
+from app.perf import use_perf_database
+
+CATEGORIES = ["repuestos", "filtros", "lubricantes", "neumaticos", "herramientas", "epp", "electrico", "hidraulico"]
+PROJECTS = ["ruta-5", "puerto-norte", "tunel-andes", "presa-sur", "mina-central", None]
+MACHINERY_TYPES = ["EXCAVADORA", "CARGADOR", "BULLDOZER", "RETROEXCAVADORA", "GRUA", "CAMION_VOLQUETE", "OTRO"]
+# Distribución sesgada: casi toda la flota está operativa
+MACHINERY_STATUSES = ["OPERATIVO"] * 8 + ["EN_MANTENIMIENTO", "EN_REPARACION", "FUERA_DE_SERVICIO"]
+SEED_PASSWORD = "bench"
+SEED_TABLES = [
+    "resource_versions", "stock_movements", "legacy_ids", "machinery_usage_hourly", "machinery_usage_daily",
+    "machinery_readings", "machinery", "products", "customers", "users", "tenants",
+]
+
+@dataclass
+class SeedConfig:
+    tenants: int = 20
+    users: int = 3
+    customers: int = 2000
+    products: int = 2000
+    machinery: int = 300
+    usage_days: int = 60
+    hourly_days: int = 7
+    seed: int = 42
+
+    @property
+    def tenant_ids(self) -> list:
+        return [f"tenant-{t:04d}" for t in range(self.tenants)]
+
+def _copy(cursor, table: str, columns: Sequence[str], rows: Iterable[Sequence]) -> int:
+    """COPY en bloques de ~8 MB para no materializar toda la tabla en memoria"""
+    buffer, writer, count = io.StringIO(), None, 0
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')"
+
+    def flush():
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        buffer.seek(0)
+        buffer.truncate()
+
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if buffer.tell() > 8 * 1024 * 1024:
+            flush()
+    if buffer.tell():
+        flush()
+    return count
+
+def _tenants(cfg: SeedConfig) -> Iterator[tuple]:
+    plans = ["free", "pro", "enterprise"]
+    for i, tenant_id in enumerate(cfg.tenant_ids):
+        yield tenant_id, f"Empresa {i}", f"empresa{i}.example.com", plans[i % 3], True, datetime(2024, 1, 1)
+
+def user_email(tenant_id: str, n: int) -> str:
+    return f"user{n}@{tenant_id}.example.com"
+
+def _users(cfg: SeedConfig) -> Iterator[tuple]:
+    from app.core.security import get_password_hash
+
+    # Un solo hash para todos: get_password_hash lleva sal propia y verify_password la lee del valor
+    password_hash = get_password_hash(SEED_PASSWORD)
+    for tenant_id in cfg.tenant_ids:
+        for n, user_id in enumerate(ids.new_ids(ids.USER, cfg.users)):
+            yield (
+                user_id, user_email(tenant_id, n), password_hash, f"Usuario {n}",
+                "admin" if n == 0 else "user", True, tenant_id, datetime(2024, 1, 1),
+            )
+
+def _customers(cfg: SeedConfig, rnd: random.Random) -> Iterator[tuple]:
+    for tenant_id in cfg.tenant_ids:
+        for n, customer_id in enumerate(ids.new_ids(ids.CUSTOMER, cfg.customers)):
+            yield (
+                customer_id, f"Cliente {n}", f"cliente{n}@{tenant_id}.example.com",
+                f"+56 9 {rnd.randint(10000000, 99999999)}", f"Calle {rnd.randint(1, 9999)}", tenant_id,
+            )
+
+def _products(cfg: SeedConfig, rnd: random.Random, out_stock: dict) -> Iterator[tuple]:
+    for tenant_id in cfg.tenant_ids:
+        allocated = out_stock.setdefault(tenant_id, [])
+        for n, product_id in enumerate(ids.new_ids(ids.PRODUCT, cfg.products)):
+            stock_min = rnd.randint(5, 50)
+            # ~5% del catálogo por debajo del mínimo
+            stock = rnd.randint(0, stock_min) if rnd.random() < 0.05 else rnd.randint(stock_min + 1, stock_min * 10)
+            price = round(rnd.uniform(1, 2000), 2)
+            allocated.append((product_id, stock))
+            yield (
+                product_id, f"Producto {n}", f"{tenant_id}-SKU-{n:06d}", None,
+                rnd.choice(CATEGORIES), price, round(price * 0.6, 2), stock_min, stock_min * 20, stock, tenant_id,
+            )
+
+def _stock_movements(product_stock: dict) -> Iterator[tuple]:
+    # Entrada de stock inicial por producto, como create_product: el libro cuadra con stock_current
+    created_at = datetime(2024, 1, 1)
+    for tenant_id, products in product_stock.items():
+        opening = [(product_id, stock) for product_id, stock in products if stock]
+        for (product_id, stock), movement_id in zip(opening, ids.new_ids(ids.STOCK_MOVEMENT, len(opening))):
+            yield movement_id, tenant_id, product_id, "ENTRADA", stock, stock, None, "Stock inicial", None, created_at
+
+def _resource_versions(cfg: SeedConfig) -> Iterator[tuple]:
+    from app.services import version_service
+
+    now = datetime.utcnow()
+    for tenant_id in cfg.tenant_ids:
+        for resource in (version_service.MACHINERY, version_service.PRODUCTS, version_service.CUSTOMERS):
+            yield tenant_id, resource, 1, now
+
+def _machinery(cfg: SeedConfig, rnd: random.Random, out_ids: dict) -> Iterator[tuple]:
+    now = datetime.utcnow()
+    for tenant_id in cfg.tenant_ids:
+        allocated = out_ids.setdefault(tenant_id, [])
+        for n, machinery_id in enumerate(ids.new_ids(ids.MACHINERY, cfg.machinery)):
+            allocated.append(machinery_id)
+            horometer = round(rnd.uniform(100, 20000), 1)
+            interval = rnd.choice([250.0, 500.0, 1000.0])
+            next_maintenance = round(horometer + rnd.uniform(-50, interval), 1)
+            rate = round(rnd.uniform(2, 14), 2)
+            projected = now + timedelta(days=max(next_maintenance - horometer, 0) / rate)
+            active = rnd.random() > 0.03
+            yield (
+                machinery_id, f"Máquina {n}", f"{tenant_id}-M{n:05d}", "Marca", "Modelo", None, rnd.randint(2005, 2024),
+                rnd.choice(MACHINERY_TYPES), rnd.choice(MACHINERY_STATUSES), None, rnd.choice(PROJECTS),
+                horometer, round(horometer * 12, 1), None, None, next_maintenance, interval, None,
+                round(rnd.uniform(50000, 900000), 2), round(rnd.uniform(20, 250), 2), round(rnd.uniform(5, 60), 2),
+                None, None, None, None, True, active, tenant_id,
+                now - timedelta(minutes=rnd.randint(0, 600)), rate, projected,
+            )
+
+def _usage(cfg: SeedConfig, rnd: random.Random, machinery_ids: dict, hourly: bool) -> Iterator[tuple]:
+    today = datetime.combine(date.today(), datetime.min.time())
+    step = timedelta(hours=1) if hourly else timedelta(days=1)
+    buckets = cfg.hourly_days * 24 if hourly else cfg.usage_days
+    span = 1.0 if hourly else 24.0
+    for tenant_id, tenant_machinery in machinery_ids.items():
+        for machinery_id in tenant_machinery:
+            project = rnd.choice(PROJECTS)
+            for b in range(1, buckets + 1):
+                worked = round(rnd.uniform(0, span * 0.6), 3)
+                yield (
+                    machinery_id, tenant_id, today - step * b, project, worked,
+                    round(worked * rnd.uniform(0, 15), 3), round(rnd.uniform(0, span - worked) * 0.2, 3), rnd.randint(1, 6),
+                )
+
+def apply_migrations() -> None:
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(str(Path(__file__).resolve().parent.parent / "alembic.ini")), "head")
+
+def seed(cfg: SeedConfig) -> dict:
+    """Vaciar y rellenar las tablas; devuelve filas cargadas por tabla"""
+    from app.database import engine
+
+    rnd = random.Random(cfg.seed)
+    machinery_ids: dict = {}
+    product_stock: dict = {}
+    counts = {}
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(f"TRUNCATE {', '.join(SEED_TABLES)}")
+        counts["tenants"] = _copy(cursor, "tenants", ["id", "name", "domain", "plan", "is_active", "created_at"], _tenants(cfg))
+        counts["users"] = _copy(
+            cursor, "users", ["id", "email", "password_hash", "full_name", "role", "is_active", "tenant_id", "created_at"],
+            _users(cfg),
+        )
+        counts["customers"] = _copy(
+            cursor, "customers", ["id", "name", "email", "phone", "address", "tenant_id"], _customers(cfg, rnd)
+        )
+        counts["products"] = _copy(
+            cursor, "products",
+            ["id", "name", "sku", "description", "category", "price", "cost", "stock_min", "stock_max", "stock_current", "tenant_id"],
+            _products(cfg, rnd, product_stock),
+        )
+        counts["stock_movements"] = _copy(
+            cursor, "stock_movements",
+            ["id", "tenant_id", "product_id", "movement_type", "quantity", "stock_after", "reference", "notes",
+             "created_by", "created_at"],
+            _stock_movements(product_stock),
+        )
+        counts["machinery"] = _copy(
+            cursor, "machinery",
+            [
+                "id", "name", "code", "brand", "model", "serial_number", "year", "machinery_type", "status",
+                "current_location", "current_project", "horometer", "odometer", "operator_name", "operator_id",
+                "next_maintenance_hours", "maintenance_interval_hours", "last_maintenance_date", "acquisition_cost",
+                "hourly_rate", "fuel_consumption_rate", "capacity", "engine_power", "weight", "plate_number",
+                "is_available", "is_active", "tenant_id", "last_reading_at", "usage_hours_per_day", "projected_maintenance_at",
+            ],
+            _machinery(cfg, rnd, machinery_ids),
+        )
+        counts["resource_versions"] = _copy(
+            cursor, "resource_versions", ["tenant_id", "resource", "version", "updated_at"], _resource_versions(cfg)
+        )
+        usage_columns = ["machinery_id", "tenant_id", "bucket_start", "project", "hours_worked", "km_travelled", "idle_hours", "readings_count"]
+        counts["machinery_usage_daily"] = _copy(cursor, "machinery_usage_daily", usage_columns, _usage(cfg, rnd, machinery_ids, False))
+        counts["machinery_usage_hourly"] = _copy(cursor, "machinery_usage_hourly", usage_columns, _usage(cfg, rnd, machinery_ids, True))
+        raw.commit()
+        # VACUUM (no admite transacción) deja el mapa de visibilidad como en producción,
+        # necesario para que el planner elija index-only scans
+        raw.set_isolation_level(0)
+        cursor.execute("VACUUM ANALYZE")
+    finally:
+        raw.close()
+    return counts
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    defaults = SeedConfig()
+    for field in ("tenants", "users", "customers", "products", "machinery", "usage_days", "hourly_days", "seed"):
+        parser.add_argument(f"--{field.replace('_', '-')}", type=int, default=getattr(defaults, field))
+    args = parser.parse_args(argv)
+
+    use_perf_database()
+    apply_migrations()
+    started = time.perf_counter()
+    counts = seed(SeedConfig(**vars(args)))
+    for table, count in counts.items():
+        print(f"{table:<24} {count:>10}")
+    print(f"seed completado en {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Comparación de serialización de listados: ORM + Pydantic frente a filas + orjson.
+
+    python -m app.perf.seed                  # una vez, carga el volumen de prueba
+    python -m app.perf.serialization_bench   # --limit 500 --rounds 30
+
+Para cada listado se mide la misma página por los dos caminos: objetos ORM
+validados y serializados por el response_model (lo que hace FastAPI al
+devolver los objetos) y la consulta proyectada volcada con orjson
+(core.serialization). Antes de medir se comprueba que ambos producen el
+mismo JSON una vez decodificado.
+"""
+import argparse
+import json
+import statistics
+import time
+from typing import Callable, List, Tuple
+
+from app.perf import use_perf_database
+
+def _cases() -> List[Tuple[str, Callable, Callable, type, List[str]]]:
+    from app.services import customer_service, product_service, machinery_service
+    from app.schemas.customer import CustomerResponse
+    from app.schemas.product import ProductResponse
+    from app.schemas.machinery import MachineryResponse
+
+    return [
+        ("customers", customer_service.get_customers, customer_service.get_customer_rows,
+         CustomerResponse, customer_service.CUSTOMER_EXPORT_COLUMNS),
+        ("products", product_service.get_products, product_service.get_product_rows,
+         ProductResponse, product_service.PRODUCT_EXPORT_COLUMNS),
+        ("machinery", machinery_service.get_machinery_list, machinery_service.get_machinery_rows,
+         MachineryResponse, machinery_service.MACHINERY_EXPORT_COLUMNS),
+    ]
+
+def _busiest_tenant(db) -> str:
+    from sqlalchemy import text
+
+    tenant_id = db.execute(text(
+        "SELECT tenant_id FROM products GROUP BY tenant_id ORDER BY count(*) DESC LIMIT 1"
+    )).scalar()
+    if tenant_id is None:
+        raise SystemExit("La base de rendimiento está vacía: ejecutar antes python -m app.perf.seed")
+    return tenant_id
+
+def _timed(fn) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000
+
+def run(limit: int = 500, rounds: int = 30) -> List[dict]:
+    from typing import List as ListOf
+    from fastapi.responses import JSONResponse
+    from pydantic import TypeAdapter
+    from app.database import SessionLocal
+    from app.core.serialization import rows_to_json
+
+    with SessionLocal() as db:
+        tenant_id = _busiest_tenant(db)
+
+    results = []
+    for name, list_fn, rows_fn, model, columns in _cases():
+        adapter = TypeAdapter(ListOf[model])
+
+        def orm_body(items):
+            # Igual que FastAPI con response_model: validar, volcar a JSON y codificar
+            validated = adapter.validate_python(items, from_attributes=True)
+            return JSONResponse(adapter.dump_python(validated, mode="json")).body
+
+        timings = {"orm": ([], []), "rows": ([], [])}
+        for round_ in range(rounds + 1):
+            # Sesión nueva por vuelta: el identity map no reutiliza objetos ya cargados
+            with SessionLocal() as db:
+                items, query_ms = _timed(lambda: list_fn(db, tenant_id, 0, limit))
+                orm_json, serialize_ms = _timed(lambda: orm_body(items))
+            if round_:
+                timings["orm"][0].append(query_ms)
+                timings["orm"][1].append(serialize_ms)
+            with SessionLocal() as db:
+                rows, query_ms = _timed(lambda: rows_fn(db, tenant_id, 0, limit))
+                rows_json, serialize_ms = _timed(lambda: rows_to_json(rows, columns))
+            if round_:
+                timings["rows"][0].append(query_ms)
+                timings["rows"][1].append(serialize_ms)
+            else:
+                # La primera vuelta calienta cachés y sirve de comprobación de contrato
+                if json.loads(orm_json) != json.loads(rows_json):
+                    raise SystemExit(f"{name}: los dos caminos no producen el mismo JSON")
+
+        summary = {"list": name, "items": len(rows)}
+        for path, (query, serialize) in timings.items():
+            summary[f"{path}_query_ms"] = round(statistics.median(query), 2)
+            summary[f"{path}_serialize_ms"] = round(statistics.median(serialize), 2)
+        orm_total = summary["orm_query_ms"] + summary["orm_serialize_ms"]
+        rows_total = summary["rows_query_ms"] + summary["rows_serialize_ms"]
+        summary["speedup"] = round(orm_total / rows_total, 2) if rows_total else None
+        results.append(summary)
+    return results
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--limit", type=int, default=500, help="elementos por página")
+    parser.add_argument("--rounds", type=int, default=30, help="repeticiones medidas por camino")
+    parser.add_argument("--json", action="store_true", help="imprimir los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    use_perf_database()
+    results = run(args.limit, args.rounds)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'listado':<10} {'items':>5}  {'orm consulta/serial.':>22}  {'filas consulta/serial.':>22}  {'mejora':>6}")
+    for r in results:
+        print(
+            f"{r['list']:<10} {r['items']:>5}  "
+            f"{r['orm_query_ms']:>10.2f} / {r['orm_serialize_ms']:<9.2f}  "
+            f"{r['rows_query_ms']:>10.2f} / {r['rows_serialize_ms']:<9.2f}  "
+            f"{r['speedup']:>5}x"
+        )
+    print("\nMedianas en ms; mismo JSON por ambos caminos")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class BulkItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    key: Optional[str] = None
+    status: str  # created | updated | error
+    detail: Optional[str] = None
+
+class BulkResult(BaseModel):
+    created: int = 0
+    updated: int = 0
+    errors: int = 0
+    items: List[BulkItemResult] = []
@@ -21,4 +21,7 @@ class CustomerResponse(CustomerBase):
     tenant_id: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CustomerSearchHit(CustomerResponse):
+    rank: float
\ No newline at end of file
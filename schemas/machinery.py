@@ -1,6 +1,6 @@
 from pydantic import BaseModel
-from typing import Optional
-from datetime import date
+from typing import Dict, List, Optional
+from datetime import date, datetime
 
 class MachineryBase(BaseModel):
     name: str
@@ -71,12 +71,48 @@ class HorometerUpdate(BaseModel):
     horometer: float
     operator_name: Optional[str] = None
 
+class MachineryReadingCreate(BaseModel):
+    machinery_id: str
+    recorded_at: datetime
+    horometer: float
+    odometer: Optional[float] = None
+    operator_name: Optional[str] = None
+
+class ReadingRejection(BaseModel):
+    index: int
+    machinery_id: str
+    detail: str
+
+class ReadingBatchResult(BaseModel):
+    accepted: int
+    rejected: int
+    rejections: List[ReadingRejection] = []
+
+class UtilizationRow(BaseModel):
+    key: Optional[str] = None  # machinery_id o proyecto, según group_by
+    bucket_start: Optional[datetime] = None
+    hours_worked: float
+    km_travelled: float
+    idle_hours: float
+    readings_count: int
+    utilization: Optional[float] = None  # horas trabajadas / horas del bucket
+
+class UtilizationReport(BaseModel):
+    resolution: str  # hourly | daily: tabla de agregados usada
+    bucket: str
+    group_by: str
+    start: datetime
+    end: datetime
+    rows: List[UtilizationRow]
+
 class MachineryStats(BaseModel):
     total: int
     operational: int
     in_maintenance: int
     needs_maintenance: int
     total_hours: float
+    by_type: Dict[str, int] = {}
+    by_project: Dict[str, int] = {}
 
 class MachineryAlert(BaseModel):
     machinery_id: str
@@ -85,4 +121,6 @@ class MachineryAlert(BaseModel):
     current_hours: float
     next_maintenance_hours: float
     hours_until_maintenance: float
-    alert_level: str
\ No newline at end of file
+    alert_level: str  # critical | warning | upcoming
+    hours_per_day: Optional[float] = None
+    projected_due_at: Optional[datetime] = None
\ No newline at end of file
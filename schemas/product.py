@@ -31,4 +31,15 @@ class ProductResponse(ProductBase):
     tenant_id: str
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LowStockProductResponse(ProductResponse):
+    reorder_quantity: int  # stock_max - stock_current (0 si no hay máximo definido)
+
+class LowStockCategorySummary(BaseModel):
+    category: Optional[str] = None
+    products: int
+    reorder_quantity: int
+
+class ProductSearchHit(ProductResponse):
+    rank: float
\ No newline at end of file
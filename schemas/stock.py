@@ -0,0 +1,34 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+
+class StockMovementCreate(BaseModel):
+    movement_type: str  # entrada | salida | ajuste
+    # entrada/salida: cantidad positiva; ajuste: delta con signo
+    quantity: int
+    reference: Optional[str] = None
+    notes: Optional[str] = None
+
+class StockMovementBatchItem(StockMovementCreate):
+    product_id: str
+
+class StockMovementResponse(BaseModel):
+    id: str
+    product_id: str
+    movement_type: str
+    quantity: int
+    stock_after: int
+    reference: Optional[str] = None
+    notes: Optional[str] = None
+    created_by: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class StockMovementBatch(BaseModel):
+    movements: List[StockMovementBatchItem] = Field(..., min_length=1)
+
+class StockMovementBatchResult(BaseModel):
+    applied: int
+    movements: List[StockMovementResponse]
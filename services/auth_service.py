@@ -4,7 +4,7 @@ from app.models.user import User
 from app.models.tenant import Tenant
 from app.schemas.user import UserCreate
 from app.core.security import get_password_hash, verify_password, create_access_token
-import uuid
+from app.core import ids
 
 class AuthService:
     @staticmethod
@@ -20,7 +20,7 @@ class AuthService:
         # Si no se proporciona tenant_id, crear uno nuevo
         if not user_data.tenant_id:
             tenant = Tenant(
-                id=f"tenant-{uuid.uuid4().hex[:8]}",
+                id=ids.new_id(ids.TENANT),
                 name=f"Empresa de {user_data.full_name}",
                 plan="free"
             )
@@ -38,7 +38,7 @@ class AuthService:
         
         # Crear el usuario
         user = User(
-            id=f"user-{uuid.uuid4().hex[:8]}",
+            id=ids.new_id(ids.USER),
             email=user_data.email,
             password_hash=get_password_hash(user_data.password),
             full_name=user_data.full_name,
@@ -72,6 +72,16 @@ class AuthService:
             )
         return user
     
+    @staticmethod
+    def get_user(db: Session, user_id: str) -> User:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuario no encontrado"
+            )
+        return user
+    
     @staticmethod
     def generate_token(user: User) -> str:
         access_token = create_access_token(data={"sub": user.email})
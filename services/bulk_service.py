@@ -0,0 +1,100 @@
+from sqlalchemy import Boolean, insert, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.schemas.bulk import BulkItemResult, BulkResult
+from typing import Any, Collection, Dict, List, Optional, Tuple
+
+# Filas por sentencia INSERT multi-fila
+BULK_CHUNK_SIZE = 1000
+
+def insert_rows(db: Session, model, rows: List[Dict[str, Any]]) -> BulkResult:
+    """Insertar filas sin clave natural (ids generados por el llamador) en una transacción"""
+    if rows:
+        db.execute(insert(model), rows)
+        db.commit()
+    items = [BulkItemResult(index=i, id=row["id"], status="created") for i, row in enumerate(rows)]
+    return BulkResult(created=len(items), items=items)
+
+def upsert_rows(
+    db: Session,
+    model,
+    rows: List[Dict[str, Any]],
+    key: str,
+    sent: Optional[List[Collection[str]]] = None,
+    keep: Collection[str] = ()
+) -> BulkResult:
+    """INSERT ... ON CONFLICT (key) DO UPDATE por bloques, sin commit.
+
+    El llamador confirma la transacción, así puede completar en ella lo que
+    dependa de las filas escritas (proyecciones, movimientos de stock).
+
+    Solo se actualizan filas del mismo tenant; si la clave pertenece a otro
+    tenant la fila no vuelve en el RETURNING y se informa como error. Si la
+    clave se repite dentro del lote gana la última aparición.
+
+    En un conflicto se actualizan solo las columnas que el cliente envió en
+    esa fila (`sent`, de model_dump(exclude_unset=True)) y nunca las de
+    `keep`, que tienen su propio camino de escritura (stock, lecturas): un
+    campo omitido no vuelve a su valor por defecto. Las filas se agrupan por
+    conjunto de columnas a actualizar, una sentencia por grupo y bloque.
+    """
+    result = BulkResult()
+    if not rows:
+        return result
+
+    key_col = getattr(model, key)
+    fixed = {"id", "tenant_id", key, *keep}
+    items: List[Optional[BulkItemResult]] = [None] * len(rows)
+
+    last_index = {row[key]: i for i, row in enumerate(rows)}
+    groups: Dict[Tuple[str, ...], List[Tuple[int, Dict[str, Any]]]] = {}
+    for i, row in enumerate(rows):
+        if last_index[row[key]] != i:
+            items[i] = BulkItemResult(
+                index=i, key=row[key], status="error",
+                detail=f"{key} repetido en el lote (se aplica la última aparición)"
+            )
+            continue
+        columns = sent[i] if sent is not None else row
+        update_cols = tuple(sorted(c for c in columns if c not in fixed))
+        groups.setdefault(update_cols, []).append((i, row))
+
+    for update_cols, pending in groups.items():
+        for start in range(0, len(pending), BULK_CHUNK_SIZE):
+            chunk = pending[start:start + BULK_CHUNK_SIZE]
+            stmt = pg_insert(model).values([row for _, row in chunk])
+            # Sin columnas que actualizar, key = excluded.key: no cambia nada pero
+            # la fila vuelve en el RETURNING (DO NOTHING no la devolvería)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[key_col],
+                set_={c: stmt.excluded[c] for c in update_cols or (key,)},
+                where=model.tenant_id == stmt.excluded.tenant_id
+            ).returning(
+                model.id,
+                key_col,
+                # xmax = 0 solo en filas recién insertadas
+                literal_column("xmax = 0", Boolean).label("inserted")
+            )
+            returned = {r[1]: r for r in db.execute(stmt)}
+            for i, row in chunk:
+                r = returned.get(row[key])
+                if r is None:
+                    items[i] = BulkItemResult(
+                        index=i, key=row[key], status="error",
+                        detail=f"{key} ya registrado por otra empresa"
+                    )
+                else:
+                    items[i] = BulkItemResult(
+                        index=i, id=r.id, key=row[key],
+                        status="created" if r.inserted else "updated"
+                    )
+
+    result.items = items
+    for item in items:
+        if item.status == "created":
+            result.created += 1
+        elif item.status == "updated":
+            result.updated += 1
+        else:
+            result.errors += 1
+    return result
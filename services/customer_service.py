@@ -1,23 +1,75 @@
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
 from app.models.customer import Customer
-from app.schemas.customer import CustomerCreate, CustomerUpdate
-import uuid
+from app.schemas.customer import CustomerCreate, CustomerUpdate, CustomerResponse
+from app.schemas.bulk import BulkResult
+from app.core import ids
+from app.services import bulk_service, version_service
+from typing import List, Optional
 
 def create_customer(db: Session, customer: CustomerCreate, tenant_id: str):
     db_customer = Customer(
-        id=f"cust-{uuid.uuid4().hex[:8]}",
+        id=ids.new_id(ids.CUSTOMER),
         tenant_id=tenant_id,  # Asignar tenant automáticamente
         **customer.model_dump()
     )
     db.add(db_customer)
+    version_service.touch(db, tenant_id, version_service.CUSTOMERS)
     db.commit()
     db.refresh(db_customer)
     return db_customer
 
-def get_customers(db: Session, tenant_id: str, skip: int = 0, limit: int = 100):
-    return db.query(Customer).filter(
+def bulk_create_customers(db: Session, customers: List[CustomerCreate], tenant_id: str) -> BulkResult:
+    """Alta masiva en sentencias multi-fila (los clientes no tienen clave natural)"""
+    rows = [
+        {"id": new_id, "tenant_id": tenant_id, **customer.model_dump()}
+        for new_id, customer in zip(ids.new_ids(ids.CUSTOMER, len(customers)), customers)
+    ]
+    version_service.touch(db, tenant_id, version_service.CUSTOMERS)
+    return bulk_service.insert_rows(db, Customer, rows)
+
+def get_customers(db: Session, tenant_id: str, skip: int = 0, limit: int = 100, after_id: Optional[str] = None):
+    query = db.query(Customer).filter(
         Customer.tenant_id == tenant_id  # Filtrar por tenant
-    ).offset(skip).limit(limit).all()
+    )
+    if after_id:
+        # Paginación keyset: continuar tras el último id visto
+        query = query.filter(Customer.id > after_id)
+    return query.order_by(Customer.id).offset(skip).limit(limit).all()
+
+CUSTOMER_EXPORT_COLUMNS = list(CustomerResponse.model_fields)
+
+def _columns(columns: Optional[List[str]] = None) -> list:
+    return [getattr(Customer, c) for c in columns or CUSTOMER_EXPORT_COLUMNS]
+
+def _project(columns: Optional[List[str]] = None):
+    return select(*_columns(columns))
+
+def export_customers_query(tenant_id: str):
+    """SELECT proyectado para volcados completos (lo consume core.export)"""
+    return _project().where(
+        Customer.tenant_id == tenant_id
+    ).order_by(Customer.id)
+
+def get_customer_rows(
+    db: Session,
+    tenant_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[str] = None,
+    columns: Optional[List[str]] = None
+):
+    """Misma página que get_customers, en tuplas con `columns` (por defecto CUSTOMER_EXPORT_COLUMNS)"""
+    stmt = _project(columns).where(Customer.tenant_id == tenant_id)
+    if after_id:
+        stmt = stmt.where(Customer.id > after_id)
+    return db.execute(stmt.order_by(Customer.id).offset(skip).limit(limit)).all()
+
+def get_customer_row(db: Session, customer_id: str, tenant_id: str, columns: Optional[List[str]] = None):
+    """Un cliente proyectado a `columns`, o None"""
+    return db.execute(
+        _project(columns).where(Customer.id == customer_id, Customer.tenant_id == tenant_id)
+    ).first()
 
 def get_customer(db: Session, customer_id: str, tenant_id: str):
     return db.query(Customer).filter(
@@ -26,19 +78,35 @@ def get_customer(db: Session, customer_id: str, tenant_id: str):
     ).first()
 
 def update_customer(db: Session, customer_id: str, customer_update: CustomerUpdate, tenant_id: str):
-    db_customer = get_customer(db, customer_id, tenant_id)
-    if db_customer:
-        update_data = customer_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_customer, key, value)
-        db.commit()
-        db.refresh(db_customer)
-    return db_customer
+    """Un solo UPDATE ... RETURNING con los campos enviados; devuelve la fila
+    en el orden de CUSTOMER_EXPORT_COLUMNS, o None si no existe en el tenant"""
+    update_data = customer_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_customer_row(db, customer_id, tenant_id)
+    row = db.execute(
+        update(Customer)
+        .where(Customer.id == customer_id, Customer.tenant_id == tenant_id)
+        .values(**update_data)
+        .returning(*_columns())
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    version_service.touch(db, tenant_id, version_service.CUSTOMERS)
+    db.commit()
+    return row
 
 def delete_customer(db: Session, customer_id: str, tenant_id: str):
-    db_customer = get_customer(db, customer_id, tenant_id)
-    if db_customer:
-        db.delete(db_customer)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    deleted = db.execute(
+        delete(Customer)
+        .where(Customer.id == customer_id, Customer.tenant_id == tenant_id)
+        .returning(Customer.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if deleted is None:
+        db.rollback()
+        return False
+    version_service.touch(db, tenant_id, version_service.CUSTOMERS)
+    db.commit()
+    return True
\ No newline at end of file
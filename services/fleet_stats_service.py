@@ -0,0 +1,58 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.models.machinery import Machinery, MachineryStatus
+from app.schemas.machinery import MachineryStats
+from app.services import version_service
+import os
+
+FLEET_STATS_TTL_SECONDS = float(os.getenv("FLEET_STATS_TTL_SECONDS", "30"))
+UNASSIGNED_PROJECT = "sin_asignar"
+
+# Estadísticas por (tenant, versión de maquinaria). La versión cambia con cada
+# escritura en cualquier worker, así que una entrada nunca sirve datos viejos
+# con el ETag nuevo; la invalidación local solo libera memoria antes del TTL.
+fleet_stats_cache = TTLCache(maxsize=10000, ttl=FLEET_STATS_TTL_SECONDS)
+
+def invalidate_fleet_stats(tenant_id: str) -> None:
+    fleet_stats_cache.discard_where(lambda key, _: key[0] == tenant_id)
+
+def compute_fleet_stats(db: Session, tenant_id: str) -> MachineryStats:
+    """Todas las cifras del dashboard en una sola pasada agregada"""
+    needs_maintenance = (
+        Machinery.next_maintenance_hours != None
+    ) & (Machinery.horometer >= Machinery.next_maintenance_hours)
+    stmt = select(
+        Machinery.machinery_type,
+        Machinery.current_project,
+        func.count().label("total"),
+        func.count().filter(Machinery.status == MachineryStatus.OPERATIVO).label("operational"),
+        func.count().filter(Machinery.status == MachineryStatus.EN_MANTENIMIENTO).label("in_maintenance"),
+        func.count().filter(needs_maintenance).label("needs_maintenance"),
+        func.coalesce(func.sum(Machinery.horometer), 0.0).label("total_hours"),
+    ).where(
+        Machinery.tenant_id == tenant_id,
+        Machinery.is_active == True
+    ).group_by(Machinery.machinery_type, Machinery.current_project)
+
+    stats = MachineryStats(total=0, operational=0, in_maintenance=0, needs_maintenance=0, total_hours=0.0)
+    for row in db.execute(stmt):
+        stats.total += row.total
+        stats.operational += row.operational
+        stats.in_maintenance += row.in_maintenance
+        stats.needs_maintenance += row.needs_maintenance
+        stats.total_hours += row.total_hours
+        machinery_type = getattr(row.machinery_type, "value", row.machinery_type)
+        project = row.current_project or UNASSIGNED_PROJECT
+        stats.by_type[machinery_type] = stats.by_type.get(machinery_type, 0) + row.total
+        stats.by_project[project] = stats.by_project.get(project, 0) + row.total
+    return stats
+
+def get_fleet_stats(db: Session, tenant_id: str) -> MachineryStats:
+    version, _ = version_service.get_version(db, tenant_id, version_service.MACHINERY)
+    key = (tenant_id, version)
+    stats = fleet_stats_cache.get(key)
+    if stats is None:
+        stats = compute_fleet_stats(db, tenant_id)
+        fleet_stats_cache.set(key, stats)
+    return stats
@@ -1,120 +1,158 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.models.machinery import Machinery, MachineryStatus, MachineryType
+from sqlalchemy import select, update
+from app.models.machinery import Machinery
 from app.schemas.machinery import (
     MachineryCreate, 
     MachineryUpdate, 
+    MachineryResponse,
     MachineryStats,
     MachineryAlert,
     HorometerUpdate
 )
-import uuid
+from app.schemas.bulk import BulkResult
+from app.core import ids
+from app.services import bulk_service, fleet_stats_service, maintenance_service, telemetry_service, version_service
 from typing import Optional, List
-from datetime import datetime
+
+# Columnas que mantienen las lecturas de telemetría
+READING_COLUMNS = ("horometer", "odometer", "last_reading_at")
 
 def create_machinery(db: Session, machinery: MachineryCreate, tenant_id: str):
     db_machinery = Machinery(
-        id=f"mach-{uuid.uuid4().hex[:8]}",
+        id=ids.new_id(ids.MACHINERY),
         tenant_id=tenant_id,  # Asignar tenant automáticamente
         **machinery.model_dump()
     )
     db.add(db_machinery)
+    version_service.touch(db, tenant_id, version_service.MACHINERY)
     db.commit()
     db.refresh(db_machinery)
+    fleet_stats_service.invalidate_fleet_stats(tenant_id)
     return db_machinery
 
-def get_machinery_list(
-    db: Session, 
+def bulk_upsert_machinery(db: Session, machinery_items: List[MachineryCreate], tenant_id: str) -> BulkResult:
+    """Alta/actualización masiva por código en sentencias multi-fila"""
+    rows = [
+        {"id": new_id, "tenant_id": tenant_id, **machinery.model_dump()}
+        for new_id, machinery in zip(ids.new_ids(ids.MACHINERY, len(machinery_items)), machinery_items)
+    ]
+    sent = [machinery.model_dump(exclude_unset=True) for machinery in machinery_items]
+    version_service.touch(db, tenant_id, version_service.MACHINERY)
+    # Los contadores de una máquina existente solo avanzan con lecturas (telemetry_service)
+    result = bulk_service.upsert_rows(
+        db, Machinery, rows, key="code", sent=sent, keep=READING_COLUMNS
+    )
+    # Como en update_machinery: next_maintenance_hours e intervalo cambian la proyección
+    maintenance_service.refresh_projections(db, [item.id for item in result.items if item.status == "updated"])
+    db.commit()
+    fleet_stats_service.invalidate_fleet_stats(tenant_id)
+    return result
+
+def _list_filters(
     tenant_id: str,
-    skip: int = 0, 
-    limit: int = 100,
     machinery_type: Optional[str] = None,
     status: Optional[str] = None,
-    needs_maintenance: Optional[bool] = None
-):
-    query = db.query(Machinery).filter(
+    needs_maintenance: Optional[bool] = None,
+    after_id: Optional[str] = None
+) -> list:
+    filters = [
         Machinery.tenant_id == tenant_id,
         Machinery.is_active == True
-    )
-    
+    ]
     if machinery_type:
-        query = query.filter(Machinery.machinery_type == machinery_type)
+        filters.append(Machinery.machinery_type == machinery_type)
     if status:
-        query = query.filter(Machinery.status == status)
+        filters.append(Machinery.status == status)
     if needs_maintenance is not None:
         if needs_maintenance:
-            query = query.filter(
-                Machinery.next_maintenance_hours != None,
-                Machinery.horometer >= Machinery.next_maintenance_hours
-            )
+            filters.append(Machinery.next_maintenance_hours != None)
+            filters.append(Machinery.horometer >= Machinery.next_maintenance_hours)
         else:
-            query = query.filter(
+            filters.append(
                 (Machinery.next_maintenance_hours == None) |
                 (Machinery.horometer < Machinery.next_maintenance_hours)
             )
-    
-    return query.offset(skip).limit(limit).all()
+    if after_id:
+        # Paginación keyset: continuar tras el último id visto
+        filters.append(Machinery.id > after_id)
+    return filters
 
-def get_machinery_stats(db: Session, tenant_id: str) -> MachineryStats:
-    total = db.query(Machinery).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True
-    ).count()
-    
-    operational = db.query(Machinery).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True,
-        Machinery.status == MachineryStatus.OPERATIVO
-    ).count()
-    
-    in_maintenance = db.query(Machinery).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True,
-        Machinery.status == MachineryStatus.EN_MANTENIMIENTO
-    ).count()
-    
-    needs_maintenance = db.query(Machinery).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True,
-        Machinery.next_maintenance_hours != None,
-        Machinery.horometer >= Machinery.next_maintenance_hours
-    ).count()
-    
-    total_hours = db.query(func.sum(Machinery.horometer)).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True
-    ).scalar() or 0.0
-    
-    return MachineryStats(
-        total=total,
-        operational=operational,
-        in_maintenance=in_maintenance,
-        needs_maintenance=needs_maintenance,
-        total_hours=total_hours
+def get_machinery_list(
+    db: Session, 
+    tenant_id: str,
+    skip: int = 0, 
+    limit: int = 100,
+    machinery_type: Optional[str] = None,
+    status: Optional[str] = None,
+    needs_maintenance: Optional[bool] = None,
+    after_id: Optional[str] = None
+):
+    return db.query(Machinery).filter(
+        *_list_filters(tenant_id, machinery_type, status, needs_maintenance, after_id)
+    ).order_by(Machinery.id).offset(skip).limit(limit).all()
+
+MACHINERY_EXPORT_COLUMNS = list(MachineryResponse.model_fields)
+
+def _columns(columns: Optional[List[str]] = None) -> list:
+    return [getattr(Machinery, c) for c in columns or MACHINERY_EXPORT_COLUMNS]
+
+def _project(columns: Optional[List[str]] = None):
+    return select(*_columns(columns))
+
+def get_machinery_rows(
+    db: Session,
+    tenant_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    machinery_type: Optional[str] = None,
+    status: Optional[str] = None,
+    needs_maintenance: Optional[bool] = None,
+    after_id: Optional[str] = None,
+    columns: Optional[List[str]] = None
+):
+    """Misma página que get_machinery_list, proyectada a las columnas de la respuesta.
+
+    Devuelve tuplas (Row) en el orden de `columns` (por defecto
+    MACHINERY_EXPORT_COLUMNS), sin instanciar objetos ORM; las serializa
+    core.serialization. Con menos columnas el SELECT lee solo esas.
+    """
+    stmt = _project(columns).where(
+        *_list_filters(tenant_id, machinery_type, status, needs_maintenance, after_id)
     )
+    return db.execute(stmt.order_by(Machinery.id).offset(skip).limit(limit)).all()
 
-def get_maintenance_alerts(db: Session, tenant_id: str) -> List[MachineryAlert]:
-    machinery_list = db.query(Machinery).filter(
-        Machinery.tenant_id == tenant_id,
-        Machinery.is_active == True,
-        Machinery.next_maintenance_hours != None,
-        Machinery.horometer >= Machinery.next_maintenance_hours
-    ).all()
-    
-    alerts = []
-    for machinery in machinery_list:
-        hours_overdue = machinery.horometer - machinery.next_maintenance_hours
-        alerts.append(MachineryAlert(
-            machinery_id=machinery.id,
-            machinery_name=machinery.name,
-            machinery_code=machinery.code,
-            current_hours=machinery.horometer,
-            next_maintenance_hours=machinery.next_maintenance_hours,
-            hours_until_maintenance=-hours_overdue,
-            alert_level="critical" if hours_overdue > 50 else "warning"
-        ))
-    
-    return alerts
+def export_machinery_query(
+    tenant_id: str,
+    machinery_type: Optional[str] = None,
+    status: Optional[str] = None
+):
+    """SELECT proyectado para volcados completos (lo consume core.export)"""
+    stmt = _project().where(
+        *_list_filters(tenant_id, machinery_type, status)
+    )
+    return stmt.order_by(Machinery.id)
+
+def get_machinery_row(db: Session, machinery_id: str, tenant_id: str, columns: Optional[List[str]] = None):
+    """Una máquina activa proyectada a `columns`, o None"""
+    return db.execute(
+        _project(columns).where(
+            Machinery.id == machinery_id,
+            Machinery.tenant_id == tenant_id,
+            Machinery.is_active == True
+        )
+    ).first()
+
+def get_machinery_stats(db: Session, tenant_id: str) -> MachineryStats:
+    return fleet_stats_service.get_fleet_stats(db, tenant_id)
+
+def get_maintenance_alerts(
+    db: Session,
+    tenant_id: str,
+    within_hours: Optional[float] = None,
+    within_days: Optional[float] = None,
+    limit: int = 100
+) -> List[MachineryAlert]:
+    return maintenance_service.get_maintenance_queue(db, tenant_id, within_hours, within_days, limit)
 
 def get_machinery(db: Session, machinery_id: str, tenant_id: str):
     return db.query(Machinery).filter(
@@ -124,29 +162,60 @@ def get_machinery(db: Session, machinery_id: str, tenant_id: str):
     ).first()
 
 def update_machinery(db: Session, machinery_id: str, machinery_update: MachineryUpdate, tenant_id: str):
-    db_machinery = get_machinery(db, machinery_id, tenant_id)
-    if db_machinery:
-        update_data = machinery_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_machinery, key, value)
-        db.commit()
-        db.refresh(db_machinery)
-    return db_machinery
+    """UPDATE ... RETURNING con los campos enviados; devuelve la fila en el
+    orden de MACHINERY_EXPORT_COLUMNS, o None si no existe o está inactiva"""
+    update_data = machinery_update.model_dump(exclude_unset=True)
+    if not update_data:
+        return get_machinery_row(db, machinery_id, tenant_id)
+    row = db.execute(
+        update(Machinery)
+        .where(Machinery.id == machinery_id, Machinery.tenant_id == tenant_id, Machinery.is_active == True)
+        .values(**update_data)
+        .returning(*_columns())
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        db.rollback()
+        return None
+    if {"horometer", "next_maintenance_hours"} & update_data.keys():
+        # La proyección no forma parte de la respuesta: basta recalcularla en la base
+        maintenance_service.refresh_projections(db, [machinery_id])
+    version_service.touch(db, tenant_id, version_service.MACHINERY)
+    db.commit()
+    fleet_stats_service.invalidate_fleet_stats(tenant_id)
+    return row
 
 def update_horometer(db: Session, machinery_id: str, horometer_update: HorometerUpdate, tenant_id: str):
-    db_machinery = get_machinery(db, machinery_id, tenant_id)
-    if db_machinery:
-        db_machinery.horometer = horometer_update.horometer
-        if horometer_update.operator_name:
-            db_machinery.operator_name = horometer_update.operator_name
-        db.commit()
-        db.refresh(db_machinery)
-    return db_machinery
+    """Lectura manual de horómetro; devuelve la fila actualizada (MACHINERY_EXPORT_COLUMNS) o None"""
+    row = telemetry_service.record_reading(
+        db,
+        machinery_id,
+        tenant_id,
+        horometer_update.horometer,
+        operator_name=horometer_update.operator_name,
+        returning=_columns()
+    )
+    if row is None:
+        db.rollback()
+        return None
+    version_service.touch(db, tenant_id, version_service.MACHINERY)
+    db.commit()
+    fleet_stats_service.invalidate_fleet_stats(tenant_id)
+    return row
 
 def delete_machinery(db: Session, machinery_id: str, tenant_id: str):
-    db_machinery = get_machinery(db, machinery_id, tenant_id)
-    if db_machinery:
-        db_machinery.is_active = False
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    """Baja lógica en un solo UPDATE ... RETURNING id"""
+    deleted = db.execute(
+        update(Machinery)
+        .where(Machinery.id == machinery_id, Machinery.tenant_id == tenant_id, Machinery.is_active == True)
+        .values(is_active=False)
+        .returning(Machinery.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if deleted is None:
+        db.rollback()
+        return False
+    version_service.touch(db, tenant_id, version_service.MACHINERY)
+    db.commit()
+    fleet_stats_service.invalidate_fleet_stats(tenant_id)
+    return True
\ No newline at end of file
@@ -0,0 +1,127 @@
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+from app.models.machinery import Machinery
+from app.models.machinery_usage import MachineryUsageDaily
+from app.schemas.machinery import MachineryAlert
+from typing import Iterable, List, Optional
+from datetime import datetime, timedelta
+import os
+
+# Ventana de agregados diarios usada para estimar horas/día
+USAGE_RATE_WINDOW_DAYS = int(os.getenv("USAGE_RATE_WINDOW_DAYS", "14"))
+
+def _utc_now():
+    return func.timezone("utc", func.now())
+
+def hours_left_expression():
+    return Machinery.next_maintenance_hours - Machinery.horometer
+
+def projected_due_expression():
+    """Fecha estimada en la que se alcanzan next_maintenance_hours al ritmo actual"""
+    return case(
+        (
+            and_(Machinery.usage_hours_per_day > 0, Machinery.next_maintenance_hours != None),
+            func.coalesce(Machinery.last_reading_at, _utc_now()) + func.make_interval(
+                0, 0, 0, 0, 0, 0,
+                hours_left_expression() / Machinery.usage_hours_per_day * 86400
+            )
+        ),
+        else_=None
+    )
+
+def refresh_projections(db: Session, machinery_ids: Iterable[str]) -> None:
+    """Recalcular projected_maintenance_at a partir de las columnas ya guardadas"""
+    machinery_ids = list(machinery_ids)
+    if not machinery_ids:
+        return
+    db.execute(
+        update(Machinery)
+        .where(Machinery.id.in_(machinery_ids))
+        .values(projected_maintenance_at=projected_due_expression())
+        .execution_options(synchronize_session=False)
+    )
+
+def refresh_usage_rates(db: Session, tenant_id: str, machinery_ids: Iterable[str]) -> None:
+    """Actualizar horas/día de las máquinas desde machinery_usage_daily y reproyectar"""
+    machinery_ids = list(machinery_ids)
+    if not machinery_ids:
+        return
+    window_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(
+        days=USAGE_RATE_WINDOW_DAYS
+    )
+    # Días naturales desde el primer bucket de la ventana: los días sin
+    # lecturas cuentan como cero horas.
+    span_days = func.greatest(
+        func.extract("epoch", _utc_now() - func.min(MachineryUsageDaily.bucket_start)) / 86400, 1
+    )
+    rate = select(
+        func.sum(MachineryUsageDaily.hours_worked) / span_days
+    ).where(
+        MachineryUsageDaily.tenant_id == tenant_id,
+        MachineryUsageDaily.machinery_id == Machinery.id,
+        MachineryUsageDaily.bucket_start >= window_start
+    ).scalar_subquery()
+    # Sin filas en la ventana la máquina está parada: ritmo 0, así deja de
+    # tener fecha proyectada y solo cuenta el criterio de horas
+    db.execute(
+        update(Machinery)
+        .where(Machinery.tenant_id == tenant_id, Machinery.id.in_(machinery_ids))
+        .values(usage_hours_per_day=func.coalesce(rate, 0))
+        .execution_options(synchronize_session=False)
+    )
+    refresh_projections(db, machinery_ids)
+
+def get_maintenance_queue(
+    db: Session,
+    tenant_id: str,
+    within_hours: Optional[float] = None,
+    within_days: Optional[float] = None,
+    limit: int = 100
+) -> List[MachineryAlert]:
+    """Máquinas vencidas o próximas a mantenimiento, de más a menos urgente.
+
+    Sin ventana solo devuelve las vencidas. Ambos criterios se resuelven con
+    índices parciales (horas restantes y fecha proyectada), así que el coste
+    crece con el número de alertas devueltas, no con el tamaño de la flota.
+    """
+    hours_left = hours_left_expression()
+    conditions = [hours_left <= (within_hours or 0)]
+    if within_days is not None:
+        conditions.append(
+            Machinery.projected_maintenance_at <= datetime.utcnow() + timedelta(days=within_days)
+        )
+    rows = db.execute(
+        select(
+            Machinery.id,
+            Machinery.name,
+            Machinery.code,
+            Machinery.horometer,
+            Machinery.next_maintenance_hours,
+            hours_left.label("hours_left"),
+            Machinery.usage_hours_per_day,
+            Machinery.projected_maintenance_at
+        ).where(
+            Machinery.tenant_id == tenant_id,
+            Machinery.is_active == True,
+            Machinery.next_maintenance_hours != None,
+            or_(*conditions)
+        ).order_by(hours_left).limit(limit)
+    )
+    return [
+        MachineryAlert(
+            machinery_id=row.id,
+            machinery_name=row.name,
+            machinery_code=row.code,
+            current_hours=row.horometer,
+            next_maintenance_hours=row.next_maintenance_hours,
+            hours_until_maintenance=row.hours_left,
+            alert_level=(
+                "critical" if row.hours_left < -50
+                else "warning" if row.hours_left <= 0
+                else "upcoming"
+            ),
+            hours_per_day=row.usage_hours_per_day,
+            projected_due_at=row.projected_maintenance_at
+        )
+        for row in rows
+    ]
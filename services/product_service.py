@@ -1,31 +1,149 @@
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.orm import Session
 from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate
-import uuid
-from typing import Optional
+from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, LowStockCategorySummary
+from app.schemas.bulk import BulkResult
+from app.core import ids
+from app.services import bulk_service, stock_service, version_service
+from typing import List, Optional
 
-def create_product(db: Session, product: ProductCreate, tenant_id: str):
+def create_product(db: Session, product: ProductCreate, tenant_id: str, user_id: Optional[str] = None):
     db_product = Product(
-        id=f"prod-{uuid.uuid4().hex[:8]}",
+        id=ids.new_id(ids.PRODUCT),
         tenant_id=tenant_id,  # Asignar tenant automáticamente
         **product.model_dump()
     )
     db.add(db_product)
+    db.flush()
+    stock_service.record_opening_stock(db, tenant_id, {db_product.id: product.stock_current}, user_id)
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
     db.commit()
     db.refresh(db_product)
     return db_product
 
-def get_products(db: Session, tenant_id: str, skip: int = 0, limit: int = 100, category: Optional[str] = None):
+def bulk_upsert_products(
+    db: Session,
+    products: List[ProductCreate],
+    tenant_id: str,
+    user_id: Optional[str] = None
+) -> BulkResult:
+    """Alta/actualización masiva por SKU en sentencias multi-fila.
+
+    El stock pasa por el libro: entrada de stock inicial para los productos
+    nuevos y ajuste (set_stock_level) para los existentes que lo envían.
+    """
+    rows = [
+        {"id": new_id, "tenant_id": tenant_id, **product.model_dump()}
+        for new_id, product in zip(ids.new_ids(ids.PRODUCT, len(products)), products)
+    ]
+    sent = [product.model_dump(exclude_unset=True) for product in products]
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
+    # El stock de un producto existente solo cambia con movimientos (stock_service)
+    result = bulk_service.upsert_rows(db, Product, rows, key="sku", sent=sent, keep=("stock_current",))
+    opening = {}
+    for item in result.items:
+        if item.status == "created":
+            opening[item.id] = rows[item.index]["stock_current"]
+        elif item.status == "updated" and "stock_current" in sent[item.index]:
+            stock_service.set_stock_level(db, item.id, tenant_id, rows[item.index]["stock_current"], user_id)
+    stock_service.record_opening_stock(db, tenant_id, opening, user_id)
+    db.commit()
+    return result
+
+def get_products(
+    db: Session,
+    tenant_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    after_id: Optional[str] = None
+):
     query = db.query(Product).filter(Product.tenant_id == tenant_id)
     if category:
         query = query.filter(Product.category == category)
-    return query.offset(skip).limit(limit).all()
+    if after_id:
+        # Paginación keyset: continuar tras el último id visto
+        query = query.filter(Product.id > after_id)
+    return query.order_by(Product.id).offset(skip).limit(limit).all()
 
-def get_low_stock_products(db: Session, tenant_id: str):
-    return db.query(Product).filter(
-        Product.tenant_id == tenant_id,
-        Product.stock_current <= Product.stock_min
-    ).all()
+PRODUCT_EXPORT_COLUMNS = list(ProductResponse.model_fields)
+
+def _columns(columns: Optional[List[str]] = None) -> list:
+    return [getattr(Product, c) for c in columns or PRODUCT_EXPORT_COLUMNS]
+
+def _project(columns: Optional[List[str]] = None):
+    return select(*_columns(columns))
+
+def export_products_query(tenant_id: str, category: Optional[str] = None, columns: Optional[List[str]] = None):
+    """SELECT proyectado para volcados completos (lo consume core.export)"""
+    stmt = _project(columns).where(
+        Product.tenant_id == tenant_id
+    )
+    if category:
+        stmt = stmt.where(Product.category == category)
+    return stmt.order_by(Product.id)
+
+def get_product_rows(
+    db: Session,
+    tenant_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    category: Optional[str] = None,
+    after_id: Optional[str] = None,
+    columns: Optional[List[str]] = None
+):
+    """Misma página que get_products, en tuplas con `columns` (por defecto PRODUCT_EXPORT_COLUMNS)"""
+    stmt = export_products_query(tenant_id, category, columns)
+    if after_id:
+        stmt = stmt.where(Product.id > after_id)
+    return db.execute(stmt.offset(skip).limit(limit)).all()
+
+def get_product_row(db: Session, product_id: str, tenant_id: str, columns: Optional[List[str]] = None):
+    """Un producto proyectado a `columns`, o None"""
+    return db.execute(
+        _project(columns).where(Product.id == product_id, Product.tenant_id == tenant_id)
+    ).first()
+
+def _low_stock_filter(tenant_id: str):
+    # Debe coincidir con el predicado de ix_products_tenant_low_stock
+    return (Product.tenant_id == tenant_id, Product.stock_current <= Product.stock_min)
+
+def reorder_quantity_expression():
+    """stock_max - stock_current, sin negativos cuando no hay máximo definido"""
+    return func.greatest(
+        func.coalesce(Product.stock_max, 0) - func.coalesce(Product.stock_current, 0), 0
+    )
+
+LOW_STOCK_COLUMNS = [*PRODUCT_EXPORT_COLUMNS, "reorder_quantity"]
+
+def get_low_stock_products(
+    db: Session,
+    tenant_id: str,
+    limit: int = 100,
+    category: Optional[str] = None,
+    after_id: Optional[str] = None
+):
+    """Productos bajo mínimo con la cantidad a reponer, recorriendo solo el índice parcial"""
+    stmt = select(
+        *[getattr(Product, c) for c in PRODUCT_EXPORT_COLUMNS],
+        reorder_quantity_expression().label("reorder_quantity")
+    ).where(*_low_stock_filter(tenant_id))
+    if category:
+        stmt = stmt.where(Product.category == category)
+    if after_id:
+        stmt = stmt.where(Product.id > after_id)
+    return db.execute(stmt.order_by(Product.id).limit(limit)).all()
+
+def get_low_stock_summary(db: Session, tenant_id: str) -> List[LowStockCategorySummary]:
+    """Productos bajo mínimo y unidades a reponer por categoría (index-only scan)"""
+    rows = db.execute(
+        select(
+            Product.category,
+            func.count().label("products"),
+            func.coalesce(func.sum(reorder_quantity_expression()), 0).label("reorder_quantity")
+        ).where(*_low_stock_filter(tenant_id)).group_by(Product.category).order_by(Product.category)
+    )
+    return [LowStockCategorySummary.model_validate(row, from_attributes=True) for row in rows]
 
 def get_product(db: Session, product_id: str, tenant_id: str):
     return db.query(Product).filter(
@@ -33,20 +151,51 @@ def get_product(db: Session, product_id: str, tenant_id: str):
         Product.tenant_id == tenant_id
     ).first()
 
-def update_product(db: Session, product_id: str, product_update: ProductUpdate, tenant_id: str):
-    db_product = get_product(db, product_id, tenant_id)
-    if db_product:
-        update_data = product_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_product, key, value)
-        db.commit()
-        db.refresh(db_product)
-    return db_product
+def update_product(
+    db: Session,
+    product_id: str,
+    product_update: ProductUpdate,
+    tenant_id: str,
+    user_id: Optional[str] = None
+):
+    """UPDATE ... RETURNING con los campos enviados; devuelve la fila en el
+    orden de PRODUCT_EXPORT_COLUMNS, o None si no existe en el tenant"""
+    update_data = product_update.model_dump(exclude_unset=True)
+    # El saldo no se copia del payload (se pisarían movimientos concurrentes):
+    # se fija atómicamente y queda como ajuste en el libro de stock
+    stock_level = update_data.pop("stock_current", None)
+    if stock_level is not None:
+        stock_service.set_stock_level(
+            db, product_id, tenant_id, stock_level, user_id, notes="Actualización de producto"
+        )
+    if update_data:
+        # Después del ajuste: el RETURNING ya trae el saldo nuevo
+        row = db.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.tenant_id == tenant_id)
+            .values(**update_data)
+            .returning(*_columns())
+            .execution_options(synchronize_session=False)
+        ).first()
+    else:
+        row = get_product_row(db, product_id, tenant_id)
+    if row is None:
+        db.rollback()
+        return None
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
+    db.commit()
+    return row
 
 def delete_product(db: Session, product_id: str, tenant_id: str):
-    db_product = get_product(db, product_id, tenant_id)
-    if db_product:
-        db.delete(db_product)
-        db.commit()
-        return True
-    return False
\ No newline at end of file
+    deleted = db.execute(
+        delete(Product)
+        .where(Product.id == product_id, Product.tenant_id == tenant_id)
+        .returning(Product.id)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if deleted is None:
+        db.rollback()
+        return False
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
+    db.commit()
+    return True
\ No newline at end of file
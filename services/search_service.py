@@ -0,0 +1,54 @@
+import re
+from typing import List, Optional
+from sqlalchemy import func, literal, or_, select
+from sqlalchemy.orm import Session
+from app.models.customer import Customer
+from app.models.product import Product
+from app.schemas.customer import CustomerResponse
+from app.schemas.product import ProductResponse
+
+# Configuración sin stemming: sirve igual para nombres, SKU, emails y teléfonos,
+# y es la misma con la que se generan las columnas search_vector
+SEARCH_CONFIG = "simple"
+# Límite de términos por consulta (cada uno es un prefijo en el índice GIN)
+SEARCH_MAX_TERMS = 8
+
+_TERM_RE = re.compile(r"[^\W_]+")
+
+def prefix_tsquery(q: str) -> Optional[str]:
+    """Convertir texto libre en una tsquery de prefijos ("torn m8" -> "torn:* & m8:*").
+
+    Solo se conservan caracteres alfanuméricos, así que la entrada del
+    usuario nunca llega como sintaxis de tsquery.
+    """
+    terms = _TERM_RE.findall(q.lower())[:SEARCH_MAX_TERMS]
+    return " & ".join(f"{term}:*" for term in terms) or None
+
+def _search(db: Session, model, columns: List[str], tenant_id: str, q: str, skip: int, limit: int):
+    """Coincidencias por texto completo (prefijos, tipo type-ahead) o por similitud
+    de trigramas sobre el nombre (errores de tipeo, acentos), ordenadas por relevancia.
+
+    Ambas condiciones usan índices GIN que empiezan por tenant_id, así que
+    Postgres combina los dos con un BitmapOr sin salir del tenant.
+    """
+    text_query = prefix_tsquery(q)
+    if text_query is None:
+        return []
+    tsquery = func.to_tsquery(SEARCH_CONFIG, text_query)
+    term = literal(q.strip())
+    rank = (
+        func.ts_rank_cd(model.search_vector, tsquery) + func.word_similarity(term, model.name)
+    ).label("rank")
+    stmt = select(*[getattr(model, c) for c in columns], rank).where(
+        model.tenant_id == tenant_id,
+        or_(model.search_vector.op("@@")(tsquery), term.op("<%")(model.name))
+    ).order_by(rank.desc(), model.id).offset(skip).limit(limit)
+    return db.execute(stmt).all()
+
+def search_products(db: Session, tenant_id: str, q: str, skip: int = 0, limit: int = 20):
+    """Productos por nombre, SKU o descripción"""
+    return _search(db, Product, list(ProductResponse.model_fields), tenant_id, q, skip, limit)
+
+def search_customers(db: Session, tenant_id: str, q: str, skip: int = 0, limit: int = 20):
+    """Clientes por nombre, email o teléfono"""
+    return _search(db, Customer, list(CustomerResponse.model_fields), tenant_id, q, skip, limit)
\ No newline at end of file
@@ -0,0 +1,254 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+from fastapi import HTTPException
+from sqlalchemy import String, Integer, func, insert, literal, select, update, values, column
+from sqlalchemy.orm import Session
+from app.core import ids
+from app.models.product import Product
+from app.models.stock_movement import StockMovement, StockMovementType
+from app.schemas.stock import StockMovementCreate, StockMovementBatchItem
+from app.services import version_service
+
+# Columnas que se insertan en el libro, en el orden del INSERT ... SELECT
+_LEDGER_COLUMNS = [
+    "id", "tenant_id", "product_id", "movement_type", "quantity",
+    "stock_after", "reference", "notes", "created_by", "created_at",
+]
+
+def _signed_quantity(movement: StockMovementCreate) -> tuple:
+    """Validar el movimiento y devolver (tipo, delta con signo)"""
+    try:
+        movement_type = StockMovementType(movement.movement_type)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Tipo de movimiento inválido: {movement.movement_type}")
+    if movement_type == StockMovementType.AJUSTE:
+        if movement.quantity == 0:
+            raise HTTPException(status_code=400, detail="Un ajuste debe tener una cantidad distinta de cero")
+        return movement_type, movement.quantity
+    if movement.quantity <= 0:
+        raise HTTPException(status_code=400, detail="La cantidad debe ser positiva")
+    delta = movement.quantity if movement_type == StockMovementType.ENTRADA else -movement.quantity
+    return movement_type, delta
+
+def _current_stock():
+    # stock_current admite NULL en filas antiguas
+    return func.coalesce(Product.stock_current, 0)
+
+def _missing_or_insufficient(db: Session, product_id: str, tenant_id: str) -> HTTPException:
+    """Explicar por qué no se aplicó un movimiento (solo en el camino de error)"""
+    exists = db.execute(
+        select(Product.id).where(Product.id == product_id, Product.tenant_id == tenant_id)
+    ).first()
+    if exists is None:
+        return HTTPException(status_code=404, detail="Producto no encontrado")
+    return HTTPException(status_code=409, detail="Stock insuficiente")
+
+def apply_movement(
+    db: Session,
+    product_id: str,
+    movement: StockMovementCreate,
+    tenant_id: str,
+    user_id: Optional[str] = None
+) -> StockMovement:
+    """Aplicar un movimiento en un solo round-trip.
+
+    UPDATE ... SET stock_current = stock_current + delta RETURNING dentro de
+    un CTE que alimenta el INSERT del libro: no hay lectura previa que pueda
+    quedar obsoleta, y el bloqueo de la fila dura solo hasta el commit, que
+    se hace a continuación. Con delta negativo el UPDATE no toca la fila si
+    el saldo quedaría por debajo de cero.
+    """
+    movement_type, delta = _signed_quantity(movement)
+    applied = (
+        update(Product)
+        .where(
+            Product.id == product_id,
+            Product.tenant_id == tenant_id,
+            _current_stock() + delta >= 0
+        )
+        .values(stock_current=_current_stock() + delta)
+        .returning(Product.id, Product.stock_current)
+        .cte("applied")
+    )
+    stmt = insert(StockMovement).from_select(
+        _LEDGER_COLUMNS,
+        select(
+            literal(ids.new_id(ids.STOCK_MOVEMENT), String),
+            literal(tenant_id, String),
+            applied.c.id,
+            literal(movement_type, StockMovement.movement_type.type),
+            literal(delta, Integer),
+            applied.c.stock_current,
+            literal(movement.reference, String),
+            literal(movement.notes, String),
+            literal(user_id, String),
+            literal(datetime.utcnow()),
+        )
+    ).returning(StockMovement)
+    row = db.scalars(stmt).first()
+    if row is None:
+        db.rollback()
+        raise _missing_or_insufficient(db, product_id, tenant_id)
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
+    db.commit()
+    return row
+
+def apply_movements(
+    db: Session,
+    movements: List[StockMovementBatchItem],
+    tenant_id: str,
+    user_id: Optional[str] = None
+) -> List[StockMovement]:
+    """Aplicar un lote de movimientos en una transacción (todo o nada).
+
+    Se bloquean los productos afectados en orden de id (FOR NO KEY UPDATE,
+    compatible con las inserciones del libro que los referencian), de modo
+    que dos lotes concurrentes sobre los mismos SKU no pueden interbloquearse.
+    Después van un único UPDATE ... FROM (VALUES) con el delta neto por
+    producto y un INSERT multi-fila del libro: tres sentencias por lote,
+    independientemente de su tamaño.
+    """
+    parsed = [_signed_quantity(m) for m in movements]
+    product_ids = sorted({m.product_id for m in movements})
+    locked = dict(db.execute(
+        select(Product.id, _current_stock())
+        .where(Product.tenant_id == tenant_id, Product.id.in_(product_ids))
+        .order_by(Product.id)
+        .with_for_update(key_share=True)
+    ).all())
+    missing = [pid for pid in product_ids if pid not in locked]
+    if missing:
+        db.rollback()
+        raise HTTPException(status_code=404, detail={"message": "Producto no encontrado", "product_ids": missing})
+
+    # Saldos intermedios en el orden recibido: con las filas bloqueadas son exactos
+    balances: Dict[str, int] = dict(locked)
+    totals: Dict[str, int] = defaultdict(int)
+    rows, insufficient = [], []
+    now = datetime.utcnow()
+    for index, ((movement_type, delta), movement, movement_id) in enumerate(
+        zip(parsed, movements, ids.new_ids(ids.STOCK_MOVEMENT, len(movements)))
+    ):
+        balances[movement.product_id] += delta
+        totals[movement.product_id] += delta
+        if balances[movement.product_id] < 0:
+            insufficient.append(index)
+        rows.append({
+            "id": movement_id,
+            "tenant_id": tenant_id,
+            "product_id": movement.product_id,
+            "movement_type": movement_type,
+            "quantity": delta,
+            "stock_after": balances[movement.product_id],
+            "reference": movement.reference,
+            "notes": movement.notes,
+            "created_by": user_id,
+            "created_at": now,
+        })
+    if insufficient:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={"message": "Stock insuficiente", "indexes": insufficient})
+
+    net = [(pid, delta) for pid, delta in sorted(totals.items()) if delta]
+    if net:
+        deltas = values(column("id", String), column("delta", Integer), name="deltas").data(net)
+        db.execute(
+            update(Product)
+            .where(Product.id == deltas.c.id, Product.tenant_id == tenant_id)
+            .values(stock_current=_current_stock() + deltas.c.delta)
+        )
+    result = db.scalars(insert(StockMovement).returning(StockMovement), rows).all()
+    version_service.touch(db, tenant_id, version_service.PRODUCTS)
+    db.commit()
+    return result
+
+def set_stock_level(
+    db: Session,
+    product_id: str,
+    tenant_id: str,
+    stock_level: int,
+    user_id: Optional[str] = None,
+    notes: Optional[str] = None
+) -> Optional[StockMovement]:
+    """Fijar el saldo absoluto (conteo físico) registrando un ajuste por la diferencia.
+
+    El saldo anterior se lee en la misma sentencia con FOR NO KEY UPDATE,
+    así el delta registrado corresponde exactamente al valor sustituido.
+    No hace commit: lo usa update_product dentro de su transacción.
+    """
+    previous = (
+        select(Product.id, _current_stock().label("previous"))
+        .where(Product.id == product_id, Product.tenant_id == tenant_id)
+        .with_for_update(key_share=True)
+        .subquery()
+    )
+    old = db.execute(
+        update(Product)
+        .where(Product.id == previous.c.id)
+        .values(stock_current=stock_level)
+        .returning(previous.c.previous)
+    ).scalar()
+    if old is None or old == stock_level:
+        return None
+    movement = StockMovement(
+        id=ids.new_id(ids.STOCK_MOVEMENT),
+        tenant_id=tenant_id,
+        product_id=product_id,
+        movement_type=StockMovementType.AJUSTE,
+        quantity=stock_level - old,
+        stock_after=stock_level,
+        notes=notes,
+        created_by=user_id,
+    )
+    db.add(movement)
+    return movement
+
+def record_opening_stock(
+    db: Session,
+    tenant_id: str,
+    levels: Dict[str, int],
+    user_id: Optional[str] = None
+) -> None:
+    """Asentar en el libro el stock con el que se dan de alta productos nuevos.
+
+    El saldo ya lo escribió el INSERT del producto; aquí va un movimiento por
+    producto con stock distinto de cero (entrada, o ajuste si es negativo)
+    para que el libro cuadre con stock_current desde el primer día. Un solo
+    INSERT multi-fila; no hace commit.
+    """
+    opening = [(product_id, level) for product_id, level in levels.items() if level]
+    if not opening:
+        return
+    now = datetime.utcnow()
+    db.execute(insert(StockMovement), [
+        {
+            "id": movement_id,
+            "tenant_id": tenant_id,
+            "product_id": product_id,
+            "movement_type": StockMovementType.ENTRADA if level > 0 else StockMovementType.AJUSTE,
+            "quantity": level,
+            "stock_after": level,
+            "reference": None,
+            "notes": "Stock inicial",
+            "created_by": user_id,
+            "created_at": now,
+        }
+        for (product_id, level), movement_id in zip(opening, ids.new_ids(ids.STOCK_MOVEMENT, len(opening)))
+    ])
+
+def get_movements(
+    db: Session,
+    product_id: str,
+    tenant_id: str,
+    limit: int = 100,
+    after_id: Optional[str] = None
+) -> List[StockMovement]:
+    """Historial de movimientos de un producto, del más antiguo al más reciente"""
+    stmt = select(StockMovement).where(
+        StockMovement.tenant_id == tenant_id,
+        StockMovement.product_id == product_id
+    )
+    if after_id:
+        stmt = stmt.where(StockMovement.id > after_id)
+    return db.scalars(stmt.order_by(StockMovement.id).limit(limit)).all()
\ No newline at end of file
@@ -0,0 +1,467 @@
+from sqlalchemy import DateTime, Float, String, cast, column, func, insert, or_, select, text, update, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.machinery import Machinery
+from app.models.machinery_reading import MachineryReading
+from app.models.machinery_usage import MachineryUsageHourly, MachineryUsageDaily
+from app.services import fleet_stats_service, maintenance_service, version_service
+from app.schemas.machinery import (
+    MachineryReadingCreate,
+    ReadingBatchResult,
+    ReadingRejection,
+    UtilizationReport,
+    UtilizationRow
+)
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta, timezone
+import os
+import re
+import threading
+
+# Intervalos entre lecturas más largos que esto no se reparten hora a hora:
+# se imputan enteros al bucket de la lectura (máquina sin reportar días).
+ROLLUP_MAX_SPLIT_HOURS = int(os.getenv("ROLLUP_MAX_SPLIT_HOURS", "48"))
+
+READINGS_TABLE = MachineryReading.__tablename__
+_PARTITION_RE = re.compile(rf"^{READINGS_TABLE}_p(\d{{4}})(\d{{2}})$")
+_known_partitions = set()
+_partitions_lock = threading.Lock()
+
+def _as_utc_naive(value: datetime) -> datetime:
+    # Las columnas DateTime del modelo guardan UTC sin zona (datetime.utcnow)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+# Particiones mensuales del historial
+def _month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+def _partition_name(month: date) -> str:
+    return f"{READINGS_TABLE}_p{month.year:04d}{month.month:02d}"
+
+def ensure_reading_partitions(db: Session, timestamps: Iterable[datetime]) -> None:
+    """Crear (si faltan) las particiones mensuales que cubren los timestamps.
+
+    Usa una conexión propia y corta para que el DDL no retenga el lock de la
+    tabla padre durante la transacción de ingesta. Cada proceso recuerda las
+    particiones ya verificadas, así que en régimen estable no hay coste.
+    """
+    months = {_month_start(ts) for ts in timestamps} - _known_partitions
+    if not months:
+        return
+    with _partitions_lock:
+        with db.get_bind().begin() as conn:
+            # Serializa creadores concurrentes entre workers
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": READINGS_TABLE})
+            for month in sorted(months):
+                conn.execute(text(
+                    f'CREATE TABLE IF NOT EXISTS "{_partition_name(month)}" '
+                    f'PARTITION OF "{READINGS_TABLE}" '
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+                ))
+        _known_partitions.update(months)
+
+def drop_reading_partitions_before(db: Session, cutoff: date) -> List[str]:
+    """Eliminar las particiones de meses completos anteriores a cutoff.
+
+    Los agregados horarios/diarios se conservan; solo se pierde el detalle
+    de lecturas individuales.
+    """
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :parent"
+    ), {"parent": READINGS_TABLE}).scalars().all()
+    dropped = []
+    for name in sorted(rows):
+        match = _PARTITION_RE.match(name)
+        if not match:
+            continue
+        month = date(int(match.group(1)), int(match.group(2)), 1)
+        if _next_month(month) <= cutoff:
+            db.execute(text(f'ALTER TABLE "{READINGS_TABLE}" DETACH PARTITION "{name}"'))
+            db.execute(text(f'DROP TABLE "{name}"'))
+            _known_partitions.discard(month)
+            dropped.append(name)
+    db.commit()
+    return dropped
+
+# Agregados de uso
+_USAGE_FIELDS = ("hours_worked", "km_travelled", "idle_hours", "readings_count")
+
+def _hour_start(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+def _day_start(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def _split(start: datetime, end: datetime, floor, size: timedelta) -> List[Tuple[datetime, float]]:
+    """(bucket, fracción del intervalo) para cada bucket de `size` que cubre [start, end)"""
+    total = (end - start).total_seconds()
+    segments = []
+    cursor = start
+    while cursor < end:
+        bucket = floor(cursor)
+        stop = min(bucket + size, end)
+        segments.append((bucket, (stop - cursor).total_seconds() / total))
+        cursor = stop
+    return segments
+
+
+class _RollupAccumulator:
+    """Acumula deltas por (máquina, bucket) para aplicarlos con un upsert por tabla.
+
+    Los intervalos de hasta ROLLUP_MAX_SPLIT_HOURS se reparten hora a hora.
+    Los más largos (máquina sin reportar días) se reparten por días y solo
+    van al agregado diario: ninguna fila horaria acumula más que su hora.
+    """
+
+    def __init__(self, tenant_id: str):
+        self.tenant_id = tenant_id
+        self.hourly: Dict[Tuple[str, datetime], dict] = {}
+        self.daily_only: Dict[Tuple[str, datetime], dict] = {}
+
+    def _bucket(self, target: dict, machinery_id: str, bucket: datetime, project: Optional[str]) -> dict:
+        key = (machinery_id, bucket)
+        if key not in target:
+            target[key] = {
+                "machinery_id": machinery_id,
+                "tenant_id": self.tenant_id,
+                "bucket_start": bucket,
+                "project": project,
+                "hours_worked": 0.0,
+                "km_travelled": 0.0,
+                "idle_hours": 0.0,
+                "readings_count": 0,
+            }
+        return target[key]
+
+    def add(
+        self,
+        machinery_id: str,
+        project: Optional[str],
+        previous_at: Optional[datetime],
+        previous_hours: float,
+        previous_km: float,
+        recorded_at: datetime,
+        hours: float,
+        km: Optional[float]
+    ) -> None:
+        self._bucket(self.hourly, machinery_id, _hour_start(recorded_at), project)["readings_count"] += 1
+        if previous_at is None or recorded_at <= previous_at or hours < previous_hours:
+            # Primera lectura o corrección manual: no hay intervalo que imputar
+            return
+
+        worked = hours - previous_hours
+        travelled = max(km - previous_km, 0.0) if km is not None else 0.0
+        elapsed = (recorded_at - previous_at).total_seconds() / 3600
+        idle = max(elapsed - worked, 0.0)
+
+        # Reparto proporcional al tiempo entre los buckets que cubre el intervalo
+        if elapsed > ROLLUP_MAX_SPLIT_HOURS:
+            target, segments = self.daily_only, _split(previous_at, recorded_at, _day_start, timedelta(days=1))
+        else:
+            target, segments = self.hourly, _split(previous_at, recorded_at, _hour_start, timedelta(hours=1))
+        for bucket, share in segments:
+            row = self._bucket(target, machinery_id, bucket, project)
+            row["hours_worked"] += worked * share
+            row["km_travelled"] += travelled * share
+            row["idle_hours"] += idle * share
+
+    def daily(self) -> List[dict]:
+        days = {key: dict(row) for key, row in self.daily_only.items()}
+        for (machinery_id, bucket), row in self.hourly.items():
+            target = self._bucket(days, machinery_id, _day_start(bucket), row["project"])
+            for field in _USAGE_FIELDS:
+                target[field] += row[field]
+        return list(days.values())
+
+    def apply(self, db: Session) -> None:
+        for model, rows in ((MachineryUsageHourly, list(self.hourly.values())), (MachineryUsageDaily, self.daily())):
+            if not rows:
+                continue
+            stmt = pg_insert(model).values(rows)
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[model.machinery_id, model.bucket_start],
+                set_={
+                    "project": func.coalesce(stmt.excluded.project, model.project),
+                    "hours_worked": model.hours_worked + stmt.excluded.hours_worked,
+                    "km_travelled": model.km_travelled + stmt.excluded.km_travelled,
+                    "idle_hours": model.idle_hours + stmt.excluded.idle_hours,
+                    "readings_count": model.readings_count + stmt.excluded.readings_count,
+                }
+            ))
+
+def record_reading(
+    db: Session,
+    machinery_id: str,
+    tenant_id: str,
+    horometer: float,
+    recorded_at: Optional[datetime] = None,
+    odometer: Optional[float] = None,
+    operator_name: Optional[str] = None,
+    returning: Sequence = ()
+):
+    """Registrar una lectura suelta: historial, agregados y columnas actuales (sin commit).
+
+    Las columnas actuales se fijan con un UPDATE ... FROM sobre los valores
+    anteriores bloqueados (FOR NO KEY UPDATE), que devuelve en la misma ida
+    y vuelta lo necesario para los agregados y las columnas de `returning`.
+    Devuelve la fila de `returning`, o None si la máquina no existe o está
+    inactiva.
+    """
+    recorded_at = recorded_at or datetime.utcnow()
+    # Antes del UPDATE: el DDL de la partición (conexión propia) choca con su lock sobre machinery
+    ensure_reading_partitions(db, [recorded_at])
+    previous = (
+        select(
+            Machinery.id,
+            Machinery.current_project.label("previous_project"),
+            Machinery.last_reading_at.label("previous_reading_at"),
+            Machinery.horometer.label("previous_horometer"),
+            Machinery.odometer.label("previous_odometer")
+        )
+        .where(Machinery.id == machinery_id, Machinery.tenant_id == tenant_id, Machinery.is_active == True)
+        .with_for_update(key_share=True)
+        .subquery()
+    )
+    current = {"horometer": horometer, "last_reading_at": recorded_at}
+    if odometer is not None:
+        current["odometer"] = odometer
+    if operator_name:
+        current["operator_name"] = operator_name
+    row = db.execute(
+        update(Machinery)
+        .where(Machinery.id == previous.c.id)
+        .values(**current)
+        .returning(
+            *returning,
+            previous.c.previous_project, previous.c.previous_reading_at,
+            previous.c.previous_horometer, previous.c.previous_odometer
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    if row is None:
+        return None
+
+    rollups = _RollupAccumulator(tenant_id)
+    rollups.add(
+        machinery_id, row.previous_project,
+        row.previous_reading_at, row.previous_horometer or 0.0, row.previous_odometer or 0.0,
+        recorded_at, horometer, odometer
+    )
+    db.add(MachineryReading(
+        machinery_id=machinery_id,
+        tenant_id=tenant_id,
+        recorded_at=recorded_at,
+        horometer=horometer,
+        odometer=odometer,
+        operator_name=operator_name
+    ))
+    rollups.apply(db)
+    maintenance_service.refresh_usage_rates(db, tenant_id, [machinery_id])
+    return row[:len(returning)]
+
+def ingest_readings(db: Session, readings: List[MachineryReadingCreate], tenant_id: str) -> ReadingBatchResult:
+    """Ingesta por lotes de lecturas de telemetría.
+
+    Una consulta para el estado actual de las máquinas implicadas, un INSERT
+    multi-fila al historial, un upsert por tabla de agregados y un único
+    UPDATE ... FROM (VALUES ...) para dejar horómetro/odómetro en la última
+    lectura aceptada de cada máquina. Se rechazan lecturas de máquinas ajenas
+    o inactivas, fuera de orden (anteriores a la última registrada) o con
+    contadores que retroceden.
+
+    El estado se lee con FOR NO KEY UPDATE (en orden de id, sin interbloqueos
+    entre lotes): otro lote o una lectura manual de las mismas máquinas
+    espera al commit y valida contra el estado ya actualizado, así que
+    ningún intervalo se suma dos veces a los agregados.
+    """
+    rejections: List[ReadingRejection] = []
+    if not readings:
+        return ReadingBatchResult(accepted=0, rejected=0)
+
+    # Antes de bloquear: el DDL de la partición (conexión propia) choca con los locks sobre machinery
+    ensure_reading_partitions(db, [_as_utc_naive(r.recorded_at) for r in readings])
+
+    machinery_ids = {r.machinery_id for r in readings}
+    state: Dict[str, dict] = {
+        row.id: {
+            "horometer": row.horometer or 0.0,
+            # NULL se conserva: sin lecturas con odómetro la columna sigue vacía
+            "odometer": row.odometer,
+            "last_reading_at": row.last_reading_at,
+            "project": row.current_project,
+            "operator_name": None,
+        }
+        for row in db.execute(
+            select(
+                Machinery.id, Machinery.horometer, Machinery.odometer,
+                Machinery.last_reading_at, Machinery.current_project
+            ).where(
+                Machinery.id.in_(machinery_ids),
+                Machinery.tenant_id == tenant_id,
+                Machinery.is_active == True
+            )
+            .order_by(Machinery.id)
+            .with_for_update(key_share=True)
+        )
+    }
+
+    ordered = sorted(
+        ((i, r, _as_utc_naive(r.recorded_at)) for i, r in enumerate(readings)),
+        key=lambda item: (item[1].machinery_id, item[2])
+    )
+    accepted_rows = []
+    touched = set()
+    rollups = _RollupAccumulator(tenant_id)
+    for index, reading, recorded_at in ordered:
+        current = state.get(reading.machinery_id)
+        detail = None
+        if current is None:
+            detail = "Maquinaria no encontrada"
+        elif current["last_reading_at"] is not None and recorded_at <= current["last_reading_at"]:
+            detail = "Lectura fuera de orden: anterior a la última registrada"
+        elif reading.horometer < current["horometer"]:
+            detail = "El horómetro no puede retroceder"
+        elif reading.odometer is not None and reading.odometer < (current["odometer"] or 0.0):
+            detail = "El odómetro no puede retroceder"
+        if detail:
+            rejections.append(ReadingRejection(index=index, machinery_id=reading.machinery_id, detail=detail))
+            continue
+
+        rollups.add(
+            reading.machinery_id, current["project"],
+            current["last_reading_at"], current["horometer"], current["odometer"] or 0.0,
+            recorded_at, reading.horometer, reading.odometer
+        )
+        accepted_rows.append({
+            "machinery_id": reading.machinery_id,
+            "tenant_id": tenant_id,
+            "recorded_at": recorded_at,
+            "horometer": reading.horometer,
+            "odometer": reading.odometer,
+            "operator_name": reading.operator_name,
+        })
+        current["horometer"] = reading.horometer
+        if reading.odometer is not None:
+            current["odometer"] = reading.odometer
+        if reading.operator_name:
+            current["operator_name"] = reading.operator_name
+        current["last_reading_at"] = recorded_at
+        touched.add(reading.machinery_id)
+
+    if accepted_rows:
+        db.execute(insert(MachineryReading), accepted_rows)
+        rollups.apply(db)
+
+        latest = values(
+            column("id", String),
+            column("horometer", Float),
+            column("odometer", Float),
+            column("operator_name", String),
+            column("recorded_at", DateTime),
+            name="latest"
+        ).data([
+            (
+                machinery_id,
+                state[machinery_id]["horometer"],
+                state[machinery_id]["odometer"],
+                state[machinery_id]["operator_name"],
+                state[machinery_id]["last_reading_at"],
+            )
+            for machinery_id in sorted(touched)
+        ])
+        db.execute(
+            update(Machinery)
+            .where(
+                Machinery.id == latest.c.id,
+                Machinery.tenant_id == tenant_id,
+                # Nunca retroceder la última lectura registrada
+                or_(Machinery.last_reading_at.is_(None), Machinery.last_reading_at < cast(latest.c.recorded_at, DateTime))
+            )
+            .values(
+                horometer=cast(latest.c.horometer, Float),
+                odometer=cast(latest.c.odometer, Float),
+                operator_name=func.coalesce(cast(latest.c.operator_name, String), Machinery.operator_name),
+                last_reading_at=cast(latest.c.recorded_at, DateTime)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        maintenance_service.refresh_usage_rates(db, tenant_id, touched)
+        version_service.touch(db, tenant_id, version_service.MACHINERY)
+    db.commit()
+    if accepted_rows:
+        fleet_stats_service.invalidate_fleet_stats(tenant_id)
+
+    rejections.sort(key=lambda r: r.index)
+    return ReadingBatchResult(
+        accepted=len(accepted_rows),
+        rejected=len(rejections),
+        rejections=rejections
+    )
+
+_BUCKET_HOURS = {"hour": 1, "day": 24, "week": 24 * 7}
+
+def get_utilization(
+    db: Session,
+    tenant_id: str,
+    start: datetime,
+    end: datetime,
+    bucket: str = "day",
+    group_by: str = "machinery",
+    machinery_id: Optional[str] = None,
+    project: Optional[str] = None
+) -> UtilizationReport:
+    """Consulta de uso por rango sobre la tabla de agregados más gruesa posible.
+
+    Se usa la tabla diaria salvo que se pidan buckets horarios o que el rango
+    no empiece y termine en medianoche; nunca se recorren lecturas crudas.
+    """
+    start, end = _as_utc_naive(start), _as_utc_naive(end)
+    day_aligned = all(ts == ts.replace(hour=0, minute=0, second=0, microsecond=0) for ts in (start, end))
+    resolution = "daily" if bucket != "hour" and day_aligned else "hourly"
+    model = MachineryUsageDaily if resolution == "daily" else MachineryUsageHourly
+
+    key_col = model.machinery_id if group_by == "machinery" else model.project
+    columns = [key_col.label("key")]
+    if bucket != "total":
+        columns.append(func.date_trunc(bucket, model.bucket_start).label("bucket_start"))
+    columns += [
+        func.sum(model.hours_worked).label("hours_worked"),
+        func.sum(model.km_travelled).label("km_travelled"),
+        func.sum(model.idle_hours).label("idle_hours"),
+        func.sum(model.readings_count).label("readings_count"),
+    ]
+    stmt = select(*columns).where(
+        model.tenant_id == tenant_id,
+        model.bucket_start >= start,
+        model.bucket_start < end
+    )
+    if machinery_id:
+        stmt = stmt.where(model.machinery_id == machinery_id)
+    if project:
+        stmt = stmt.where(model.project == project)
+    group_cols = columns[:2] if bucket != "total" else columns[:1]
+    stmt = stmt.group_by(*group_cols).order_by(*group_cols)
+
+    bucket_hours = _BUCKET_HOURS.get(bucket, (end - start).total_seconds() / 3600)
+    rows = []
+    for row in db.execute(stmt):
+        data = row._asdict()
+        if group_by == "machinery" and bucket_hours:
+            data["utilization"] = round(data["hours_worked"] / bucket_hours, 4)
+        rows.append(UtilizationRow(**data))
+    return UtilizationReport(
+        resolution=resolution,
+        bucket=bucket,
+        group_by=group_by,
+        start=start,
+        end=end,
+        rows=rows
+    )
\ No newline at end of file
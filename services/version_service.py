@@ -0,0 +1,74 @@
+import logging
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import event, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app.models.resource_version import ResourceVersion
+from app.core import replicas
+
+MACHINERY = "machinery"
+PRODUCTS = "products"
+CUSTOMERS = "customers"
+
+_PENDING_KEY = "touched_resources"
+
+logger = logging.getLogger("app.versions")
+
+def touch(db: Session, tenant_id: str, resource: str) -> None:
+    """Marcar un recurso como modificado en la transacción en curso.
+
+    El incremento se escribe después del COMMIT en una sentencia propia (ver
+    _bump_versions): la fila de versión no queda bloqueada dentro de la
+    transacción de escritura, y varias marcas del mismo recurso cuentan
+    como una.
+    """
+    db.info.setdefault(_PENDING_KEY, set()).add((tenant_id, resource))
+
+def get_version(db: Session, tenant_id: str, resource: str) -> Tuple[int, Optional[datetime]]:
+    """(versión, última modificación); (0, None) si el recurso nunca se escribió"""
+    row = db.execute(
+        select(ResourceVersion.version, ResourceVersion.updated_at).where(
+            ResourceVersion.tenant_id == tenant_id,
+            ResourceVersion.resource == resource
+        )
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+@event.listens_for(Session, "after_commit")
+def _bump_versions(session: Session) -> None:
+    """Incrementar las versiones marcadas, ya confirmados los datos.
+
+    UPSERT autocommit en su propia conexión: la fila (tenant, recurso) solo
+    se bloquea lo que dura esa sentencia, así las escrituras de un tenant
+    (ingesta de telemetría incluida) no se serializan en ella hasta el
+    COMMIT. Es seguro para conditional_get, que lee la versión antes que los
+    datos: un ETag nunca es más nuevo que el cuerpo servido.
+    """
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    # Read-your-writes: las próximas lecturas del tenant no deben ir a una réplica atrasada
+    for tenant_id in {tenant_id for tenant_id, _ in pending}:
+        replicas.note_write(tenant_id)
+    now = datetime.utcnow()
+    # Orden fijo: dos incrementos que tocan los mismos recursos no se interbloquean
+    rows = [
+        {"tenant_id": tenant_id, "resource": resource, "version": 1, "updated_at": now}
+        for tenant_id, resource in sorted(pending)
+    ]
+    stmt = pg_insert(ResourceVersion).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ResourceVersion.tenant_id, ResourceVersion.resource],
+        set_={"version": ResourceVersion.version + 1, "updated_at": stmt.excluded.updated_at}
+    )
+    try:
+        with session.get_bind(ResourceVersion).begin() as conn:
+            conn.execute(stmt)
+    except Exception:
+        # Los datos ya están confirmados: la versión se pondrá al día en la próxima escritura
+        logger.exception("No se pudo incrementar la versión de %s", sorted(pending))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_versions(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+from datetime import datetime
+
+import pytest
+
+# Tablas con tenant_id, en orden de borrado (hijas antes que padres)
+_TENANT_TABLES = [
+    "resource_versions", "stock_movements", "machinery_usage_hourly", "machinery_usage_daily",
+    "machinery_readings", "machinery", "products", "customers", "users",
+]
+
+
+@pytest.fixture(scope="session")
+def perf_database():
+    """Base desechable de PERF_DATABASE_URL con las migraciones aplicadas.
+
+    Las pruebas que escriben en Postgres se saltan si no está configurada.
+    """
+    if not os.getenv("PERF_DATABASE_URL"):
+        pytest.skip("PERF_DATABASE_URL no está configurada (usar una base desechable)")
+    from app.perf import use_perf_database
+    from app.perf.seed import apply_migrations
+
+    use_perf_database()
+    apply_migrations()
+    from app.database import get_engine
+
+    return get_engine()
+
+
+@pytest.fixture
+def db(perf_database):
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        session.close()
+
+
+@pytest.fixture
+def make_tenant(perf_database):
+    """Crea tenants propios de la prueba y borra todas sus filas al terminar"""
+    from sqlalchemy import text
+    from app.core import ids
+
+    created = []
+
+    def factory() -> str:
+        tenant_id = ids.new_id(ids.TENANT)
+        with perf_database.begin() as conn:
+            conn.execute(
+                text("INSERT INTO tenants (id, name, plan, is_active, created_at) VALUES (:t, :t, 'free', true, :now)"),
+                {"t": tenant_id, "now": datetime.utcnow()}
+            )
+        created.append(tenant_id)
+        return tenant_id
+
+    yield factory
+    with perf_database.begin() as conn:
+        for table in _TENANT_TABLES:
+            conn.execute(text(f"DELETE FROM {table} WHERE tenant_id = ANY(:t)"), {"t": created})
+        conn.execute(text("DELETE FROM tenants WHERE id = ANY(:t)"), {"t": created})
+
+
+@pytest.fixture
+def tenant_id(make_tenant) -> str:
+    return make_tenant()
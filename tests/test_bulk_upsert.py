@@ -0,0 +1,84 @@
+from sqlalchemy import select
+
+from app.core import ids
+from app.models.product import Product
+from app.services.bulk_service import upsert_rows
+
+
+def _row(tenant_id, sku, **values):
+    row = {
+        "id": ids.new_id(ids.PRODUCT), "tenant_id": tenant_id, "sku": sku, "name": sku,
+        "description": None, "category": None, "price": 0.0, "cost": 0.0,
+        "stock_min": 0, "stock_max": 0, "stock_current": 0,
+    }
+    row.update(values)
+    return row
+
+
+def _sku(tenant_id, name):
+    # sku es único global: prefijo del tenant para no chocar entre pruebas
+    return f"{tenant_id}-{name}"
+
+
+def _product(db, sku):
+    return db.execute(select(Product).where(Product.sku == sku)).scalar_one()
+
+
+def test_inserta_y_actualiza_segun_xmax(db, tenant_id):
+    existing = _sku(tenant_id, "a")
+    upsert_rows(db, Product, [_row(tenant_id, existing)], key="sku")
+    db.commit()
+
+    result = upsert_rows(db, Product, [_row(tenant_id, existing, name="A2"), _row(tenant_id, _sku(tenant_id, "b"))], key="sku")
+    db.commit()
+
+    assert [item.status for item in result.items] == ["updated", "created"]
+    assert (result.created, result.updated, result.errors) == (1, 1, 0)
+    assert result.items[0].id == _product(db, existing).id
+    assert _product(db, existing).name == "A2"
+
+
+def test_clave_de_otro_tenant_no_se_actualiza(db, make_tenant):
+    owner, intruder = make_tenant(), make_tenant()
+    sku = _sku(owner, "compartido")
+    upsert_rows(db, Product, [_row(owner, sku, name="original", price=10.0)], key="sku")
+    db.commit()
+
+    result = upsert_rows(db, Product, [_row(intruder, sku, name="pisado", price=1.0)], key="sku")
+    db.commit()
+
+    (item,) = result.items
+    assert item.status == "error" and item.id is None
+    assert result.errors == 1
+    product = _product(db, sku)
+    assert (product.tenant_id, product.name, product.price) == (owner, "original", 10.0)
+
+
+def test_solo_se_actualizan_las_columnas_enviadas(db, tenant_id):
+    sku = _sku(tenant_id, "parcial")
+    upsert_rows(db, Product, [_row(tenant_id, sku, price=10.0, category="filtros", stock_current=7)], key="sku")
+    db.commit()
+
+    # La fila completa lleva los valores por defecto, pero solo se envió el nombre
+    result = upsert_rows(
+        db, Product, [_row(tenant_id, sku, name="renombrado", stock_current=99)], key="sku",
+        sent=[{"sku", "name", "stock_current"}], keep=("stock_current",)
+    )
+    db.commit()
+
+    assert result.items[0].status == "updated"
+    product = _product(db, sku)
+    assert (product.name, product.price, product.category) == ("renombrado", 10.0, "filtros")
+    assert product.stock_current == 7
+
+
+def test_clave_repetida_gana_la_ultima(db, tenant_id):
+    sku = _sku(tenant_id, "repetido")
+    result = upsert_rows(
+        db, Product, [_row(tenant_id, sku, name="primera"), _row(tenant_id, sku, name="segunda")], key="sku"
+    )
+    db.commit()
+
+    assert [item.status for item in result.items] == ["error", "created"]
+    assert (result.created, result.errors) == (1, 1)
+    assert _product(db, sku).name == "segunda"
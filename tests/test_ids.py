@@ -0,0 +1,56 @@
+import pytest
+
+from app.core import ids
+
+NOW = 1_790_000_000.123
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    """Reloj fijo (o manipulable) para forzar ids en el mismo milisegundo"""
+    clock = {"now": NOW}
+    monkeypatch.setattr(ids.time, "time", lambda: clock["now"])
+    # Estado del generador limpio; monkeypatch lo restaura al terminar
+    monkeypatch.setattr(ids, "_last_ms", 0)
+    monkeypatch.setattr(ids, "_last_random", 0)
+    return clock
+
+
+def test_ids_crecientes_en_el_mismo_milisegundo(frozen_clock):
+    generated = [ids.new_id(ids.PRODUCT) for _ in range(2000)]
+
+    assert generated == sorted(generated)
+    assert len(set(generated)) == len(generated)
+
+
+def test_reloj_que_retrocede_no_rompe_el_orden(frozen_clock):
+    before = ids.new_id(ids.PRODUCT)
+    frozen_clock["now"] = NOW - 5
+    after = ids.new_id(ids.PRODUCT)
+
+    assert after > before
+
+
+def test_bloque_ordenado_y_contiguo_con_new_id(frozen_clock):
+    first = ids.new_id(ids.STOCK_MOVEMENT)
+    # Suficientes para cruzar varios saltos de los 10 bits tabulados
+    block = ids.new_ids(ids.STOCK_MOVEMENT, 3000)
+    last = ids.new_id(ids.STOCK_MOVEMENT)
+
+    assert len(block) == 3000
+    assert block == sorted(block)
+    assert len(set(block)) == len(block)
+    assert first < block[0] and block[-1] < last
+    assert all(len(value) == len(first) for value in block)
+
+
+def test_bloque_vacio():
+    assert ids.new_ids(ids.PRODUCT, 0) == []
+
+
+def test_timestamp_de_ida_y_vuelta(frozen_clock):
+    value = ids.new_id(ids.MACHINERY)
+
+    assert value.startswith("mach-")
+    assert ids.id_timestamp(value) == pytest.approx(NOW, abs=0.001)
+    assert ids.id_timestamp(ids.new_ids(ids.MACHINERY, 5)[-1]) == pytest.approx(NOW, abs=0.001)
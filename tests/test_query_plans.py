@@ -0,0 +1,162 @@
+"""Regresión de planes: EXPLAIN de cada consulta de lectura de services/.
+
+    PERF_DATABASE_URL=postgresql://... pytest tests/test_query_plans.py
+
+Se salta sin PERF_DATABASE_URL. La base se carga con app.perf.seed (volumen
+por defecto) y cada caso llama a la función de servicio real; el SQL se
+captura con un listener del engine y se vuelve a ejecutar con EXPLAIN
+(FORMAT JSON) y los mismos parámetros. Falla si aparece un Seq Scan, así
+un cambio en un servicio o un índice borrado se detecta sin mantener el
+SQL duplicado aquí.
+"""
+import json
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from sqlalchemy import event, text
+
+from app.models.machinery import MachineryStatus, MachineryType
+from app.services import (
+    customer_service, product_service, machinery_service, fleet_stats_service,
+    maintenance_service, telemetry_service, search_service, stock_service, version_service,
+)
+
+# Tablas diminutas donde un Seq Scan es el plan correcto
+SEQ_SCAN_ALLOWED = {"tenants", "resource_versions"}
+
+
+@dataclass
+class PlanContext:
+    tenant_id: str
+    customer_id: str
+    product_id: str
+    machinery_id: str
+    category: str
+    project: str
+
+
+def _drain(stmt):
+    return lambda db, c: db.execute(stmt(c)).fetchmany(100)
+
+
+_TODAY = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+CASES = {
+    "customers.list": lambda db, c: customer_service.get_customer_rows(db, c.tenant_id),
+    "customers.list_after": lambda db, c: customer_service.get_customer_rows(db, c.tenant_id, after_id=c.customer_id),
+    "customers.list_models": lambda db, c: customer_service.get_customers(db, c.tenant_id),
+    "customers.get": lambda db, c: customer_service.get_customer(db, c.customer_id, c.tenant_id),
+    "customers.get_row": lambda db, c: customer_service.get_customer_row(db, c.customer_id, c.tenant_id),
+    "customers.export": _drain(lambda c: customer_service.export_customers_query(c.tenant_id)),
+    "products.list": lambda db, c: product_service.get_product_rows(db, c.tenant_id),
+    "products.list_category": lambda db, c: product_service.get_product_rows(db, c.tenant_id, category=c.category),
+    "products.list_after": lambda db, c: product_service.get_product_rows(db, c.tenant_id, after_id=c.product_id),
+    "products.list_models": lambda db, c: product_service.get_products(db, c.tenant_id, category=c.category),
+    "products.get": lambda db, c: product_service.get_product(db, c.product_id, c.tenant_id),
+    "products.get_row": lambda db, c: product_service.get_product_row(db, c.product_id, c.tenant_id),
+    "products.low_stock": lambda db, c: product_service.get_low_stock_products(db, c.tenant_id),
+    "products.low_stock_category": lambda db, c: product_service.get_low_stock_products(
+        db, c.tenant_id, category=c.category),
+    "products.low_stock_summary": lambda db, c: product_service.get_low_stock_summary(db, c.tenant_id),
+    "products.export": _drain(lambda c: product_service.export_products_query(c.tenant_id, c.category)),
+    "stock.movements": lambda db, c: stock_service.get_movements(db, c.product_id, c.tenant_id),
+    "search.products": lambda db, c: search_service.search_products(db, c.tenant_id, "producto 1"),
+    "search.products_fuzzy": lambda db, c: search_service.search_products(db, c.tenant_id, "prodcto"),
+    "search.customers": lambda db, c: search_service.search_customers(db, c.tenant_id, "cliente 12"),
+    "machinery.list": lambda db, c: machinery_service.get_machinery_rows(db, c.tenant_id),
+    "machinery.list_models": lambda db, c: machinery_service.get_machinery_list(db, c.tenant_id),
+    "machinery.list_type": lambda db, c: machinery_service.get_machinery_rows(
+        db, c.tenant_id, machinery_type=MachineryType.GRUA),
+    "machinery.list_status": lambda db, c: machinery_service.get_machinery_rows(
+        db, c.tenant_id, status=MachineryStatus.EN_REPARACION),
+    "machinery.list_needs_maintenance": lambda db, c: machinery_service.get_machinery_rows(
+        db, c.tenant_id, needs_maintenance=True),
+    "machinery.list_fields": lambda db, c: machinery_service.get_machinery_rows(
+        db, c.tenant_id, columns=["id", "code", "name", "status", "horometer"]),
+    "machinery.get_fields": lambda db, c: machinery_service.get_machinery_row(
+        db, c.machinery_id, c.tenant_id, ["id", "code", "name"]),
+    "machinery.get": lambda db, c: machinery_service.get_machinery(db, c.machinery_id, c.tenant_id),
+    "machinery.export": _drain(lambda c: machinery_service.export_machinery_query(c.tenant_id)),
+    "machinery.fleet_stats": lambda db, c: fleet_stats_service.compute_fleet_stats(db, c.tenant_id),
+    "maintenance.overdue": lambda db, c: maintenance_service.get_maintenance_queue(db, c.tenant_id),
+    "maintenance.within": lambda db, c: maintenance_service.get_maintenance_queue(
+        db, c.tenant_id, within_hours=50, within_days=7),
+    "utilization.daily": lambda db, c: telemetry_service.get_utilization(
+        db, c.tenant_id, _TODAY - timedelta(days=30), _TODAY),
+    "utilization.hourly_project": lambda db, c: telemetry_service.get_utilization(
+        db, c.tenant_id, _TODAY - timedelta(days=2), _TODAY, bucket="hour", group_by="project", project=c.project),
+    "utilization.machinery": lambda db, c: telemetry_service.get_utilization(
+        db, c.tenant_id, _TODAY - timedelta(days=30), _TODAY, machinery_id=c.machinery_id),
+    "versions.get": lambda db, c: version_service.get_version(db, c.tenant_id, version_service.PRODUCTS),
+}
+
+
+@pytest.fixture(scope="module")
+def plan_context(perf_database) -> PlanContext:
+    """Carga el volumen de prueba y toma valores reales de un tenant intermedio"""
+    from app.database import SessionLocal
+    from app.perf.seed import SeedConfig, seed
+
+    seed(SeedConfig())
+    db = SessionLocal()
+    try:
+        tenant_id = db.execute(
+            text("SELECT id FROM tenants ORDER BY id OFFSET (SELECT count(*) / 2 FROM tenants) LIMIT 1")
+        ).scalar()
+        pick = lambda sql: db.execute(text(sql), {"t": tenant_id}).scalar()
+        return PlanContext(
+            tenant_id=tenant_id,
+            customer_id=pick("SELECT id FROM customers WHERE tenant_id = :t ORDER BY id OFFSET 100 LIMIT 1"),
+            product_id=pick("SELECT id FROM products WHERE tenant_id = :t ORDER BY id OFFSET 100 LIMIT 1"),
+            machinery_id=pick("SELECT id FROM machinery WHERE tenant_id = :t ORDER BY id LIMIT 1"),
+            category=pick("SELECT category FROM products WHERE tenant_id = :t LIMIT 1"),
+            project=pick(
+                "SELECT current_project FROM machinery WHERE tenant_id = :t AND current_project IS NOT NULL LIMIT 1"
+            ),
+        )
+    finally:
+        db.close()
+
+
+def _seq_scans(node: dict) -> List[str]:
+    found = []
+    if node.get("Node Type") == "Seq Scan" and node.get("Relation Name") not in SEQ_SCAN_ALLOWED:
+        found.append(node.get("Relation Name"))
+    for child in node.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def _scan_summary(node: dict) -> List[str]:
+    """Nodos de acceso a tabla, para el mensaje de error"""
+    out = []
+    if "Relation Name" in node:
+        out.append(f"{node['Node Type']}({node.get('Index Name') or node['Relation Name']})")
+    for child in node.get("Plans", []):
+        out.extend(_scan_summary(child))
+    return out
+
+
+@pytest.mark.parametrize("name", list(CASES))
+def test_consulta_sin_seq_scan(name, db, perf_database, plan_context):
+    captured = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(perf_database, "before_cursor_execute", capture)
+    try:
+        CASES[name](db, plan_context)
+    finally:
+        event.remove(perf_database, "before_cursor_execute", capture)
+    assert captured, "el caso no ejecutó ninguna consulta"
+
+    raw = db.connection().connection.dbapi_connection.cursor()
+    for statement, parameters in captured:
+        raw.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+        plan = raw.fetchone()[0]
+        plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+        assert not _seq_scans(plan), f"Seq Scan en {name}: {', '.join(_scan_summary(plan))}"
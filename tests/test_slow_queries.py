@@ -0,0 +1,28 @@
+from app.core.slow_queries import strip_plan_literals
+
+
+def test_plan_sin_literales_de_la_consulta():
+    plan = [{
+        "Plan": {
+            "Node Type": "Index Scan",
+            "Relation Name": "machinery_readings_p202610",
+            "Index Name": "ix_machinery_tenant_status",
+            "Index Cond": "((tenant_id)::text = 'tenant-01abc'::text)",
+            "Filter": "((horometer > 250.5) AND (name ~~ '%o''brien%'::text))",
+            "Sort Key": ["(similarity((name)::text, 'excavadora 2'::text)) DESC"],
+            "Actual Rows": 12,
+            "Plans": [{"Node Type": "Bitmap Heap Scan", "Recheck Cond": "(id = ANY ('{prod-1,prod-2}'::text[]))"}],
+        },
+        "Execution Time": 1.5,
+    }]
+
+    (stripped,) = strip_plan_literals(plan)
+    node = stripped["Plan"]
+    assert node["Index Cond"] == "((tenant_id)::text = ?::text)"
+    assert node["Filter"] == "((horometer > ?) AND (name ~~ ?::text))"
+    assert node["Sort Key"] == ["(similarity((name)::text, ?::text)) DESC"]
+    assert node["Plans"][0]["Recheck Cond"] == "(id = ANY (?::text[]))"
+    # Nombres de tablas e índices y métricas numéricas intactos
+    assert node["Relation Name"] == "machinery_readings_p202610"
+    assert node["Index Name"] == "ix_machinery_tenant_status"
+    assert (node["Actual Rows"], stripped["Execution Time"]) == (12, 1.5)
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+from app.models.product import Product
+from app.models.stock_movement import StockMovement, StockMovementType
+from app.schemas.product import ProductCreate, ProductUpdate
+from app.schemas.stock import StockMovementBatchItem, StockMovementCreate
+from app.services import product_service, stock_service
+
+
+def _create(db, tenant_id, name, stock):
+    return product_service.create_product(db, ProductCreate(name=name, sku=f"{tenant_id}-{name}", stock_current=stock), tenant_id)
+
+
+def _stock(db, product_id):
+    return db.execute(select(Product.stock_current).where(Product.id == product_id)).scalar_one()
+
+
+def _ledger(db, product_id):
+    return db.scalars(
+        select(StockMovement).where(StockMovement.product_id == product_id).order_by(StockMovement.id)
+    ).all()
+
+
+def _ledger_sum(db, product_id):
+    return db.execute(
+        select(func.coalesce(func.sum(StockMovement.quantity), 0)).where(StockMovement.product_id == product_id)
+    ).scalar_one()
+
+
+def test_alta_registra_el_stock_inicial(db, tenant_id):
+    product = _create(db, tenant_id, "filtro", 12)
+    empty = _create(db, tenant_id, "vacio", 0)
+
+    (opening,) = _ledger(db, product.id)
+    assert opening.movement_type == StockMovementType.ENTRADA
+    assert (opening.quantity, opening.stock_after) == (12, 12)
+    assert _ledger(db, empty.id) == []
+
+
+def test_movimiento_que_deja_saldo_negativo_se_rechaza(db, tenant_id):
+    product = _create(db, tenant_id, "aceite", 5)
+
+    with pytest.raises(HTTPException) as exc:
+        stock_service.apply_movement(db, product.id, StockMovementCreate(movement_type="salida", quantity=6), tenant_id)
+    assert exc.value.status_code == 409
+
+    with pytest.raises(HTTPException) as exc:
+        # El saldo intermedio (5 - 6) es negativo aunque el neto del lote no lo sea
+        stock_service.apply_movements(db, [
+            StockMovementBatchItem(product_id=product.id, movement_type="salida", quantity=6),
+            StockMovementBatchItem(product_id=product.id, movement_type="entrada", quantity=10),
+        ], tenant_id)
+    assert exc.value.status_code == 409
+    assert exc.value.detail["indexes"] == [0]
+
+    assert _stock(db, product.id) == 5
+    assert len(_ledger(db, product.id)) == 1
+
+
+def test_libro_cuadra_con_el_saldo(db, tenant_id):
+    product = _create(db, tenant_id, "correa", 10)
+    other = _create(db, tenant_id, "perno", 0)
+
+    stock_service.apply_movement(db, product.id, StockMovementCreate(movement_type="salida", quantity=4), tenant_id)
+    stock_service.apply_movements(db, [
+        StockMovementBatchItem(product_id=product.id, movement_type="entrada", quantity=7),
+        StockMovementBatchItem(product_id=other.id, movement_type="entrada", quantity=3),
+        StockMovementBatchItem(product_id=product.id, movement_type="ajuste", quantity=-2),
+    ], tenant_id)
+    product_service.update_product(db, product.id, ProductUpdate(stock_current=40), tenant_id)
+    result = product_service.bulk_upsert_products(db, [
+        ProductCreate(name="correa", sku=f"{tenant_id}-correa", stock_current=25),
+        ProductCreate(name="nuevo", sku=f"{tenant_id}-nuevo", stock_current=8),
+    ], tenant_id)
+    assert (result.created, result.updated) == (1, 1)
+    created = result.items[1].id
+
+    for product_id, expected in ((product.id, 25), (other.id, 3), (created, 8)):
+        assert _stock(db, product_id) == expected
+        assert _ledger_sum(db, product_id) == expected
+        assert _ledger(db, product_id)[-1].stock_after == expected
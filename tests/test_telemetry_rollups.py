@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.telemetry_service import ROLLUP_MAX_SPLIT_HOURS, _RollupAccumulator
+
+MACHINE = "mach-1"
+
+
+def _add(rollups, previous_at, previous_hours, recorded_at, hours, previous_km=0.0, km=None):
+    rollups.add(MACHINE, "obra-1", previous_at, previous_hours, previous_km, recorded_at, hours, km)
+
+
+def _by_bucket(rows):
+    return {row["bucket_start"]: row for row in rows}
+
+
+def test_intervalo_se_reparte_entre_las_horas_que_cubre():
+    rollups = _RollupAccumulator("tenant-1")
+    _add(rollups, datetime(2026, 10, 1, 10, 30), 100.0, datetime(2026, 10, 1, 12, 15), 101.75, km=20.0, previous_km=13.0)
+
+    hourly = _by_bucket(rollups.hourly.values())
+    assert sorted(hourly) == [datetime(2026, 10, 1, h) for h in (10, 11, 12)]
+    assert hourly[datetime(2026, 10, 1, 10)]["hours_worked"] == pytest.approx(0.5)
+    assert hourly[datetime(2026, 10, 1, 11)]["hours_worked"] == pytest.approx(1.0)
+    assert hourly[datetime(2026, 10, 1, 12)]["hours_worked"] == pytest.approx(0.25)
+    assert hourly[datetime(2026, 10, 1, 11)]["km_travelled"] == pytest.approx(4.0)
+    assert all(row["idle_hours"] == pytest.approx(0.0) for row in hourly.values())
+    assert [hourly[bucket]["readings_count"] for bucket in sorted(hourly)] == [0, 0, 1]
+
+    (day,) = rollups.daily()
+    assert day["bucket_start"] == datetime(2026, 10, 1)
+    assert day["hours_worked"] == pytest.approx(1.75)
+    assert day["km_travelled"] == pytest.approx(7.0)
+    assert day["readings_count"] == 1
+
+
+def test_hueco_largo_se_reparte_por_dias_y_no_en_una_hora():
+    rollups = _RollupAccumulator("tenant-1")
+    previous_at, recorded_at = datetime(2026, 10, 1, 12), datetime(2026, 10, 4, 12)
+    assert (recorded_at - previous_at).total_seconds() / 3600 > ROLLUP_MAX_SPLIT_HOURS
+    _add(rollups, previous_at, 100.0, recorded_at, 110.0)
+
+    # La hora de la lectura solo cuenta la lectura: ninguna fila horaria supera su hora
+    (hour,) = rollups.hourly.values()
+    assert hour["bucket_start"] == datetime(2026, 10, 4, 12)
+    assert hour["readings_count"] == 1
+    assert hour["hours_worked"] + hour["idle_hours"] == pytest.approx(0.0)
+
+    days = _by_bucket(rollups.daily())
+    assert sorted(days) == [datetime(2026, 10, d) for d in (1, 2, 3, 4)]
+    for bucket, covered in ((1, 12), (2, 24), (3, 24), (4, 12)):
+        row = days[datetime(2026, 10, bucket)]
+        assert row["hours_worked"] + row["idle_hours"] == pytest.approx(covered)
+    assert sum(row["hours_worked"] for row in days.values()) == pytest.approx(10.0)
+    assert sum(row["idle_hours"] for row in days.values()) == pytest.approx(62.0)
+    assert days[datetime(2026, 10, 4)]["readings_count"] == 1
+
+
+@pytest.mark.parametrize("recorded_at, hours", [
+    (datetime(2026, 10, 1, 9), 105.0),   # anterior a la última lectura
+    (datetime(2026, 10, 1, 10), 105.0),  # mismo instante
+    (datetime(2026, 10, 1, 11), 95.0),   # horómetro que retrocede (corrección manual)
+])
+def test_lectura_fuera_de_orden_no_imputa_tiempo(recorded_at, hours):
+    rollups = _RollupAccumulator("tenant-1")
+    _add(rollups, datetime(2026, 10, 1, 10), 100.0, recorded_at, hours)
+
+    (hour,) = rollups.hourly.values()
+    assert hour["readings_count"] == 1
+    assert hour["hours_worked"] == hour["idle_hours"] == hour["km_travelled"] == 0.0
+    (day,) = rollups.daily()
+    assert day["readings_count"] == 1
+    assert day["hours_worked"] == 0.0